@@ -0,0 +1,256 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Reports are unavailable without NumPy
+    np = None
+
+from attendance_backend import BACKENDS, DATA_DIR
+from attendance_export import list_days
+from attendance_store import STATUSES, StringPool, parse_time
+
+PRESENT, ABSENT, LATE = range(len(STATUSES))
+
+# Students below this attendance percentage are listed as at risk
+THRESHOLD = 75.0
+
+STUDENT_HEADER = ["Student ID", "Name", "Department", "Present", "Absent", "Late",
+                  "Attendance %", "Late %", "Longest Absence", "Current Absence"]
+TREND_HEADER = ["Department", "Date", "Records", "Attendance %", "Late %"]
+TABLES = ("students", "below", "trends")
+
+
+def require_numpy():
+    """Raise ImportError with install instructions when NumPy is missing"""
+    if np is None:
+        raise ImportError("Attendance reports need NumPy: pip install numpy")
+
+
+class AttendanceColumns:
+    """Days of attendance as parallel NumPy arrays, one element per record
+
+    ``student``, ``department`` and ``status`` hold codes into the
+    ``students``, ``departments`` and ``statuses`` pools; statuses are
+    coded in ``STATUSES`` order, so anything above ``LATE`` is a status
+    the application does not know. ``day`` indexes ``dates`` and ``time``
+    holds seconds since midnight, or -1 for a time that is not
+    ``HH:MM:SS``.
+
+    ``days`` yields ``(date, records)`` pairs in date order. Since codes
+    are handed out on first sight, ``first_day`` is known per student
+    without a search, and ``names`` and ``student_departments`` keep the
+    latest name and department code for each student.
+    """
+
+    def __init__(self, days):
+        require_numpy()
+        self.dates = []
+        self.students = StringPool()
+        self.departments = StringPool()
+        self.statuses = StringPool()
+        for status in STATUSES:
+            self.statuses[status]  # Interned first, so codes follow STATUSES
+        self.names = {}
+        self.student_departments = {}
+
+        columns = ([], [], [], [], [])
+        first_days = []
+        times = StringPool()
+
+        for date, records in days:
+            day = len(self.dates)
+            self.dates.append(date)
+            records = list(records)
+            if not records:
+                continue
+
+            seen = len(self.students)
+            ids, names, depts, statuses, clock = zip(*records)
+            student = np.fromiter(map(self.students.__getitem__, ids), np.int32, len(ids))
+            department = np.fromiter(map(self.departments.__getitem__, depts), np.int32, len(ids))
+            columns[0].append(student)
+            columns[1].append(department)
+            columns[2].append(np.fromiter(map(self.statuses.__getitem__, statuses), np.int16, len(ids)))
+            columns[3].append(np.full(len(ids), day, np.int32))
+            columns[4].append(np.fromiter(map(times.__getitem__, clock), np.int32, len(ids)))
+            first_days.append(np.full(len(self.students) - seen, day, np.int32))
+
+            self.names.update(zip(student.tolist(), names))
+            self.student_departments.update(zip(student.tolist(), department.tolist()))
+
+        empty = np.zeros(0, np.int32)
+        self.student, self.department, self.status, self.day, time_codes = (
+            np.concatenate(column) if column else empty for column in columns
+        )
+        self.first_day = np.concatenate(first_days) if first_days else empty
+
+        # Times repeat heavily, so each distinct string is only parsed once
+        seconds = [parse_time(value) for value in times.values]
+        seconds = np.array([-1 if value is None else value for value in seconds], np.int32)
+        self.time = seconds[time_codes] if len(time_codes) else empty
+
+    def __len__(self):
+        return len(self.student)
+
+
+def load_attendance(data_dir=DATA_DIR, start=None, end=None, backend="csv"):
+    """Load the days between ``start`` and ``end`` into ``AttendanceColumns``"""
+    return AttendanceColumns(
+        (date, read()) for date, _, read in list_days(data_dir, start, end, backend)
+    )
+
+
+def absence_streaks(missed):
+    """Return the longest and the current run of True per row of a boolean matrix"""
+    rows, days = missed.shape
+    padded = np.zeros((rows, days + 2), np.int8)
+    padded[:, 1:-1] = missed
+    edges = np.diff(padded, axis=1)
+
+    # Runs start at +1 and end at -1; both come out row by row, in order
+    run_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    lengths = (ends - starts).astype(np.int32)
+
+    longest = np.zeros(rows, np.int32)
+    np.maximum.at(longest, run_rows, lengths)
+    current = np.zeros(rows, np.int32)
+    at_end = ends == days
+    current[run_rows[at_end]] = lengths[at_end]
+    return longest, current
+
+
+def _percent(part, whole):
+    """Return ``100 * part / whole`` rounded to one decimal, 0 where ``whole`` is 0"""
+    result = np.zeros(len(whole))
+    np.divide(100.0 * part, whole, out=result, where=whole > 0)
+    return np.round(result, 1)
+
+
+class Report:
+    """Per-student rates and streaks, at-risk students and department trends
+
+    Rates follow ``attendance_history``: attendance is Present and Late
+    records over all Present, Absent and Late records, and the late rate
+    is Late over Present and Late. A day counts towards an absence streak
+    when a student has no Present or Late record on it, from the first day
+    they appear; only days that have a file are counted.
+
+    Every table is a list of row tuples matching its header, and all of
+    it is computed with array operations, so no Python loop runs per
+    record. ``elapsed`` is the time taken, without loading.
+    """
+
+    def __init__(self, columns, threshold=THRESHOLD):
+        started = time.perf_counter()
+        self.dates = columns.dates
+        self.threshold = threshold
+        self.records = len(columns)
+
+        students = len(columns.students)
+        days = len(columns.dates)
+        known = columns.status <= LATE
+        student, status, day = columns.student[known], columns.status[known], columns.day[known]
+        attended = (status == PRESENT) | (status == LATE)
+
+        # Status counts per student in one pass
+        counts = np.bincount(student * 3 + status, minlength=students * 3).reshape(students, 3)
+        present, absent, late = counts[:, PRESENT], counts[:, ABSENT], counts[:, LATE]
+        attendance = _percent(present + late, counts.sum(axis=1))
+        late_rate = _percent(late, present + late)
+
+        went = np.zeros((students, days), bool)
+        went[student[attended], day[attended]] = True
+        missed = ~went & (np.arange(days) >= columns.first_day[:, None])
+        longest, current = absence_streaks(missed)
+
+        ids = columns.students.values
+        names = [columns.names.get(code, "") for code in range(students)]
+        depts = [columns.departments.values[columns.student_departments[code]]
+                 if code in columns.student_departments else ""
+                 for code in range(students)]
+        rows = list(zip(ids, names, depts, present.tolist(), absent.tolist(), late.tolist(),
+                        attendance.tolist(), late_rate.tolist(), longest.tolist(), current.tolist()))
+
+        self.students = sorted(rows)
+        at_risk = np.nonzero((counts.sum(axis=1) > 0) & (attendance < threshold))[0]
+        self.below = sorted((rows[code] for code in at_risk.tolist()), key=lambda row: (row[6], row[0]))
+
+        # Attendance per department per day, by the department on each record
+        departments = len(columns.departments)
+        cells = columns.department[known] * days + day
+        totals = np.bincount(cells, minlength=departments * days)
+        came = np.bincount(cells, weights=attended, minlength=departments * days)
+        lates = np.bincount(cells, weights=status == LATE, minlength=departments * days)
+        trend_attendance = _percent(came, totals).tolist()
+        trend_late = _percent(lates, came).tolist()
+        totals = totals.tolist()
+
+        self.trends = []
+        for cell in np.nonzero(totals)[0].tolist():
+            dept, day_index = divmod(cell, days)
+            self.trends.append((columns.departments.values[dept], self.dates[day_index],
+                                totals[cell], trend_attendance[cell], trend_late[cell]))
+        self.trends.sort()
+
+        self.elapsed = time.perf_counter() - started
+
+    def table(self, name):
+        """Return ``(header, rows)`` for ``students``, ``below`` or ``trends``"""
+        if name == "trends":
+            return TREND_HEADER, self.trends
+        return STUDENT_HEADER, self.below if name == "below" else self.students
+
+    def export(self, path, name="students"):
+        """Write a table to ``path``, as JSON if it ends in .json and CSV otherwise"""
+        header, rows = self.table(name)
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump([dict(zip(header, row)) for row in rows], f, indent=2)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Attendance rates, absence streaks and department trends across days"
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--table", choices=TABLES, default="students",
+                        help="students, students below --threshold, or department trends")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="attendance %% below which students are listed (default: 75)")
+    parser.add_argument("--output", help="file to write, .json or .csv (default: CSV to stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        started = time.perf_counter()
+        columns = load_attendance(args.data_dir, args.start, args.end, args.backend)
+    except ImportError as e:
+        parser.exit(1, f"{e}\n")
+    loaded = time.perf_counter() - started
+    report = Report(columns, args.threshold)
+
+    if args.output:
+        report.export(args.output, args.table)
+    else:
+        header, rows = report.table(args.table)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    print(f"{len(report.dates)} day(s), {report.records} record(s): "
+          f"loaded in {loaded:.2f}s, computed in {report.elapsed:.3f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
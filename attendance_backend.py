@@ -0,0 +1,37 @@
+import os
+
+from attendance_journal import AttendanceJournal
+from attendance_segments import SharedJournal
+
+BACKENDS = ("csv", "shared", "sqlite")
+DATA_DIR = "attendance_data"
+DB_NAME = "attendance.db"
+
+
+def csv_path(data_dir, date):
+    """Return the path of a day's attendance CSV file"""
+    return os.path.join(data_dir, f"attendance_{date}.csv")
+
+
+def open_backend(kind, data_dir, date, fsync=False):
+    """Create the storage backend for one day
+
+    ``csv`` keeps the historical ``attendance_<date>.csv`` files with an
+    append-only journal; ``shared`` does the same for several processes at
+    once with a segment file per writer; ``sqlite`` stores every day in
+    ``attendance.db``. A day that was sealed is turned back into a live
+    CSV file first.
+    """
+    if kind in ("csv", "shared"):
+        # Imported here, as the partitions module builds on this one
+        from attendance_partitions import unseal_day
+        unseal_day(csv_path(data_dir, date))
+    if kind == "csv":
+        return AttendanceJournal(csv_path(data_dir, date), fsync=fsync)
+    if kind == "shared":
+        return SharedJournal(csv_path(data_dir, date), fsync=fsync)
+    if kind == "sqlite":
+        # Imported here, so sqlite3 is only loaded by the backend that needs it
+        from attendance_sqlite import SQLiteBackend
+        return SQLiteBackend(os.path.join(data_dir, DB_NAME), date, fsync=fsync)
+    raise ValueError(f"Unknown storage backend: {kind}")
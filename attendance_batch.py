@@ -0,0 +1,170 @@
+from datetime import datetime
+
+from attendance_journal import UPSERT, DELETE
+from attendance_metrics import metrics
+from attendance_store import STATUSES, parse_time
+
+# Batches kept on the undo log, most recent last
+UNDO_DEPTH = 20
+
+
+class BatchError(Exception):
+    """A batch that cannot be applied; nothing was changed"""
+
+
+class BatchEditor:
+    """Applies many edits, deletes and additions to a day as one transaction
+
+    Every change is checked before anything is touched. The batch is then
+    applied to the store and queued on the writer as a single
+    transaction, which the journal and segments bracket with begin and
+    commit markers and SQLite applies in one database transaction, so
+    after a crash either all of it is on disk or none of it is. The work
+    grows with the number of rows changed, never with the size of the day.
+
+    Each applied batch goes on an undo log of up to ``depth`` entries,
+    holding every row's record before and after. ``undo`` reverts the
+    latest batch as another transaction, provided none of its rows have
+    changed since. Deleted rows come back at the end of the check-in
+    order, since row IDs are never reused.
+
+    A changed record only has the fields the batch changes checked, so
+    older rows with a status or time the form would not accept can still
+    be edited, deleted and brought back.
+    """
+
+    def __init__(self, store, writer, depth=UNDO_DEPTH):
+        self.store = store
+        self.writer = writer
+        self.depth = depth
+        self.undo_log = []  # (label, [(row_id, before, after)])
+
+    def apply(self, label, changes):
+        """Apply ``(row_id, record)`` changes as one transaction and return the rows changed
+
+        A None ``row_id`` adds ``record``, a None ``record`` deletes the row
+        and anything else replaces the row's record. ``label`` names the
+        batch on the undo log.
+        """
+        entries = self._apply(changes)
+        if entries:
+            self.undo_log.append((label, entries))
+            del self.undo_log[:-self.depth]
+        return len(entries)
+
+    def delete(self, row_ids):
+        """Delete records"""
+        row_ids = list(row_ids)
+        return self.apply(f"Delete {len(row_ids)} record(s)", [(row_id, None) for row_id in row_ids])
+
+    def edit(self, row_id, record):
+        """Replace one record"""
+        return self.apply(f"Edit {record[0]}", [(row_id, record)])
+
+    def set_status(self, row_ids, status):
+        """Give records a new status"""
+        row_ids = list(row_ids)
+        return self.apply(f"Mark {len(row_ids)} record(s) {status}",
+                          self._replace(row_ids, 3, status))
+
+    def set_department(self, row_ids, department):
+        """Move records to another department"""
+        row_ids = list(row_ids)
+        return self.apply(f"Move {len(row_ids)} record(s) to {department}",
+                          self._replace(row_ids, 2, department))
+
+    def mark_unmarked(self, students, status="Absent", time=None):
+        """Add a record with ``status`` for every student that has none yet
+
+        ``students`` are ``(student_id, name, department)`` tuples, such as
+        the roster's. The time defaults to now.
+        """
+        time = time or datetime.now().strftime("%H:%M:%S")
+        changes = [(None, (*student, status, time)) for student in students
+                   if not self.store.find_student(student[0])]
+        return self.apply(f"Mark {len(changes)} unmarked student(s) {status}", changes)
+
+    def undo(self):
+        """Revert the latest batch and return its label"""
+        if not self.undo_log:
+            raise BatchError("Nothing to undo")
+
+        label, entries = self.undo_log[-1]
+        changes = []
+        for row_id, before, after in entries:
+            current = self.store.get(row_id) if row_id in self.store else None
+            if current != after:
+                raise BatchError(f"Cannot undo \"{label}\": a record in it has changed since")
+            changes.append((row_id if after is not None else None, before))
+
+        self._apply(changes, check=False)
+        self.undo_log.pop()
+        return label
+
+    def _replace(self, row_ids, field, value):
+        """Return changes setting one field of existing records"""
+        changes = []
+        for row_id in row_ids:
+            if row_id not in self.store:
+                raise BatchError(f"Record {row_id} no longer exists")
+            record = self.store.get(row_id)
+            changes.append((row_id, record[:field] + (value,) + record[field + 1:]))
+        return changes
+
+    def _check(self, record, before):
+        """Raise ``BatchError`` if a new or changed record is invalid"""
+        student_id, name, _, status, time = record
+        if not student_id or not name:
+            raise BatchError("Student ID and Name are required!")
+        if (before is None or status != before[3]) and status not in STATUSES:
+            raise BatchError(f"Status must be one of {', '.join(STATUSES)}")
+        if (before is None or time != before[4]) and parse_time(time) is None:
+            raise BatchError("Time must be HH:MM:SS")
+
+    def _apply(self, changes, check=True):
+        """Check, apply and queue changes; return ``(row_id, before, after)`` per row changed
+
+        Undo passes ``check=False``, since it only puts back records that
+        were there before.
+        """
+        updates = {}  # Row ID -> new record or None, the last change winning
+        additions = []
+        for row_id, record in changes:
+            if record is not None:
+                record = tuple(record)
+            if row_id is None:
+                if record is not None:
+                    if check:
+                        self._check(record, None)
+                    additions.append(record)
+            elif row_id not in self.store:
+                raise BatchError(f"Record {row_id} no longer exists")
+            else:
+                if check and record is not None:
+                    self._check(record, self.store.get(row_id))
+                updates[row_id] = record
+
+        entries = []
+        writes = []
+        with metrics.timer("batch.apply"):
+            for row_id, record in updates.items():
+                before = self.store.get(row_id)
+                if record is None:
+                    self.store.delete(row_id)
+                    writes.append((DELETE, row_id, None))
+                elif record != before:
+                    self.store.update(row_id, record)
+                    writes.append((UPSERT, row_id, record))
+                else:
+                    continue
+                entries.append((row_id, before, record))
+
+            for record in additions:
+                row_id = self.store.add(record)
+                writes.append((UPSERT, row_id, record))
+                entries.append((row_id, None, record))
+
+            if writes:
+                self.writer.transaction(writes)
+        metrics.count("batch.rows", len(entries))
+        return entries
@@ -0,0 +1,529 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from attendance_analytics import AttendanceColumns, Report, require_numpy
+from attendance_backend import csv_path, open_backend
+from attendance_batch import BatchEditor
+from attendance_facets import RecordIndex, bitmap_rows
+from attendance_history import query_history
+from attendance_import import CheckinImporter
+from attendance_roster import roster_path, write_roster
+from attendance_search import SearchIndex
+from attendance_store import AttendanceStore, RecordColumns, STATUSES, read_csv, write_csv
+from attendance_summary import SUMMARY_NAME, AttendanceSummary
+from attendance_writer import AttendanceWriter
+
+DEPARTMENTS = (
+    "Computer Science", "Electrical", "Mechanical", "Civil", "Chemical",
+    "Mathematics", "Physics", "Biotechnology", "Architecture", "Business",
+)
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Neha",
+    "Nikhil", "Priya", "Rahul", "Riya", "Rohan", "Sanya", "Vikram", "Zara",
+)
+LAST_NAMES = (
+    "Bhardwaj", "Chopra", "Gupta", "Iyer", "Jain", "Kapoor", "Khan", "Mehta",
+    "Nair", "Patel", "Rao", "Reddy", "Sharma", "Singh", "Verma", "Yadav",
+)
+
+# Share of Present, Absent and Late records
+STATUS_MIX = (0.8, 0.12, 0.08)
+
+SIZES = (1000, 100000)
+SEARCH_TERMS = ("s00", "sharma", "computer", "late", "s0012", "zzz")
+
+# Check-ins a second fed to the window while timing its frames, and for how long
+INGEST_RATE = 5000
+INGEST_SECONDS = 2
+
+# Frame time the window is held to while check-ins stream in (60 fps)
+FRAME_SECONDS = 1 / 60
+
+
+def generate_roster(students, seed=0):
+    """Return ``students`` deterministic ``(student_id, name, department)`` tuples"""
+    rng = random.Random(seed)
+    return [
+        (f"S{number:06d}",
+         f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+         rng.choice(DEPARTMENTS))
+        for number in range(students)
+    ]
+
+
+def generate_day(roster, rows, seed=0):
+    """Return ``rows`` check-ins drawn from a roster, in time order
+
+    Check-ins are spread between 08:00 and 10:00 with the status mix in
+    ``STATUS_MIX``. Rosters smaller than ``rows`` are cycled, so any size
+    can be generated from any roster.
+    """
+    rng = random.Random(seed)
+    times = sorted(rng.randrange(8 * 3600, 10 * 3600) for _ in range(rows))
+    statuses = rng.choices(STATUSES, weights=STATUS_MIX, k=rows)
+    start = rng.randrange(len(roster))
+    records = []
+    for index, (seconds, status) in enumerate(zip(times, statuses)):
+        student_id, name, dept = roster[(start + index) % len(roster)]
+        records.append((student_id, name, dept, status,
+                        f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"))
+    return records
+
+
+def generate_data(data_dir, students, days, rows_per_day, first_day=None, seed=0):
+    """Write a roster and ``days`` days of attendance CSV files; return the dates"""
+    os.makedirs(data_dir, exist_ok=True)
+    roster = generate_roster(students, seed)
+    write_roster(roster_path(data_dir), {student[0]: student for student in roster})
+
+    first_day = first_day or date(2025, 1, 6)
+    dates = []
+    for offset in range(days):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        write_csv(csv_path(data_dir, day), generate_day(roster, rows_per_day, seed + offset + 1))
+        dates.append(day)
+    return dates
+
+
+class Bench:
+    """Collects timings as JSON-ready results"""
+
+    def __init__(self, repeat=1, verbose=True):
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results = []
+
+    def measure(self, name, rows, run, setup=None, **extra):
+        """Time ``run()`` and keep the best of ``repeat`` runs
+
+        ``setup`` returns the arguments for each run and is not timed.
+        """
+        best = None
+        for _ in range(self.repeat):
+            args = setup() if setup is not None else ()
+            started = time.perf_counter()
+            run(*args)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        result = {"name": name, "rows": rows, "seconds": round(best, 6), **extra}
+        if rows:
+            result["rows_per_second"] = round(rows / best) if best else None
+        self.results.append(result)
+        if self.verbose:
+            print(f"{name:<28} {rows:>9} rows  {best * 1000:10.2f} ms", file=sys.stderr)
+        return best
+
+
+def bench_storage(bench, work_dir, rows, backend):
+    """Load, submit, delete, compact and export one day of ``rows`` records"""
+    data_dir = os.path.join(work_dir, f"{backend}-{rows}")
+    os.makedirs(data_dir)
+    day = "2025-01-06"
+    roster = generate_roster(max(1000, rows // 4))
+    records = generate_day(roster, rows)
+    csv_file = csv_path(data_dir, day)
+    write_csv(csv_file, records)
+    if backend == "sqlite":
+        from attendance_sqlite import migrate_csv
+        migrate_csv(data_dir, os.path.join(data_dir, "attendance.db"))
+
+    def load():
+        store = AttendanceStore()
+        day_backend = open_backend(backend, data_dir, day)
+        day_backend.load(store)
+        day_backend.wait()
+        day_backend.close()
+        return store
+
+    bench.measure(f"{backend}.load_cold", rows, load)
+    bench.measure(f"{backend}.load_warm", rows, load)
+
+    store = AttendanceStore()
+    day_backend = open_backend(backend, data_dir, day)
+    day_backend.load(store)
+    writer = AttendanceWriter(day_backend)
+    writer.start()
+    submits = max(1, rows // 10)
+    new_records = generate_day(roster, submits, seed=99)
+
+    def submit():
+        for record in new_records:
+            writer.upsert(store.add(record), record)
+        writer.flush()
+
+    bench.measure(f"{backend}.submit", submits, submit)
+
+    def delete(selected):
+        for row_id in selected:
+            store.delete(row_id)
+            writer.delete(row_id)
+        writer.flush()
+
+    bench.measure(f"{backend}.delete_1pct", len(store) // 100, delete,
+                  setup=lambda: (list(store.row_ids())[::100],))
+
+    # The same sized changes as single transactions, and undoing them
+    batches = BatchEditor(store, writer)
+
+    def run_batch(operation, *args):
+        operation(*args)
+        writer.flush()
+
+    bench.measure(f"{backend}.batch_delete_1pct", len(store) // 100, run_batch,
+                  setup=lambda: (batches.delete, list(store.row_ids())[::100]))
+    bench.measure(f"{backend}.batch_status_1pct", len(store) // 100, run_batch,
+                  setup=lambda: (batches.set_status, list(store.row_ids())[::100], "Late"))
+    bench.measure(f"{backend}.batch_undo", len(store) // 100, run_batch,
+                  setup=lambda: (batches.undo,))
+
+    def compact():
+        writer.compact(list(store.items()), force=True)
+        writer.flush()
+        day_backend.wait()
+
+    bench.measure(f"{backend}.compact", len(store), compact)
+    writer.close()
+    day_backend.close()
+
+    export_file = os.path.join(data_dir, "export.csv")
+    bench.measure(f"{backend}.export", len(store), lambda: store.write_csv(export_file))
+
+
+def bench_search(bench, rows):
+    """Build the search index and run a few searches over ``rows`` records"""
+    store = AttendanceStore()
+    store.set_base(generate_day(generate_roster(max(1000, rows // 4)), rows))
+    index = SearchIndex(store)
+
+    def build():
+        index._stale = True
+        index.search("")
+
+    bench.measure("search.build", rows, build)
+    for term in SEARCH_TERMS:
+        # Each search starts cold so narrowing does not flatter the numbers
+        def search(term=term):
+            index._last_term = None
+            return index.search(term)
+        bench.measure(f"search.{term}", rows, search, matches=len(search()))
+
+
+def bench_facets(bench, rows):
+    """Build the sort keys and facet bitmaps, then filter and sort ``rows`` records"""
+    store = AttendanceStore()
+    store.set_base(RecordColumns(generate_day(generate_roster(max(1000, rows // 4)), rows)))
+    index = RecordIndex(store)
+
+    def build():
+        index._stale = True
+        index.values(3)
+
+    bench.measure("facets.build", rows, build)
+    departments = [value for value, _ in index.values(2)[:2]]
+    selection = {2: set(departments), 3: {"Absent", "Late"}}
+    bench.measure("facets.select", rows, lambda: bitmap_rows(index.select(selection)),
+                  matches=len(bitmap_rows(index.select(selection))))
+    for column, name in ((4, "time"), (1, "name")):
+        index._keys.pop(column, None)
+        bench.measure(f"facets.sort.{name}", rows, lambda column=column: index.sort(store.row_ids(), column))
+
+
+def allocated(build):
+    """Return the bytes still allocated for what ``build()`` returns"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_memory(bench, work_dir, rows):
+    """Compare the memory ``rows`` loaded records take as tuples and in the store"""
+    source = os.path.join(work_dir, f"memory-{rows}.csv")
+    write_csv(source, generate_day(generate_roster(max(1000, rows // 4)), rows))
+
+    def tuples():
+        # How the store used to keep records: a dict of tuples of fresh strings
+        return dict(enumerate(read_csv(source)))
+
+    def columns():
+        store = AttendanceStore()
+        store.extend(read_csv(source))
+        return store
+
+    sizes = {}
+    for name, build in (("memory.tuples", tuples), ("memory.columns", columns)):
+        size = sizes[name] = allocated(build)
+        per_million = round(size / rows * 1000000)
+        bench.measure(name, rows, build, bytes=size, bytes_per_million_rows=per_million)
+        if bench.verbose:
+            print(f"{'':<28} {per_million / 2 ** 20:9.1f} MB per 1M rows", file=sys.stderr)
+
+    if bench.verbose:
+        print(f"{'':<28} {sizes['memory.tuples'] / sizes['memory.columns']:9.1f}x smaller",
+              file=sys.stderr)
+
+
+def bench_import(bench, work_dir, rows):
+    """Import a generated check-in file of ``rows`` rows"""
+    source = os.path.join(work_dir, f"import-{rows}.csv")
+    records = generate_day(generate_roster(rows), rows)
+    write_csv(source, records)
+
+    def run():
+        # A fresh directory each time, or repeats would only find duplicates
+        data_dir = tempfile.mkdtemp(prefix=f"import-{rows}-", dir=work_dir)
+        CheckinImporter(data_dir).run(source, default_date="2025-01-06")
+
+    bench.measure("import.checkins", rows, run)
+
+
+def bench_history(bench, work_dir, rows, days):
+    """Aggregate ``days`` days of ``rows`` records each"""
+    data_dir = os.path.join(work_dir, f"history-{rows}")
+    generate_data(data_dir, max(1000, rows // 4), days, rows)
+    bench.measure("history.students", rows * days, lambda: query_history(data_dir, workers=1))
+
+
+def bench_summary(bench, work_dir, rows, days):
+    """Count a term of ``days`` days of ``rows`` records each, then look totals up"""
+    data_dir = os.path.join(work_dir, f"summary-{rows}")
+    dates = generate_data(data_dir, max(1000, rows // 4), days, rows)
+    today = (date.fromisoformat(dates[-1]) + timedelta(days=1)).isoformat()
+    summary = AttendanceSummary(data_dir)
+
+    def forget():
+        path = os.path.join(data_dir, SUMMARY_NAME)
+        if os.path.exists(path):
+            os.remove(path)
+        return ()
+
+    bench.measure("summary.refresh_cold", rows * days, lambda: summary.refresh(today), setup=forget)
+    bench.measure("summary.refresh_warm", rows * days, lambda: summary.refresh(today))
+
+    lookups = 10000
+    department = DEPARTMENTS[0]
+    bench.measure("summary.lookup", lookups, lambda: [
+        (summary.department(department, term=True), summary.student("S000001", term=True))
+        for _ in range(lookups // 2)
+    ])
+
+
+def bench_analytics(bench, rows, days):
+    """Compute the reports over ``days`` days of one check-in per student for ``rows`` students"""
+    try:
+        require_numpy()
+    except ImportError as e:
+        print(f"Skipping analytics: {e}", file=sys.stderr)
+        return
+
+    roster = generate_roster(rows)
+    columns = AttendanceColumns(
+        (f"day-{day:03d}", generate_day(roster, rows, seed=day)) for day in range(days)
+    )
+    bench.measure("analytics.report", rows * days, lambda: Report(columns), students=rows, days=days)
+
+
+def bench_tk(bench, work_dir, rows):
+    """Time the application's own startup, view, search, delete and ingest paths"""
+    import tkinter as tk
+    from student_management import AttendanceSystem
+
+    data_dir = os.path.join(work_dir, f"tk-{rows}")
+    os.makedirs(os.path.join(data_dir, "attendance_data"))
+    today = datetime.now().strftime("%Y-%m-%d")
+    write_csv(csv_path(os.path.join(data_dir, "attendance_data"), today),
+              generate_day(generate_roster(max(1000, rows // 4)), rows))
+
+    cwd = os.getcwd()
+    os.chdir(data_dir)  # The application keeps its data under the working directory
+    apps = []
+
+    def close(app):
+        app.on_close()
+
+    def start():
+        if apps:
+            close(apps.pop())
+        root = tk.Tk()
+        apps.append(AttendanceSystem(root))
+        root.update()
+
+    def loaded():
+        # Startup plus the background load, until the records are on screen
+        start()
+        while apps[-1].loader is not None:
+            apps[-1].root.update()
+            time.sleep(0.005)
+
+    try:
+        bench.measure("tk.startup", rows, start)
+        bench.measure("tk.loaded", rows, loaded)
+        app = apps[0]
+        root = app.root
+
+        bench.measure("tk.view_records", rows, lambda: (app.view_records(), root.update()))
+        view_window = app.view_tree.winfo_toplevel()
+
+        for term in ("s00", "sharma"):
+            def search(term=term):
+                app.search_var.set(term)
+                app.search_records(view_window)
+                root.update()
+            bench.measure(f"tk.search.{term}", rows, search)
+
+        def delete(selected):
+            # delete_selected_records without its confirmation dialogs
+            app.run_batch(app.batches.delete, selected)
+            app.updates.flush()
+            root.update()
+
+        bench.measure("tk.delete_1pct", len(app.store) // 100, delete,
+                      setup=lambda: (list(app.store.row_ids())[::100],))
+
+        records = generate_day(generate_roster(1000, seed=1), INGEST_RATE * INGEST_SECONDS, seed=1)
+        frames = []
+
+        def ingest():
+            # Check-ins arrive at INGEST_RATE and are taken in once a frame,
+            # as an import or a busy server would deliver them
+            started = time.perf_counter()
+            fed = 0
+            while fed < len(records):
+                frame_started = time.perf_counter()
+                due = min(len(records), int((frame_started - started) * INGEST_RATE))
+                for record in records[fed:due]:
+                    row_id = app.store.add(record)
+                    app.writer.upsert(row_id, record)
+                fed = due
+                root.update()
+                frames.append(time.perf_counter() - frame_started)
+                time.sleep(max(0.0, frame_started + FRAME_SECONDS - time.perf_counter()))
+            app.updates.flush()
+            root.update()
+
+        seconds = bench.measure("tk.ingest", len(records), ingest)
+        frames.sort()
+        bench.results[-1].update(
+            fps=round(len(frames) / bench.repeat / seconds, 1),
+            frame_p99_ms=round(frames[int(0.99 * len(frames))] * 1000, 2),
+            frames_over_budget=sum(frame > FRAME_SECONDS for frame in frames),
+        )
+    finally:
+        if apps:
+            close(apps.pop())
+        os.chdir(cwd)
+
+
+def start_display():
+    """Make sure Tk has a display, starting Xvfb if needed; return the Xvfb process"""
+    if os.name == "nt" or sys.platform == "darwin" or os.environ.get("DISPLAY"):
+        return None
+    if shutil.which("Xvfb") is None:
+        return None
+    display = ":97"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def environment():
+    """Describe where the benchmarks ran"""
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(old_file, results):
+    """Print how each result changed against an earlier results file"""
+    with open(old_file, "r") as f:
+        old = {(result["name"], result["rows"]): result["seconds"] for result in json.load(f)["results"]}
+
+    for result in results:
+        before = old.get((result["name"], result["rows"]))
+        if before:
+            change = (result["seconds"] - before) / before * 100
+            print(f"{result['name']:<28} {result['rows']:>9} rows  {before * 1000:10.2f} -> "
+                  f"{result['seconds'] * 1000:10.2f} ms  {change:+6.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the attendance store, storage, search and UI paths"
+    )
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES),
+                        help="comma-separated row counts (default: 1000,100000)")
+    parser.add_argument("--backends", default="csv,sqlite")
+    parser.add_argument("--days", type=int, default=5, help="days for the history benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="keep the best of this many runs")
+    parser.add_argument("--tk", choices=("auto", "yes", "no"), default="auto",
+                        help="benchmark the Tk paths (auto: when a display or Xvfb is available)")
+    parser.add_argument("--output", help="results file (default: bench-<time>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = [backend for backend in args.backends.split(",") if backend]
+    bench = Bench(args.repeat)
+    work_dir = tempfile.mkdtemp(prefix="attendance-bench-")
+    xvfb = start_display() if args.tk != "no" else None
+
+    try:
+        for rows in sizes:
+            for backend in backends:
+                bench_storage(bench, work_dir, rows, backend)
+            bench_search(bench, rows)
+            bench_facets(bench, rows)
+            bench_memory(bench, work_dir, rows)
+            bench_import(bench, work_dir, rows)
+            bench_history(bench, work_dir, rows, args.days)
+            bench_summary(bench, work_dir, rows, args.days)
+            bench_analytics(bench, rows, args.days)
+
+            if args.tk == "yes" or (args.tk == "auto" and (os.name == "nt" or os.environ.get("DISPLAY"))):
+                bench_tk(bench, work_dir, rows)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump({"environment": environment(), "results": bench.results}, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        compare(args.compare, bench.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from attendance_journal import UPSERT, DELETE
+from attendance_kiosk import percentile
+from attendance_store import ADDED, UPDATED, DELETED, STATUSES, RecordColumns
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class ClientError(Exception):
+    """The server refused a request or could not be reached"""
+
+
+class AttendanceClient:
+    """Blocking JSON client for an ``AttendanceServer``
+
+    Requests share one keep-alive connection, which is reopened once if
+    the server closed it. A failed ``GET`` is simply sent again, but a
+    change is only resent when a reused connection turned out to be
+    closed before the server could read it; after a timeout or a bad
+    response the server may already have applied it. A lock lets the
+    writer thread and the UI thread use the same client.
+    """
+
+    def __init__(self, url=DEFAULT_URL, client_id=None, timeout=5):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.client_id = client_id or uuid.uuid4().hex
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def request(self, method, path, payload=None, query=None):
+        """Send a request and return the decoded JSON response"""
+        if query:
+            path += "?" + urlencode({key: value for key, value in query.items() if value is not None})
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"X-Client": self.client_id, "Content-Type": "application/json"}
+
+        with self._lock:
+            for attempt in (1, 2):
+                reused = self._conn is not None
+                if not reused:
+                    self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                try:
+                    self._conn.request(method, path, body, headers)
+                    response = self._conn.getresponse()
+                    data = json.loads(response.read() or b"{}")
+                    break
+                except (OSError, http.client.HTTPException, ValueError) as e:
+                    self._conn.close()
+                    self._conn = None
+                    stale = reused and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError))
+                    if attempt == 2 or not (method == "GET" or stale):
+                        raise ClientError(f"Cannot reach attendance server: {e}") from e
+
+        if response.status >= 400:
+            raise ClientError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def status(self):
+        return self.request("GET", "/status")
+
+    def records(self, **filters):
+        return self.request("GET", "/records", query=filters)
+
+    def search(self, term, limit=1000):
+        return self.request("GET", "/search", query={"q": term, "limit": limit})
+
+    def submit(self, student_id, name, department="", status="Present"):
+        return self.request("POST", "/records", {
+            "student_id": student_id, "name": name, "department": department, "status": status,
+        })
+
+    def edit(self, row_id, **fields):
+        return self.request("PUT", f"/records/{row_id}", fields)
+
+    def delete(self, row_id):
+        return self.request("DELETE", f"/records/{row_id}")
+
+    def batch(self, changes, atomic=False):
+        return self.request("POST", "/batch", {"changes": changes, "atomic": atomic})
+
+    def changes(self, since):
+        return self.request("GET", "/changes", query={"since": since, "client": self.client_id})
+
+    def compact(self):
+        return self.request("POST", "/compact", {})
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RemoteBackend:
+    """Storage backend that keeps the application's records on a server
+
+    A drop-in for ``AttendanceJournal`` that lets the Tk application run as
+    a thin client: the local store mirrors the server's day, its own
+    changes still go through the write-behind writer, and each batch is
+    sent with one ``/batch`` request. Local row IDs are mapped to the
+    server's, since records created by other clients arrive in a different
+    order. ``sync`` pulls in what other clients changed.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.compaction_error = None
+        self.csv_file = None
+        self.revision = 0
+
+        self._lock = threading.Lock()
+        self._remote = {}  # Local row ID -> server row ID
+        self._local = {}  # Server row ID -> local row ID
+
+    def load(self, store):
+        """Replace the store's contents with the server's records"""
+        data = self.client.records()
+        rows = data["records"]
+        store.set_base(RecordColumns(row[1:] for row in rows))
+
+        with self._lock:
+            self._remote = {row_id: row[0] for row_id, row in enumerate(rows)}
+            self._local = {remote: row_id for row_id, remote in self._remote.items()}
+            self.revision = data["revision"]
+
+    def upsert(self, row_id, record):
+        self.apply([(UPSERT, row_id, record)])
+
+    def delete(self, row_id):
+        self.apply([(DELETE, row_id, None)])
+
+    def apply(self, changes, atomic=False):
+        """Send a batch of ``(UPSERT|DELETE, row_id, record)`` changes
+
+        The server writes an ``atomic`` batch as one transaction.
+        """
+        with self._lock:
+            payload = [
+                {"op": op, "ref": row_id, "id": self._remote.get(row_id), "record": record}
+                for op, row_id, record in changes
+            ]
+
+        ids = self.client.batch(payload, atomic)["ids"]
+
+        with self._lock:
+            for ref, remote in ids.items():
+                self._remote[int(ref)] = remote
+                self._local[remote] = int(ref)
+            for op, row_id, _ in changes:
+                if op == DELETE:
+                    self._local.pop(self._remote.pop(row_id, None), None)
+
+    def sync(self, store, flush=None):
+        """Apply other clients' changes to the store
+
+        Returns the local row IDs that were ``(added, changed, removed)``,
+        or None when the server asked for a full reload, which has then
+        already been done. A reload renumbers the local rows, so ``flush``,
+        such as the writer's, is called first to send every change still
+        queued under the old row IDs.
+        """
+        data = self.client.changes(self.revision)
+        if data["reload"]:
+            if flush is not None:
+                flush()
+            self.load(store)
+            return None
+
+        added, changed, removed = [], [], []
+        with self._lock:
+            for revision, event, remote, record in data["changes"]:
+                row_id = self._local.get(remote)
+                if event == DELETED:
+                    if row_id is not None and row_id in store:
+                        store.delete(row_id)
+                        removed.append(row_id)
+                        del self._local[remote]
+                        self._remote.pop(row_id, None)
+                elif event in (ADDED, UPDATED):
+                    if row_id is not None and row_id in store:
+                        store.update(row_id, record)
+                        changed.append(row_id)
+                    else:
+                        row_id = store.add(tuple(record))
+                        self._remote[row_id] = remote
+                        self._local[remote] = row_id
+                        added.append(row_id)
+            self.revision = data["revision"]
+
+        return added, changed, removed
+
+    def should_compact(self):
+        """The server decides when to compact"""
+        return False
+
+    def compacting(self):
+        return False
+
+    def compact(self, rows, wait=False):
+        """Ask the server to bring its CSV file up to date"""
+        self.csv_file = self.client.compact()["csv_file"]
+
+    def wait(self):
+        """Nothing runs in the background"""
+
+    def close(self):
+        self.client.close()
+
+
+async def _load_client(host, port, requests, search_ratio, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            if rng.random() < search_ratio:
+                request = f"GET /search?q=S{rng.randrange(100)}&limit=20 HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+            else:
+                student = rng.randrange(100000)
+                body = json.dumps({
+                    "student_id": f"S{student:05d}",
+                    "name": f"Student {student}",
+                    "department": rng.choice(("CS", "EE", "ME", "CE")),
+                    "status": rng.choice(STATUSES),
+                }).encode("utf-8")
+                request = (
+                    f"POST /records HTTP/1.1\r\nHost: {host}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                ).encode() + body
+
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - started)
+            if not status_line.split(b" ", 2)[1].startswith(b"2"):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def load_test(url, clients=200, requests=50, search_ratio=0.1):
+    """Run ``clients`` concurrent connections of ``requests`` each and return a report"""
+    parts = urlsplit(url)
+    latencies = []
+    errors = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _load_client(parts.hostname, parts.port, requests, search_ratio, latencies, errors, seed)
+        for seed in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return "\n".join([
+        f"{len(latencies)} request(s) from {clients} client(s) in {elapsed:.1f}s "
+        f"({len(latencies) / elapsed:.0f}/s), {len(errors)} error(s)",
+        "latency ms p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f}".format(
+            *(1000 * percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99, 1.0))
+        ),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test an attendance server with many concurrent clients"
+    )
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--search-ratio", type=float, default=0.1,
+                        help="share of requests that are searches (default: 0.1)")
+    parser.add_argument("--local", action="store_true",
+                        help="start a throwaway server on a free port and test that")
+    args = parser.parse_args(argv)
+
+    if not args.local:
+        print(asyncio.run(load_test(args.url, args.clients, args.requests, args.search_ratio)))
+        return
+
+    from attendance_server import AttendanceServer, AttendanceService
+
+    data_dir = tempfile.mkdtemp(prefix="attendance-load-")
+    service = AttendanceService(data_dir)
+
+    async def run():
+        server = AttendanceServer(service, port=0)
+        port = await server.start()
+        try:
+            return await load_test(f"http://127.0.0.1:{port}", args.clients,
+                                   args.requests, args.search_ratio)
+        finally:
+            await server.stop()
+
+    try:
+        print(asyncio.run(run()))
+        service.close()
+        print(f"{service.writer.written} change(s) written in {service.writer.batches} batch(es)",
+              file=sys.stderr)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import time
+from functools import partial
+from itertools import islice
+
+from attendance_backend import BACKENDS, DATA_DIR, DB_NAME
+from attendance_history import filter_records
+from attendance_partitions import iter_partition, list_partitions, may_match
+from attendance_store import HEADER, STATUSES
+
+EXPORT_HEADER = ["Date", *HEADER]
+JSON_FIELDS = ("date", "student_id", "name", "department", "status", "time")
+WATERMARKS_NAME = "export_watermarks.json"
+
+# Rows written per chunk; progress is reported after each one
+CHUNK_ROWS = 5000
+
+
+def export_format(path):
+    """Return ``jsonl`` for .jsonl/.json paths, optionally gzipped, else ``csv``"""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".json")) else "csv"
+
+
+def open_output(path, compress=False):
+    """Open a file for writing text, gzip-compressed if asked"""
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def day_fingerprint(path):
+    """Return the sizes and modification times of the files holding a day
+
+    The snapshot is left out, since it is only a cache that is rewritten
+    in the background without the day changing.
+    """
+    files = [path] + sorted(glob.glob(glob.escape(path) + ".*"))
+    fingerprint = []
+    for name in files:
+        if name.endswith(".snap"):
+            continue
+        try:
+            stat = os.stat(name)
+        except OSError:
+            continue
+        fingerprint.append([os.path.basename(name), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def list_days(data_dir=DATA_DIR, start=None, end=None, backend="csv", **filters):
+    """Return ``(date, fingerprint, read)`` for each day in an inclusive range
+
+    ``read()`` yields the day's records afresh each time it is called.
+    Days in an SQLite database have no fingerprint, so they are always
+    read to find out what changed. Sealed days whose index shows no
+    record can match ``filters`` read as empty without being opened.
+    """
+    if backend == "sqlite":
+        from attendance_sqlite import SQLiteBackend
+        database = SQLiteBackend(os.path.join(data_dir, DB_NAME), None)
+
+        def read(date):
+            for row in database.query(start=date, end=date):
+                yield row[1:]
+
+        return [(date, None, partial(read, date)) for date in database.dates(start, end)]
+
+    return [
+        (date, day_fingerprint(path),
+         partial(iter_partition, path) if may_match(path, **filters) else partial(iter, ()))
+        for date, path in list_partitions(data_dir, start, end)
+    ]
+
+
+class Watermarks:
+    """How far each export target has got, kept in one JSON file
+
+    A target's watermark records, per day, the fingerprint of the day's
+    files, how many records were exported and a digest of them. It only
+    applies to exports with the same filters.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                self.targets = json.load(f)
+        except (OSError, ValueError):
+            self.targets = {}
+
+    def get(self, target, filters):
+        """Return ``{date: mark}`` for a target, empty if its filters changed"""
+        entry = self.targets.get(target)
+        if entry is None or entry["filters"] != filters:
+            return {}
+        return entry["days"]
+
+    def set(self, target, filters, days):
+        """Store a target's watermark, replacing the file atomically"""
+        self.targets[target] = {"filters": filters, "days": days}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.targets, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class ExportSummary:
+    """Counts from one export run"""
+
+    def __init__(self, path):
+        self.path = path
+        self.days = 0
+        self.unchanged = 0
+        self.rewritten = 0
+        self.rows = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        lines = [
+            f"Exported {self.rows} record(s) from {self.days} day(s) to "
+            f"{os.path.basename(self.path)} in {self.elapsed:.1f}s",
+        ]
+        if self.unchanged:
+            lines.append(f"Unchanged days skipped: {self.unchanged}")
+        if self.rewritten:
+            lines.append(f"Days exported again in full: {self.rewritten}")
+        return "\n".join(lines)
+
+
+class Exporter:
+    """Streams a range of days of attendance to a CSV or JSON Lines file
+
+    Days are read one at a time and rows are written in chunks of
+    ``CHUNK_ROWS``, so memory stays flat however long the range. Output
+    goes to a temporary file that replaces ``path`` once complete; a path
+    ending in .gz is gzip-compressed.
+
+    With a ``target`` name the export is incremental: days whose files are
+    unchanged since the target's last export are skipped, and for other
+    days only the records after those already exported are written. A day
+    whose earlier records were edited or deleted is written again in
+    full, so consumers should replace what they hold for that date.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", start=None, end=None,
+                 department=None, student_id=None, status=None):
+        self.data_dir = data_dir
+        self.backend = backend
+        self.start = start
+        self.end = end
+        self.filters = {"department": department, "student_id": student_id, "status": status}
+
+    def run(self, path, target=None, progress=None):
+        """Export to ``path`` and return an ``ExportSummary``
+
+        ``progress(days_done, days_total, rows)`` is called after every
+        chunk and every day.
+        """
+        started = time.perf_counter()
+        summary = ExportSummary(path)
+        days = list_days(self.data_dir, self.start, self.end, self.backend, **self.filters)
+        watermarks = Watermarks(os.path.join(self.data_dir, WATERMARKS_NAME)) if target else None
+        old_marks = watermarks.get(target, self.filters) if target else {}
+        marks = dict(old_marks)
+
+        tmp_path = path + ".tmp"
+        try:
+            with open_output(tmp_path, compress=path.endswith(".gz")) as f:
+                write = self._writer(f, export_format(path))
+                for done, (date, fingerprint, read) in enumerate(days):
+                    mark = old_marks.get(date)
+                    if mark is not None and fingerprint is not None and mark["source"] == fingerprint:
+                        summary.unchanged += 1
+                    else:
+                        on_chunk = partial(progress, done, len(days)) if progress else None
+                        marks[date] = self._export_day(date, fingerprint, read, mark, write,
+                                                       summary, on_chunk)
+                        summary.days += 1
+                    if progress:
+                        progress(done + 1, len(days), summary.rows)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Only move the watermark once the output is safely in place
+        if target:
+            watermarks.set(target, self.filters, marks)
+
+        summary.elapsed = time.perf_counter() - started
+        return summary
+
+    def _records(self, read):
+        return filter_records(read(), **self.filters)
+
+    def _export_day(self, date, fingerprint, read, mark, write, summary, on_chunk):
+        """Write a day's new records and return its watermark"""
+        skip = mark["rows"] if mark is not None else 0
+        digest = hashlib.blake2b(digest_size=16)
+        records = self._records(read)
+
+        if skip:
+            # Check the records already exported are still the same
+            for record in islice(records, skip):
+                digest.update(_encode(record))
+            if digest.hexdigest() != mark["digest"]:
+                summary.rewritten += 1
+                digest = hashlib.blake2b(digest_size=16)
+                records = self._records(read)
+                skip = 0
+
+        count = skip
+        while True:
+            chunk = list(islice(records, CHUNK_ROWS))
+            if not chunk:
+                break
+            for record in chunk:
+                digest.update(_encode(record))
+            write(date, chunk)
+            count += len(chunk)
+            summary.rows += len(chunk)
+            if on_chunk:
+                on_chunk(summary.rows)
+
+        return {"source": fingerprint, "rows": count, "digest": digest.hexdigest()}
+
+    def _writer(self, f, kind):
+        """Return ``write(date, records)`` for the output format"""
+        if kind == "jsonl":
+            def write(date, records):
+                f.write("".join(
+                    json.dumps(dict(zip(JSON_FIELDS, (date, *record)))) + "\n" for record in records
+                ))
+            return write
+
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_HEADER)
+        return lambda date, records: writer.writerows((date, *record) for record in records)
+
+
+def _encode(record):
+    return "\x1f".join(record).encode("utf-8") + b"\x1e"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export days of attendance to CSV or JSON Lines, optionally gzipped"
+    )
+    parser.add_argument("output", help="file to write; .jsonl for JSON Lines, add .gz to compress")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--department", help="only export this department")
+    parser.add_argument("--student", help="only export this student ID")
+    parser.add_argument("--status", choices=STATUSES, help="only export this status")
+    parser.add_argument("--target", help="export incrementally: only what is new since the "
+                                         "last export to this target")
+    args = parser.parse_args(argv)
+
+    exporter = Exporter(args.data_dir, args.backend, args.start, args.end,
+                        args.department, args.student, args.status)
+    print(exporter.run(args.output, args.target))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import sys
+from array import array
+
+from attendance_metrics import metrics
+from attendance_store import ADDED, UPDATED, DELETED, CLEARED, LOADED, STATUSES, StringPool
+
+# Record fields, by position, that can be faceted on: department and status
+FACETS = (2, 3)
+
+# Row IDs set in each possible byte of a bitmap
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def bitmap_rows(bitmap):
+    """Return the row IDs set in a bitmap, in ascending order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    rows = []
+    for index, value in enumerate(data):
+        if value == 255:
+            rows.extend(range(index << 3, (index << 3) + 8))
+        elif value:
+            base = index << 3
+            rows.extend([base + bit for bit in _BYTE_BITS[value]])
+    return rows
+
+
+def bitmap_of(row_ids):
+    """Return a bitmap with the given row IDs set"""
+    data = bytearray(max(row_ids, default=0) // 8 + 1)
+    for row_id in row_ids:
+        data[row_id >> 3] |= 1 << (row_id & 7)
+    return int.from_bytes(data, "little")
+
+
+def bitmap_filter(row_ids, bitmap):
+    """Keep the row IDs set in a bitmap, in their given order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8 + 1, "little")
+    limit = len(data) << 3
+    return [row_id for row_id in row_ids
+            if row_id < limit and data[row_id >> 3] >> (row_id & 7) & 1]
+
+
+def _value_bitmaps(codes, values):
+    """Return ``{value: bitmap}`` for an array holding a code into ``values`` per row"""
+    if len(values) <= 256:
+        # One byte per row, then per value a C-level translate to binary digits
+        low = 0 if sys.byteorder == "little" else codes.itemsize - 1
+        data = codes.tobytes()[low::codes.itemsize]
+        bitmaps = {}
+        for code, value in enumerate(values):
+            digits = data.translate(bytes(49 if byte == code else 48 for byte in range(256)))
+            bitmaps[value] = int(digits[::-1], 2)
+        return bitmaps
+
+    rows = [bytearray(len(codes) // 8 + 1) for _ in values]
+    for row_id, code in enumerate(codes):
+        rows[code][row_id >> 3] |= 1 << (row_id & 7)
+    return {value: int.from_bytes(data, "little") for value, data in zip(values, rows)}
+
+
+def _sort_value(column, value):
+    # Statuses sort in their usual order; text ignores case
+    if column == 3 and value in STATUSES:
+        return (0, STATUSES.index(value))
+    return (1, value.casefold(), value)
+
+
+class RecordIndex:
+    """Sort keys and facet bitmaps for a store's records, kept up to date with it
+
+    Every field of every row is interned as a code into a per-column
+    ``StringPool``. Sorting ranks a column's distinct values once and
+    then compares each row's precomputed rank, so it never re-reads or
+    re-parses records. Ranks are kept current as rows change, until a
+    value the column has not seen before calls for ranking again.
+
+    Each department and status value has a bitmap: a Python int with
+    bit ``row_id`` set for every live row holding the value. Values of
+    one facet combine with OR and facets combine with AND, each a single
+    big-integer operation however many rows there are. Changing one bit
+    of a big integer would copy all of it, so rows added and removed are
+    only noted, per facet value, and folded into the bitmaps together the
+    next time they are read.
+
+    Like ``SearchIndex``, an attached store is indexed lazily: loading a
+    day only marks the index stale, and the first use rebuilds it.
+    """
+
+    def __init__(self, store=None):
+        self._pools = []
+        self._codes = []
+        self._keys = {}
+        self._bitmaps = {}
+        self._pending = {}
+        self._store = None
+        self._stale = False
+        self.clear()
+
+        if store is not None:
+            self.attach(store)
+
+    def attach(self, store):
+        """Index a store's records and follow its changes"""
+        self.clear()
+        self._store = store
+        self._stale = True
+        store.subscribe(self._on_change)
+
+    def clear(self):
+        """Drop every record from the index"""
+        self._pools = [StringPool() for _ in range(5)]
+        self._codes = [array("I") for _ in range(5)]
+        self._keys = {}
+        self._bitmaps = {column: {} for column in FACETS}
+        self._pending = {column: {} for column in FACETS}
+
+    def add(self, row_id, record):
+        """Index a record"""
+        for column, value in enumerate(record):
+            codes = self._codes[column]
+            if len(codes) <= row_id:
+                codes.extend([0] * (row_id + 1 - len(codes)))
+            code = self._pools[column][value]
+            codes[row_id] = code
+
+            keys = self._keys.get(column)
+            if keys is not None:
+                ranks, row_keys = keys
+                if code >= len(ranks):
+                    del self._keys[column]  # A new value, so rank again when next sorted
+                else:
+                    if len(row_keys) <= row_id:
+                        row_keys.extend([0] * (row_id + 1 - len(row_keys)))
+                    row_keys[row_id] = ranks[code]
+
+        for column in FACETS:
+            self._pending[column].setdefault(record[column], {})[row_id] = True
+
+    def remove(self, row_id, record):
+        """Drop a record from the facet bitmaps"""
+        for column in FACETS:
+            self._pending[column].setdefault(record[column], {})[row_id] = False
+
+    def values(self, column):
+        """Return ``(value, rows)`` for each value of a facet, in sort order"""
+        self._refresh()
+        bitmaps = self._bitmaps[column]
+        return [(value, bitmaps[value].bit_count())
+                for value in sorted(bitmaps, key=lambda value: _sort_value(column, value))]
+
+    def select(self, selection):
+        """Return the bitmap of rows matching a facet selection, or None for every row
+
+        ``selection`` maps a facet column to the values to keep. A column
+        that is missing, or whose values are empty, does not filter.
+        """
+        self._refresh()
+        result = None
+        for column, values in selection.items():
+            if not values:
+                continue
+            bitmaps = self._bitmaps[column]
+            chosen = 0
+            for value in values:
+                chosen |= bitmaps.get(value, 0)
+            result = chosen if result is None else result & chosen
+        return result
+
+    def key(self, column):
+        """Return a function giving each row's sort key for a column"""
+        self._refresh()
+        keys = self._keys.get(column)
+        if keys is None:
+            pool = self._pools[column]
+            order = sorted(range(len(pool.values)),
+                           key=lambda code: _sort_value(column, pool.values[code]))
+            ranks = [0] * len(order)
+            for rank, code in enumerate(order):
+                ranks[code] = rank
+            keys = self._keys[column] = (ranks, [ranks[code] for code in self._codes[column]])
+        return keys[1].__getitem__
+
+    def sort(self, row_ids, column, reverse=False):
+        """Return row IDs sorted by a column, check-in order breaking ties"""
+        with metrics.timer("facets.sort"):
+            return sorted(row_ids, key=self.key(column), reverse=reverse)
+
+    def _refresh(self):
+        """Rebuild the index from the attached store after a load, or fold in pending rows"""
+        if not self._stale:
+            self._fold()
+            return
+        self._stale = False
+        self.clear()
+        with metrics.timer("facets.rebuild"):
+            row_ids = self._store.row_ids()
+            if not row_ids:
+                return
+            size = row_ids[-1] + 1
+
+            # A field at a time, so records are never decoded one by one
+            for column in range(len(self._codes)):
+                values = self._store.column(column)
+                codes = array("I", map(self._pools[column].__getitem__, values))
+                if len(codes) < size:
+                    # Deleted rows leave gaps, filled with any code
+                    dense = array("I", bytes(codes.itemsize * size))
+                    for row_id, code in zip(row_ids, codes):
+                        dense[row_id] = code
+                    codes = dense
+                self._codes[column] = codes
+
+            dead = 0
+            if len(row_ids) < size:
+                dead = bytearray(size // 8 + 1)
+                for row_id in set(range(size)).difference(row_ids):
+                    dead[row_id >> 3] |= 1 << (row_id & 7)
+                dead = int.from_bytes(dead, "little")
+
+            for column in FACETS:
+                bitmaps = _value_bitmaps(self._codes[column], self._pools[column].values)
+                self._bitmaps[column] = {value: bitmap & ~dead
+                                         for value, bitmap in bitmaps.items() if bitmap & ~dead}
+
+    def _fold(self):
+        """Apply the rows added and removed since the bitmaps were last read"""
+        for column in FACETS:
+            pending = self._pending[column]
+            if not pending:
+                continue
+            bitmaps = self._bitmaps[column]
+            for value, rows in pending.items():
+                bitmap = bitmaps.get(value, 0)
+                added = [row_id for row_id, present in rows.items() if present]
+                removed = [row_id for row_id, present in rows.items() if not present]
+                if added:
+                    bitmap |= bitmap_of(added)
+                if removed:
+                    bitmap &= ~bitmap_of(removed)
+                if bitmap:
+                    bitmaps[value] = bitmap
+                else:
+                    bitmaps.pop(value, None)
+            self._pending[column] = {}
+
+    def _on_change(self, event, row_id, record, old):
+        if event == LOADED:
+            self.clear()
+            self._stale = True
+        elif self._stale:
+            return  # The rebuild will pick the change up
+        elif event == ADDED:
+            self.add(row_id, record)
+        elif event == UPDATED:
+            self.remove(row_id, old)
+            self.add(row_id, record)
+        elif event == DELETED:
+            self.remove(row_id, old)
+        elif event == CLEARED:
+            self.clear()
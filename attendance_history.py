@@ -0,0 +1,196 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import itemgetter
+
+from attendance_backend import BACKENDS, DATA_DIR
+from attendance_store import STATUSES
+
+STATUS_INDEX = {status: index for index, status in enumerate(STATUSES)}
+
+# Below this many days a process pool costs more than it saves
+PARALLEL_MIN_PARTITIONS = 4
+
+
+def filter_records(records, department=None, student_id=None, status=None):
+    """Keep only the records for a department, student and/or status"""
+    for record in records:
+        if department is not None and record[2] != department:
+            continue
+        if student_id is not None and record[0] != student_id:
+            continue
+        if status is not None and record[3] != status:
+            continue
+        yield record
+
+
+def scan_days(reads, department=None, student_id=None):
+    """Count statuses per student and per department over several days
+
+    Returns ``(students, departments, names)`` where the first two map a
+    key to ``[present, absent, late]`` and ``names`` maps a student ID to
+    its latest ``(name, department)``. ``reads`` are the ``read()``
+    functions from ``attendance_export.list_days``, in date order.
+    """
+    # Counting whole keys in C is much faster than a Python loop per row.
+    # Newest days go first so a student's first key carries the latest name.
+    tallies = Counter()
+    for read in reversed(reads):
+        records = read()
+        if department is not None or student_id is not None:
+            records = filter_records(records, department, student_id)
+        tallies.update(map(itemgetter(0, 1, 2, 3), records))
+
+    students = {}
+    departments = {}
+    names = {}
+
+    for (student, name, dept, status), count in tallies.items():
+        index = STATUS_INDEX.get(status)
+        if index is None:
+            continue
+
+        counts = students.get(student)
+        if counts is None:
+            counts = students[student] = [0, 0, 0]
+        counts[index] += count
+
+        counts = departments.get(dept)
+        if counts is None:
+            counts = departments[dept] = [0, 0, 0]
+        counts[index] += count
+
+        names.setdefault(student, (name, dept))
+
+    return students, departments, names
+
+
+class History:
+    """Attendance and late counts aggregated over a range of days"""
+
+    def __init__(self):
+        self.days = []
+        self.students = {}
+        self.departments = {}
+        self.names = {}
+
+    def merge(self, dates, result):
+        """Add a ``scan_days`` result for the given days
+
+        Results must be merged in date order so the latest names win.
+        """
+        students, departments, names = result
+        self.days.extend(dates)
+        for totals, counts in ((self.students, students), (self.departments, departments)):
+            for key, (present, absent, late) in counts.items():
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = [present, absent, late]
+                else:
+                    total[0] += present
+                    total[1] += absent
+                    total[2] += late
+        self.names.update(names)
+
+    def student_rows(self):
+        """Yield a summary row per student, sorted by student ID"""
+        for student in sorted(self.students):
+            name, dept = self.names.get(student, ("", ""))
+            yield (student, name, dept, *summarize(self.students[student]))
+
+    def department_rows(self):
+        """Yield a summary row per department"""
+        for dept in sorted(self.departments):
+            yield (dept, *summarize(self.departments[dept]))
+
+
+def summarize(counts):
+    """Return counts plus attendance and late percentages for ``[present, absent, late]``"""
+    present, absent, late = counts
+    total = present + absent + late
+    attended = present + late
+    attendance = round(100.0 * attended / total, 1) if total else 0.0
+    late_rate = round(100.0 * late / attended, 1) if attended else 0.0
+    return present, absent, late, attendance, late_rate
+
+
+def query_history(data_dir=DATA_DIR, start=None, end=None, department=None,
+                  student_id=None, workers=None, backend="csv"):
+    """Aggregate attendance over the days between ``start`` and ``end``
+
+    Day files are split into runs of consecutive days that are scanned in
+    parallel across a process pool, so the parent only merges one partial
+    result per run; ``workers=1`` forces a single-process scan. Days in an
+    SQLite database are read through one connection, so in one process.
+    """
+    # Imported here, as the export module builds on this one
+    from attendance_export import list_days
+
+    days = list_days(data_dir, start, end, backend, department=department, student_id=student_id)
+    scan = partial(scan_days, department=department, student_id=student_id)
+    workers = workers or os.cpu_count() or 1
+    history = History()
+
+    if workers == 1 or len(days) < PARALLEL_MIN_PARTITIONS or backend == "sqlite":
+        history.merge([date for date, _, _ in days], scan([read for _, _, read in days]))
+        return history
+
+    # A few runs per worker balance the load without many merges
+    runs = min(len(days), 2 * workers)
+    size = -(-len(days) // runs)
+    chunks = [days[i:i + size] for i in range(0, len(days), size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(scan, [[read for _, _, read in chunk] for chunk in chunks])
+        for chunk, result in zip(chunks, results):
+            history.merge([date for date, _, _ in chunk], result)
+
+    return history
+
+
+STUDENT_HEADER = ["Student ID", "Name", "Department", "Present", "Absent", "Late",
+                  "Attendance %", "Late %"]
+DEPARTMENT_HEADER = ["Department", "Present", "Absent", "Late", "Attendance %", "Late %"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Attendance and late percentages across days of attendance data"
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--by", choices=("student", "department"), default="student")
+    parser.add_argument("--department", help="only count this department")
+    parser.add_argument("--student", help="only count this student ID")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    args = parser.parse_args(argv)
+
+    history = query_history(args.data_dir, args.start, args.end, args.department,
+                            args.student, args.workers, args.backend)
+
+    if args.by == "student":
+        header, rows = STUDENT_HEADER, history.student_rows()
+    else:
+        header, rows = DEPARTMENT_HEADER, history.department_rows()
+
+    if args.format == "json":
+        json.dump([dict(zip(header, row)) for row in rows], sys.stdout, indent=2)
+        print()
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    print(f"{len(history.days)} day(s) scanned", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+from attendance_backend import BACKENDS, DATA_DIR, open_backend
+from attendance_journal import UPSERT
+from attendance_roster import read_roster, roster_path, write_roster
+from attendance_store import AttendanceStore, validate_record
+
+CHECKIN_FIELDS = ("student_id", "name", "department", "status", "time", "date")
+ROSTER_FIELDS = ("student_id", "name", "department")
+
+# Column names and JSON keys accepted for each field, lowercased
+ALIASES = {
+    "student id": "student_id", "student_id": "student_id", "id": "student_id",
+    "name": "name", "student name": "name", "student_name": "name",
+    "department": "department", "dept": "department",
+    "status": "status",
+    "time": "time",
+    "date": "date",
+}
+
+# Rows handed to a day's sink at a time
+BATCH_SIZE = 5000
+
+
+class HeaderError(ValueError):
+    """A CSV file's header names columns but none holds the student ID"""
+
+
+def read_rows(path, fields):
+    """Yield ``(line, values)`` for each row of a CSV or JSON Lines file
+
+    ``values`` holds the row's ``fields`` in order, with missing ones left
+    empty. CSV files may start with a header naming their columns in any
+    order; without one the columns are taken to be ``fields`` in order.
+    A first row that names other columns but no student ID column raises
+    ``HeaderError`` rather than being read as data. Files ending in
+    ``.jsonl`` or ``.json`` hold one object per line. Rows that cannot be
+    parsed are yielded with ``values`` set to None.
+    """
+    if os.path.splitext(path)[1].lower() in (".jsonl", ".json"):
+        yield from _read_jsonl(path, fields)
+    else:
+        yield from _read_csv(path, fields)
+
+
+def _read_csv(path, fields):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        rows = reader
+
+        columns = [ALIASES.get(cell.strip().lower()) for cell in first]
+        if "student_id" in columns:
+            indices = [columns.index(field) if field in columns else None for field in fields]
+        elif any(columns):
+            names = ", ".join(alias for alias, field in ALIASES.items() if field == "student_id")
+            raise HeaderError(f"{os.path.basename(path)}: the header has no student ID column "
+                              f"(name it one of: {names})")
+        else:
+            # No header, so the first row is data
+            indices = list(range(len(fields)))
+            rows = _chain_first(first, reader)
+
+        width = max(index for index in indices if index is not None) + 1
+        for row in rows:
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            yield reader.line_num, [row[index] if index is not None else "" for index in indices]
+
+
+def _chain_first(first, reader):
+    yield first
+    yield from reader
+
+
+def _read_jsonl(path, fields):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None
+                continue
+
+            values = {ALIASES.get(key.strip().lower(), key): value for key, value in data.items()}
+            yield line_number, [
+                "" if values.get(field) is None else str(values[field]) for field in fields
+            ]
+
+
+class ImportSummary:
+    """Counts and error file from one import run"""
+
+    def __init__(self, path):
+        self.path = path
+        self.read = 0
+        self.imported = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.days = set()
+        self.error_file = None
+        self.elapsed = 0.0
+
+    def __str__(self):
+        lines = [
+            f"Read {self.read} row(s) from {os.path.basename(self.path)} "
+            f"in {self.elapsed:.1f}s",
+            f"Imported: {self.imported}",
+        ]
+        if self.updated:
+            lines.append(f"Updated: {self.updated}")
+        lines.append(f"Skipped duplicates: {self.duplicates}")
+        lines.append(f"Rejected: {self.invalid}")
+        if self.days:
+            lines.append(f"Days: {', '.join(sorted(self.days))}")
+        if self.error_file:
+            lines.append(f"Problems written to {self.error_file}")
+        return "\n".join(lines)
+
+
+class _Errors:
+    """Error file that is only created once the first problem is reported"""
+
+    def __init__(self, path, summary):
+        self.path = path
+        self.summary = summary
+        self._file = None
+        self._writer = None
+
+    def add(self, line, reason, values):
+        if self._file is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["Line", "Problem", "Row"])
+            self.summary.error_file = self.path
+        self._writer.writerow([line, reason, *(values or ())])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def error_path(path):
+    """Return the default error file for an input file"""
+    return os.path.splitext(path)[0] + ".errors.csv"
+
+
+class BackendDay:
+    """Import target that writes a day straight to its storage backend
+
+    The day is loaded once so its existing student IDs can be skipped and
+    new rows get row IDs that follow the ones already on disk. Each batch
+    is persisted with a single ``apply``; a compaction runs at the end if
+    the journal has grown large.
+    """
+
+    def __init__(self, kind, data_dir, date):
+        self.store = AttendanceStore()
+        self.backend = open_backend(kind, data_dir, date)
+        self.backend.load(self.store)
+        self.student_ids = {record[0] for record in self.store.records()}
+
+    def add(self, records):
+        """Persist a batch of new records"""
+        self.backend.apply([(UPSERT, self.store.add(record), record) for record in records])
+
+    def close(self):
+        """Compact if needed and close the backend"""
+        if self.backend.should_compact():
+            self.backend.compact(list(self.store.items()), wait=True)
+        self.backend.wait()
+        self.backend.close()
+        if self.backend.compaction_error is not None:
+            raise self.backend.compaction_error
+
+
+class CheckinImporter:
+    """Streams check-ins from a file into the days they belong to
+
+    Every row is validated with the same rules as Submit. A student who
+    already has a record for a day, either on disk or earlier in the same
+    file, is skipped as a duplicate. Accepted rows are buffered per day
+    and handed over ``batch_size`` at a time, so a large file never sits
+    in memory at once and each batch is persisted in one write.
+
+    Days are written by ``BackendDay`` unless a target has been attached
+    for them with ``attach``; the application uses that to feed the day
+    it has open through its own store and writer. With ``other_days``
+    unset, rows for days without an attached target are rejected.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", batch_size=BATCH_SIZE, other_days=True):
+        self.data_dir = data_dir
+        self.backend = backend
+        self.batch_size = batch_size
+        self.other_days = other_days
+        self._targets = {}
+        self._owned = []
+
+    def attach(self, date, student_ids, add):
+        """Send a day's accepted records to ``add(records)`` instead of a backend"""
+        self._targets[date] = (set(student_ids), add)
+
+    def run(self, path, errors=None, default_date=None, progress=None):
+        """Import a file and return an ``ImportSummary``
+
+        Rows without a date go to ``default_date`` (today) and rows without
+        a time get the current time. ``progress(summary)`` is called after
+        every batch.
+        """
+        started = datetime.now()
+        default_date = default_date or started.strftime("%Y-%m-%d")
+        default_time = started.strftime("%H:%M:%S")
+
+        summary = ImportSummary(path)
+        error_file = _Errors(errors or error_path(path), summary)
+        pending = {}
+        valid_dates = set()
+
+        try:
+            for line, values in read_rows(path, CHECKIN_FIELDS):
+                summary.read += 1
+                if values is None:
+                    summary.invalid += 1
+                    error_file.add(line, "Not a valid row", values)
+                    continue
+
+                student_id, name, department, status, time, date = (value.strip() for value in values)
+                date = date or default_date
+                record = (student_id, name, department, status.capitalize() or "Present",
+                          time or default_time)
+
+                problem = validate_record(record)
+                if problem is None and date not in valid_dates:
+                    if _valid_date(date):
+                        valid_dates.add(date)
+                    else:
+                        problem = "Date must be YYYY-MM-DD"
+                if problem is not None:
+                    summary.invalid += 1
+                    error_file.add(line, problem, values)
+                    continue
+
+                target = self._target(date)
+                if target is None:
+                    summary.invalid += 1
+                    error_file.add(line, f"Only {', '.join(sorted(self._targets))} can be imported here", values)
+                    continue
+                student_ids, add = target
+                if student_id in student_ids:
+                    summary.duplicates += 1
+                    error_file.add(line, "Already recorded for this day", values)
+                    continue
+                student_ids.add(student_id)
+
+                batch = pending.setdefault(date, [])
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self._flush(date, pending, summary, progress)
+
+            for date in list(pending):
+                self._flush(date, pending, summary, progress)
+        finally:
+            error_file.close()
+            self.close()
+
+        summary.elapsed = (datetime.now() - started).total_seconds()
+        return summary
+
+    def close(self):
+        """Close the backends opened for the import"""
+        owned, self._owned = self._owned, []
+        self._targets.clear()
+        for day in owned:
+            day.close()
+
+    def _target(self, date):
+        target = self._targets.get(date)
+        if target is None and self.other_days:
+            day = BackendDay(self.backend, self.data_dir, date)
+            self._owned.append(day)
+            target = self._targets[date] = (day.student_ids, day.add)
+        return target
+
+    def _flush(self, date, pending, summary, progress):
+        batch = pending.pop(date)
+        if not batch:
+            return
+        self._targets[date][1](batch)
+        summary.imported += len(batch)
+        summary.days.add(date)
+        if progress is not None:
+            progress(summary)
+
+
+def _valid_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") == value
+    except ValueError:
+        return False
+
+
+def import_roster(path, data_dir=DATA_DIR, errors=None):
+    """Merge students from a CSV or JSON Lines file into the roster
+
+    New students are added and known ones take the file's name and
+    department. Rows missing an ID or name are rejected; rows identical to
+    the roster are counted as duplicates.
+    """
+    started = datetime.now()
+    summary = ImportSummary(path)
+    error_file = _Errors(errors or error_path(path), summary)
+    target = roster_path(data_dir)
+    students = read_roster(target)
+
+    try:
+        for line, values in read_rows(path, ROSTER_FIELDS):
+            summary.read += 1
+            if values is None:
+                summary.invalid += 1
+                error_file.add(line, "Not a valid row", values)
+                continue
+
+            student = tuple(value.strip() for value in values)
+            if not student[0] or not student[1]:
+                summary.invalid += 1
+                error_file.add(line, "Student ID and Name are required!", values)
+                continue
+
+            known = students.get(student[0])
+            if known == student:
+                summary.duplicates += 1
+                continue
+            if known is None:
+                summary.imported += 1
+            else:
+                summary.updated += 1
+            students[student[0]] = student
+    finally:
+        error_file.close()
+
+    if summary.imported or summary.updated:
+        os.makedirs(data_dir, exist_ok=True)
+        write_roster(target, students)
+
+    summary.elapsed = (datetime.now() - started).total_seconds()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import check-ins or a student roster from CSV or JSON Lines"
+    )
+    parser.add_argument("kind", choices=("checkins", "roster"))
+    parser.add_argument("file", help="CSV file, optionally with a header naming its columns, "
+                                     "or JSON Lines; a CSV header must name the student ID "
+                                     "column as Student ID or ID")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--date", help="day for rows without a date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--errors", help="where to write rejected rows (default: <file>.errors.csv)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.kind == "roster":
+            summary = import_roster(args.file, args.data_dir, args.errors)
+        else:
+            os.makedirs(args.data_dir, exist_ok=True)
+            importer = CheckinImporter(args.data_dir, args.backend)
+            summary = importer.run(args.file, args.errors, args.date)
+    except HeaderError as e:
+        parser.error(str(e))
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import csv
+import os
+import threading
+
+from attendance_metrics import metrics
+from attendance_snapshot import open_snapshot, snapshot_path, write_snapshot
+from attendance_store import RecordColumns, read_csv, write_csv
+
+UPSERT = "U"
+DELETE = "D"
+
+# Markers around the entries of a transaction (``B,<entries>`` ... ``C,<entries>``)
+BEGIN = "B"
+COMMIT = "C"
+
+
+def unfinished_transaction(data):
+    """Return the offset of a transaction at the end of log bytes that was never committed
+
+    Returns None when every transaction in ``data`` is committed.
+    """
+    marker = BEGIN.encode() + b","
+    begin = data.rfind(b"\n" + marker) + 1
+    if begin == 0 and not data.startswith(marker):
+        return None
+    if data.find(b"\n" + COMMIT.encode() + b",", begin) != -1:
+        return None
+    return begin
+
+
+def iter_journal(path, repair=False):
+    """Yield ``(UPSERT|DELETE, disk_id, record)`` entries from a journal file
+
+    A torn final entry is skipped, as is a transaction with no commit
+    marker, since it was cut short or is still being written. With
+    ``repair`` both are also cut off the file so later appends start
+    clean.
+    """
+    if not os.path.isfile(path):
+        return
+
+    if repair:
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            begin = unfinished_transaction(data[:end])
+            if begin is not None:
+                end = begin
+            if end < len(data):
+                f.truncate(end)
+
+    with open(path, "r", newline="") as f:
+        pending = None
+        for entry in csv.reader(f):
+            if entry and entry[0] == BEGIN:
+                pending = []
+                continue
+            if entry and entry[0] == COMMIT:
+                if pending is not None:
+                    yield from pending
+                pending = None
+                continue
+
+            try:
+                disk_id = int(entry[1])
+            except (IndexError, ValueError):
+                continue
+
+            if entry[0] == UPSERT and len(entry) == 7:
+                change = (UPSERT, disk_id, tuple(entry[2:]))
+            elif entry[0] == DELETE:
+                change = (DELETE, disk_id, None)
+            else:
+                continue
+            if pending is None:
+                yield change
+            else:
+                pending.append(change)
+
+
+def replay_journal(path, rows, next_disk_id=0, repair=False):
+    """Apply a journal file to a ``{disk_id: record}`` dict
+
+    Returns the next free disk ID and the number of entries applied.
+    """
+    count = 0
+    for op, disk_id, record in iter_journal(path, repair):
+        if op == UPSERT:
+            rows[disk_id] = record
+        else:
+            rows.pop(disk_id, None)
+        next_disk_id = max(next_disk_id, disk_id + 1)
+        count += 1
+    return next_disk_id, count
+
+
+class _DiskIds:
+    """Maps store row IDs to the disk IDs used in the journal
+
+    Right after a load, the store's base rows are numbered exactly like
+    the base file, so their disk IDs are implied rather than stored. Only
+    rows numbered differently (added later, or renumbered by a compaction)
+    take space in the dict.
+    """
+
+    def __init__(self, implied=0):
+        self.implied = implied
+        self.explicit = {}
+        self.dropped = set()
+
+    def get(self, row_id):
+        disk_id = self.explicit.get(row_id)
+        if disk_id is None and row_id < self.implied and row_id not in self.dropped:
+            disk_id = row_id
+        return disk_id
+
+    def set(self, row_id, disk_id):
+        self.explicit[row_id] = disk_id
+
+    def pop(self, row_id):
+        disk_id = self.get(row_id)
+        if disk_id is not None:
+            self.explicit.pop(row_id, None)
+            if row_id < self.implied:
+                self.dropped.add(row_id)
+        return disk_id
+
+
+def read_day(csv_file):
+    """Return a day's live records without modifying any of its files"""
+    pending_file = csv_file + ".journal.1"
+    tmp_file = csv_file + ".tmp"
+    base_file = csv_file
+
+    interrupted = os.path.isfile(pending_file)
+    if not interrupted and os.path.isfile(tmp_file):
+        # Compaction wrote the new base but did not rename it yet
+        base_file = tmp_file
+
+    rows = dict(enumerate(read_csv(base_file)))
+    if interrupted:
+        replay_journal(pending_file, rows, len(rows))
+        rows = dict(enumerate(rows.values()))
+    replay_journal(csv_file + ".journal", rows, len(rows))
+    return list(rows.values())
+
+
+class AttendanceJournal:
+    """Append-only change log kept next to a day's attendance CSV
+
+    The CSV file is the compacted base: its data rows are numbered from 0
+    in file order. Every change after that is appended to
+    ``<csv>.journal`` as an upsert (``U,<n>,<record fields>``) or a
+    tombstone (``D,<n>``), so editing or deleting a record costs one short
+    append instead of a rewrite of the whole day.
+
+    Once the journal grows past ``max(compact_min, compact_ratio * base
+    rows)`` entries it should be compacted: the journal is rotated to
+    ``<csv>.journal.1``, the live records are written to ``<csv>.tmp`` in
+    a background thread, and the temporary file is atomically renamed over
+    the CSV. ``load`` recognises every state a crash can leave behind:
+
+    * ``.journal.1`` present: the base is still the old one, so the
+      rotated journal is replayed and the compaction is finished.
+    * only ``.tmp`` present: it was fully written, so it becomes the base.
+
+    Every base file also gets a binary snapshot (``attendance_<date>.snap``)
+    written after it. When the snapshot still matches the CSV, ``load``
+    hands it to the store as a lazily decoded base instead of parsing the
+    CSV, so loading costs the same however many records the day has. A
+    missing or stale snapshot is rebuilt from the CSV in the background.
+    """
+
+    def __init__(self, csv_file, compact_min=1000, compact_ratio=1.0, fsync=False):
+        self.csv_file = csv_file
+        self.journal_file = csv_file + ".journal"
+        self.pending_file = csv_file + ".journal.1"
+        self.tmp_file = csv_file + ".tmp"
+        self.snapshot_file = snapshot_path(csv_file)
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self.compaction_error = None
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._disk_ids = _DiskIds()
+        self._next_disk_id = 0
+        self._base_rows = 0
+        self._entries = 0
+        self._compactor = None
+        self._pending_records = None  # Base still to be installed over the rotated journal
+
+    def load(self, store):
+        """Replace the store's contents with the day's records"""
+        self.close()
+
+        if os.path.isfile(self.pending_file):
+            # Finish the interrupted compaction
+            if os.path.isfile(self.tmp_file):
+                os.remove(self.tmp_file)
+            rows = dict(enumerate(read_csv(self.csv_file)))
+            replay_journal(self.pending_file, rows, len(rows), repair=True)
+            base = self._pending_records = list(rows.values())
+            self._install_base(base)
+        else:
+            if os.path.isfile(self.tmp_file):
+                os.replace(self.tmp_file, self.csv_file)
+            elif not os.path.isfile(self.csv_file):
+                # A new day; readers find days by their CSV file
+                write_csv(self.csv_file, [])
+            base = open_snapshot(self.snapshot_file, self.csv_file)
+            if base is None:
+                base = RecordColumns(read_csv(self.csv_file))
+                if os.path.isfile(self.csv_file):
+                    self._start_compactor(self._write_snapshot, base)
+
+        store.set_base(base)
+        self._base_rows = len(base)
+        self._disk_ids = _DiskIds(len(base))
+        self._next_disk_id, self._entries = self._replay_into(store)
+
+        self._open()
+
+    def upsert(self, row_id, record):
+        """Record that a row was added or changed"""
+        self.apply([(UPSERT, row_id, record)])
+
+    def delete(self, row_id):
+        """Record a tombstone for a deleted row"""
+        self.apply([(DELETE, row_id, None)])
+
+    def apply(self, changes, atomic=False):
+        """Append a batch of ``(UPSERT|DELETE, row_id, record)`` changes
+
+        The whole batch is written and flushed (and optionally fsynced)
+        once, which is what makes group commit cheap. An ``atomic`` batch
+        is bracketed by transaction markers, so a crash part way through
+        leaves none of it behind.
+        """
+        with self._lock, metrics.timer("journal.apply"):
+            if self._file is None:
+                self._open()
+            if metrics.enabled:
+                size = os.fstat(self._file.fileno()).st_size
+
+            if atomic:
+                self._writer.writerow([BEGIN, len(changes)])
+            for op, row_id, record in changes:
+                if op == UPSERT:
+                    disk_id = self._disk_ids.get(row_id)
+                    if disk_id is None:
+                        disk_id = self._next_disk_id
+                        self._disk_ids.set(row_id, disk_id)
+                        self._next_disk_id += 1
+                    self._writer.writerow([UPSERT, disk_id, *record])
+                else:
+                    disk_id = self._disk_ids.pop(row_id)
+                    if disk_id is None:
+                        continue
+                    self._writer.writerow([DELETE, disk_id])
+                self._entries += 1
+            if atomic:
+                self._writer.writerow([COMMIT, len(changes)])
+
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            if metrics.enabled:
+                metrics.count("journal.rows", len(changes))
+                metrics.count("journal.bytes", os.fstat(self._file.fileno()).st_size - size)
+
+    def should_compact(self):
+        """Return True once replaying the journal costs more than the base"""
+        limit = max(self.compact_min, self.compact_ratio * self._base_rows)
+        return self._entries >= limit and not self.compacting()
+
+    def compacting(self):
+        """Return True while a background compaction is running"""
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact(self, rows, wait=False):
+        """Fold the journal into a fresh base file
+
+        ``rows`` is a snapshot of ``(row_id, record)`` pairs in display
+        order, taken from the store after every change has been journaled.
+        Only the journal rotation happens on the calling thread; the base
+        file is written in the background unless ``wait`` is set.
+
+        While an earlier compaction has not been installed, its rotated
+        journal is the only copy of those entries, so that install is
+        retried first and nothing is rotated if it fails again;
+        ``compaction_error`` then says why.
+        """
+        self.wait()
+
+        if os.path.isfile(self.pending_file):
+            if self._pending_records is not None:
+                self._install_base(self._pending_records)
+            if os.path.isfile(self.pending_file):
+                return
+
+        with self._lock, metrics.timer("journal.rotate"):
+            if self._file is None:
+                self._open()
+            self._file.close()
+            os.replace(self.journal_file, self.pending_file)
+
+            records = []
+            self._disk_ids = _DiskIds()
+            for row_id, record in rows:
+                self._disk_ids.set(row_id, len(records))
+                records.append(record)
+
+            self._next_disk_id = self._base_rows = len(records)
+            self._pending_records = records
+            self._entries = 0
+            self._open()
+
+        self.compaction_error = None
+        self._start_compactor(self._install_base, records)
+
+        if wait:
+            self.wait()
+
+    def wait(self):
+        """Block until a running compaction has finished"""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def close(self):
+        """Finish any compaction and close the journal file"""
+        self.wait()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _start_compactor(self, target, records):
+        self._compactor = threading.Thread(
+            target=target,
+            args=(records,),
+            name="journal-compaction",
+            daemon=True
+        )
+        self._compactor.start()
+
+    def _replay_into(self, store):
+        """Apply the journal to a freshly loaded store
+
+        Returns the next free disk ID and the number of entries applied.
+        """
+        next_disk_id = self._base_rows
+        count = 0
+        row_ids = {}  # Disk ID to row ID for rows not numbered like the base
+
+        for op, disk_id, record in iter_journal(self.journal_file, repair=True):
+            row_id = row_ids.get(disk_id)
+            if row_id is None and disk_id < self._base_rows and disk_id in store:
+                row_id = disk_id
+
+            if op == UPSERT:
+                if row_id is None:
+                    row_id = row_ids[disk_id] = store.add(record)
+                    self._disk_ids.set(row_id, disk_id)
+                else:
+                    store.update(row_id, record)
+            elif row_id is not None:
+                store.delete(row_id)
+                self._disk_ids.pop(row_id)
+                row_ids.pop(disk_id, None)
+
+            next_disk_id = max(next_disk_id, disk_id + 1)
+            count += 1
+
+        return next_disk_id, count
+
+    def _open(self):
+        self._file = open(self.journal_file, "a", newline="")
+        self._writer = csv.writer(self._file)
+
+    def _install_base(self, records):
+        try:
+            with metrics.timer("journal.compact"):
+                write_csv(self.tmp_file, records)
+            with open(self.tmp_file, "rb+") as f:
+                os.fsync(f.fileno())
+
+            # Once the rotated journal is gone the temporary file is the
+            # only complete copy, so load() will promote it after a crash
+            os.remove(self.pending_file)
+            os.replace(self.tmp_file, self.csv_file)
+            self._pending_records = None
+            if metrics.enabled:
+                metrics.count("journal.compact_bytes", os.path.getsize(self.csv_file))
+        except OSError as e:
+            self.compaction_error = e
+            return
+
+        self._write_snapshot(records)
+
+    def _write_snapshot(self, records):
+        # Snapshots are only a cache of the CSV, so failing to write one is harmless
+        try:
+            write_snapshot(self.snapshot_file, records, self.csv_file)
+        except OSError:
+            pass
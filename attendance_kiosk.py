@@ -0,0 +1,216 @@
+import argparse
+import os
+import sys
+import time
+from array import array
+from datetime import datetime
+
+from attendance_backend import BACKENDS, DATA_DIR, open_backend
+from attendance_metrics import metrics
+from attendance_partitions import PartitionManager
+from attendance_roster import Roster, roster_path
+from attendance_store import AttendanceStore, parse_time
+from attendance_writer import AttendanceWriter
+
+# Results reported for each scan
+RECORDED = "OK"
+COOLDOWN = "COOLDOWN"
+UNKNOWN = "UNKNOWN"
+
+# Seconds after a check-in during which further scans of the badge are ignored
+COOLDOWN_SECONDS = 300
+
+
+def percentile(ordered, fraction):
+    """Return the value below which ``fraction`` of a sorted list falls"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Kiosk:
+    """Records badge scans without a user interface
+
+    Each scan is a student ID. It is looked up in the roster, ignored if
+    the student checked in less than ``cooldown`` seconds ago, and
+    otherwise added to the day's store and queued on the same write-behind
+    writer the application uses, so a burst of scans costs one group
+    commit rather than one write each. Scans after ``late_after``
+    (``HH:MM:SS``) are recorded as Late.
+
+    The time each scan takes from being read to being queued is kept so
+    ``report`` can give latency percentiles. When the date changes the
+    writer is drained, the next day is opened and finished days are
+    sealed in the background.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", cooldown=COOLDOWN_SECONDS,
+                 late_after=None, fsync=False):
+        self.data_dir = data_dir
+        self.backend_kind = backend
+        self.cooldown = cooldown
+        self.late_after = parse_time(late_after) if late_after else None
+        self.fsync = fsync
+
+        self.roster = Roster(roster_path(data_dir))
+        self.roster.load()
+        self.partitions = PartitionManager(data_dir, backend)
+
+        self.date = None
+        self.store = None
+        self.backend = None
+        self.writer = None
+        self.last_seen = {}
+
+        self.counts = {RECORDED: 0, COOLDOWN: 0, UNKNOWN: 0}
+        self.written = 0
+        self.batches = 0
+        self.latencies = array("d")
+        self.started = time.perf_counter()
+
+    def open_day(self, date):
+        """Close the current day, if any, and start recording ``date``"""
+        self.close_day()
+        self.date = date
+        self.store = AttendanceStore()
+        self.backend = open_backend(self.backend_kind, self.data_dir, date, fsync=self.fsync)
+        self.backend.load(self.store)
+        self.writer = AttendanceWriter(self.backend)
+        self.writer.start()
+        self.partitions.seal_async()
+
+        # Check-ins already on disk start their cooldown from their recorded time
+        self.last_seen = {}
+        for record in self.store.records():
+            seconds = parse_time(record[4])
+            if seconds is not None:
+                self.last_seen[record[0]] = max(seconds, self.last_seen.get(record[0], seconds))
+
+    def close_day(self):
+        """Write everything queued for the current day and close its storage"""
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.backend.wait()
+        self.backend.close()
+        self.written += self.writer.written
+        self.batches += self.writer.batches
+        error = self.writer.error or self.backend.compaction_error
+        self.writer = self.backend = self.store = None
+        if error is not None:
+            raise error
+
+    def scan(self, student_id, received=None):
+        """Record one scan and return ``(result, record)``"""
+        received = received or time.perf_counter()
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d")
+        if date != self.date:
+            self.open_day(date)
+
+        student = self.roster.get(student_id)
+        if student is None:
+            self.counts[UNKNOWN] += 1
+            return UNKNOWN, None
+
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        last = self.last_seen.get(student_id)
+        if last is not None and seconds - last < self.cooldown:
+            self.counts[COOLDOWN] += 1
+            return COOLDOWN, None
+        self.last_seen[student_id] = seconds
+
+        late = self.late_after is not None and seconds > self.late_after
+        record = (*student, "Late" if late else "Present", now.strftime("%H:%M:%S"))
+        row_id = self.store.add(record)
+        self.writer.upsert(row_id, record)
+        if self.backend.should_compact() and not self.writer.compaction_queued():
+            self.writer.compact(list(self.store.items()))
+
+        latency = time.perf_counter() - received
+        self.counts[RECORDED] += 1
+        self.latencies.append(latency)
+        metrics.observe("kiosk.scan", latency)
+        return RECORDED, record
+
+    def run(self, stream, out=None):
+        """Record every ID read from ``stream``, one per line, until it ends"""
+        for line in iter(stream.readline, ""):
+            received = time.perf_counter()
+            student_id = line.strip()
+            if not student_id:
+                continue
+
+            result, record = self.scan(student_id, received)
+            if out is not None:
+                if record is None:
+                    out.write(f"{result} {student_id}\n")
+                else:
+                    out.write(f"{result} {record[0]} {record[1]} {record[3]} {record[4]}\n")
+                out.flush()
+
+    def report(self):
+        """Return throughput, result counts and latency percentiles"""
+        elapsed = time.perf_counter() - self.started
+        scans = sum(self.counts.values())
+        ordered = sorted(self.latencies)
+        lines = [
+            f"{scans} scan(s) in {elapsed:.1f}s ({scans / elapsed if elapsed else 0:.0f}/s)",
+            ", ".join(f"{result}: {count}" for result, count in self.counts.items()),
+            "latency ms p50 {:.3f}  p95 {:.3f}  p99 {:.3f}  max {:.3f}".format(
+                *(1000 * percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99, 1.0))
+            ),
+        ]
+        written, batches = self.written, self.batches
+        if self.writer is not None:
+            written += self.writer.written
+            batches += self.writer.batches
+        lines.append(f"{written} change(s) written in {batches} batch(es)")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Record badge scans read one student ID per line, without a window"
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file, FIFO or device to read IDs from (default: stdin)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--cooldown", type=float, default=COOLDOWN_SECONDS,
+                        help="seconds to ignore repeat scans of a badge (default: 300)")
+    parser.add_argument("--late-after", help="record scans after this HH:MM:SS as Late")
+    parser.add_argument("--fsync", action="store_true", help="fsync every batch")
+    parser.add_argument("--quiet", action="store_true", help="do not print a line per scan")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="dump timings to FILE every few seconds (Prometheus text for .prom); "
+                             "SIGUSR1 toggles a cProfile capture")
+    args = parser.parse_args(argv)
+
+    if args.late_after and parse_time(args.late_after) is None:
+        parser.error("--late-after must be HH:MM:SS")
+
+    if args.metrics:
+        metrics.start_dump(args.metrics)
+        metrics.install_profile_signal()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    kiosk = Kiosk(args.data_dir, args.backend, args.cooldown, args.late_after, args.fsync)
+    out = None if args.quiet else sys.stdout
+
+    try:
+        if args.input == "-":
+            kiosk.run(sys.stdin, out)
+        else:
+            with open(args.input, "r") as stream:
+                kiosk.run(stream, out)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        kiosk.close_day()
+        metrics.stop_dump()
+        print(kiosk.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
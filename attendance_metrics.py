@@ -0,0 +1,263 @@
+import cProfile
+import json
+import os
+import re
+import signal
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Seconds between dumps to the metrics file
+DUMP_INTERVAL = 10
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, plus their sum"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding a percentile"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class _Timer:
+    """Context manager recording its duration into a histogram"""
+
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    """Stands in for ``_Timer`` while metrics are off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Opt-in latency histograms, counters and gauges for the whole process
+
+    Everything is off until ``enable`` is called; until then ``timer``
+    hands back a shared no-op context manager and ``observe``/``count``
+    return after a single attribute check, so instrumented code costs next
+    to nothing. Callers that would do extra work to compute a value, like
+    a byte count, check ``enabled`` first.
+
+    Names are dotted (``journal.apply``). ``start_dump`` writes a snapshot
+    to a file every few seconds, as JSON or, for files ending in
+    ``.prom``, the Prometheus text format. ``toggle_profile`` starts and
+    stops a cProfile capture of the calling thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.time()
+
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+        self._profile = None
+        self._profile_path = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self.started = time.time()
+
+    def observe(self, name, seconds):
+        """Record a latency"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        """Set a value that can go up and down"""
+        if not self.enabled:
+            return
+        self._gauges[name] = value
+
+    def timer(self, name):
+        """Return a context manager that records how long its block took"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self):
+        """Return everything recorded so far as plain data"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "time": time.time(),
+                "histograms": {name: histogram.to_dict()
+                               for name, histogram in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+                "gauges": dict(sorted(self._gauges.items())),
+            }
+
+    def to_prometheus(self):
+        """Return the current metrics in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = _metric_name(name) + "_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, value in sorted(self._gauges.items()):
+                metric = _metric_name(name)
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+            for name, histogram in sorted(self._histograms.items()):
+                metric = _metric_name(name) + "_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the current metrics to a file, replacing it atomically"""
+        if path.endswith(".prom"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=2)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def start_dump(self, path, interval=DUMP_INTERVAL):
+        """Enable metrics and dump them to ``path`` every ``interval`` seconds"""
+        self.enable()
+        self.stop_dump()
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                self.dump(path)
+            self.dump(path)  # One last time on the way out
+
+        self._dump_thread = threading.Thread(target=run, name="attendance-metrics", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        """Stop the dump thread after a final dump"""
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def profiling(self):
+        """Return True while a cProfile capture is running"""
+        return self._profile is not None
+
+    def toggle_profile(self, path=None):
+        """Start profiling the calling thread, or stop and save the capture
+
+        Returns the ``.prof`` file written when a capture stops, or None
+        when one starts. Open captures with ``python -m pstats FILE``.
+        """
+        if self._profile is None:
+            self._profile_path = path or time.strftime("attendance-%Y%m%d-%H%M%S.prof")
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return None
+
+        profile, self._profile = self._profile, None
+        profile.disable()
+        profile.dump_stats(self._profile_path)
+        return self._profile_path
+
+    def install_profile_signal(self, signum=None):
+        """Toggle profiling of the main thread with a signal (SIGUSR1 by default)
+
+        Does nothing where the signal does not exist, such as on Windows.
+        """
+        signum = signum or getattr(signal, "SIGUSR1", None)
+        if signum is not None:
+            signal.signal(signum, lambda *args: self.toggle_profile())
+
+
+def _metric_name(name):
+    return "attendance_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+# The process-wide registry every module records into
+metrics = Metrics()
@@ -0,0 +1,458 @@
+import argparse
+import base64
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from attendance_backend import DATA_DIR
+from attendance_journal import UPSERT, iter_journal, read_day
+from attendance_segments import list_segments, lock, read_shared_day, segment_in_use, unlock
+from attendance_snapshot import snapshot_path
+from attendance_store import HEADER, STATUSES, parse_time, read_csv
+
+PARTITION_NAME = re.compile(r"attendance_(\d{4}-\d{2}-\d{2})\.csv(\.gz)?$")
+SEALED_SUFFIX = ".gz"
+
+# How long after midnight a day is left open before it may be sealed, so
+# every process has rolled over to the new day first
+SEAL_GRACE = timedelta(hours=1)
+
+# False positive rate the student ID bloom filters are sized for
+BLOOM_ERROR = 0.01
+
+
+def sealed_path(csv_file):
+    """Return the compressed partition that replaces a day's CSV file once sealed"""
+    return csv_file + SEALED_SUFFIX
+
+
+def index_path(csv_file):
+    """Return the index that belongs to a day's sealed partition"""
+    if csv_file.endswith(SEALED_SUFFIX):
+        csv_file = csv_file[:-len(SEALED_SUFFIX)]
+    return os.path.splitext(csv_file)[0] + ".idx"
+
+
+def live_files(csv_file):
+    """Return every file that holds a day while it is open for writing"""
+    files = [csv_file, snapshot_path(csv_file)]
+    files += glob.glob(glob.escape(csv_file) + ".*")
+    return [path for path in files
+            if os.path.isfile(path) and not path.endswith((SEALED_SUFFIX, ".lock"))]
+
+
+def list_partitions(data_dir=DATA_DIR, start=None, end=None):
+    """Return ``(date, path)`` for each day, pruned to an inclusive date range
+
+    A sealed day's path is its compressed partition, which wins over any
+    live files left behind by an interrupted seal or reopen, since both
+    then hold the same records.
+    """
+    partitions = {}
+    paths = glob.glob(os.path.join(data_dir, "attendance_*.csv"))
+    paths += glob.glob(os.path.join(data_dir, "attendance_*.csv" + SEALED_SUFFIX))
+    for path in paths:
+        match = PARTITION_NAME.search(path)
+        if not match:
+            continue
+        date = match.group(1)
+        if (start and date < start) or (end and date > end):
+            continue
+        if match.group(2) or date not in partitions:
+            partitions[date] = path
+    return sorted(partitions.items())
+
+
+def iter_partition(path):
+    """Stream one day's live records, applying its journal on the fly
+
+    Only the journal is held in memory, and compaction keeps it no
+    larger than the base file. Days caught in the middle of a compaction
+    fall back to ``read_day``, days written by several processes are
+    merged from their segments, and sealed days are read straight from
+    their compressed partition.
+    """
+    if path.endswith(SEALED_SUFFIX):
+        yield from read_sealed(path)
+        return
+
+    if os.path.isfile(path + ".base"):
+        yield from read_shared_day(path)
+        return
+
+    if os.path.isfile(path + ".journal.1") or os.path.isfile(path + ".tmp"):
+        yield from read_day(path)
+        return
+
+    changes = {}
+    for op, disk_id, record in iter_journal(path + ".journal"):
+        changes[disk_id] = record if op == UPSERT else None
+
+    if not changes:
+        yield from read_csv(path)
+        return
+
+    for disk_id, record in enumerate(read_csv(path)):
+        if disk_id in changes:
+            record = changes.pop(disk_id)
+            if record is None:
+                continue
+        yield record
+
+    # Whatever is left was added after the base was written
+    for record in changes.values():
+        if record is not None:
+            yield record
+
+
+def read_sealed(path):
+    """Yield the records of a sealed day's compressed partition"""
+    with gzip.open(path, "rt", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+
+        for row in reader:
+            if len(row) == 5:
+                yield tuple(row)
+
+
+class BloomFilter:
+    """Set of strings that may give false positives but never false negatives
+
+    Positions come from double hashing one BLAKE2b digest, so adding or
+    testing an item costs a single hash however many ``hashes`` are used.
+    """
+
+    def __init__(self, bits, hashes, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_items(cls, count, error=BLOOM_ERROR):
+        """Return an empty filter sized for ``count`` items at a false positive rate"""
+        count = max(1, count)
+        bits = max(64, math.ceil(-count * math.log(error) / math.log(2) ** 2))
+        return cls(bits, max(1, round(bits / count * math.log(2))))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.data[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.data[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def to_dict(self):
+        return {"bits": self.bits, "hashes": self.hashes,
+                "data": base64.b64encode(bytes(self.data)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["bits"], data["hashes"], base64.b64decode(data["data"]))
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.bits for i in range(self.hashes))
+
+
+class PartitionIndex:
+    """What a sealed day holds, kept beside it so queries can skip it unread
+
+    ``rows`` and ``students`` count records and distinct student IDs,
+    ``first_time`` and ``last_time`` are the earliest and latest valid
+    ``HH:MM:SS`` times, or None, and ``statuses`` and ``departments`` count
+    records per value. ``bloom`` holds every student ID on the day.
+    """
+
+    def __init__(self, date):
+        self.date = date
+        self.rows = 0
+        self.students = 0
+        self.first_time = None
+        self.last_time = None
+        self.statuses = {}
+        self.departments = {}
+        self.bloom = None
+        self._ids = set()
+
+    def add(self, record):
+        """Count one record while the partition is being written"""
+        student_id, _, department, status, time = record
+        self.rows += 1
+        self._ids.add(student_id)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.departments[department] = self.departments.get(department, 0) + 1
+        if parse_time(time) is not None:
+            if self.first_time is None or time < self.first_time:
+                self.first_time = time
+            if self.last_time is None or time > self.last_time:
+                self.last_time = time
+
+    def finish(self):
+        """Build the bloom filter once every record has been added"""
+        self.students = len(self._ids)
+        self.bloom = BloomFilter.for_items(self.students)
+        for student_id in self._ids:
+            self.bloom.add(student_id)
+        self._ids = set()
+
+    def may_contain(self, department=None, student_id=None, status=None, after=None, before=None):
+        """Return False only if no record on the day can match the filters
+
+        ``after`` and ``before`` are inclusive ``HH:MM:SS`` bounds.
+        """
+        if department is not None and department not in self.departments:
+            return False
+        if status is not None and status not in self.statuses:
+            return False
+        if after is not None or before is not None:
+            if self.first_time is None:
+                return False
+            if (after is not None and self.last_time < after) or \
+                    (before is not None and self.first_time > before):
+                return False
+        return student_id is None or student_id in self.bloom
+
+    def save(self, path):
+        """Write the index as JSON, replacing the file atomically"""
+        data = {
+            "date": self.date, "rows": self.rows, "students": self.students,
+            "first_time": self.first_time, "last_time": self.last_time,
+            "statuses": self.statuses, "departments": self.departments,
+            "bloom": self.bloom.to_dict(),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index, or return None if it is missing or unreadable"""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            index = cls(data["date"])
+            for key in ("rows", "students", "first_time", "last_time", "statuses", "departments"):
+                setattr(index, key, data[key])
+            index.bloom = BloomFilter.from_dict(data["bloom"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return index
+
+
+def may_match(path, department=None, student_id=None, status=None, after=None, before=None):
+    """Return False if a day's index shows none of its records match
+
+    Live days, and sealed days whose index cannot be read, always may.
+    """
+    if not path.endswith(SEALED_SUFFIX):
+        return True
+    index = PartitionIndex.load(index_path(path))
+    return index is None or index.may_contain(department, student_id, status, after, before)
+
+
+def seal_day(csv_file, date):
+    """Seal a finished day into a compressed partition with an index
+
+    The partition and index are written beside the live files and moved
+    into place before the live files are removed, so a day is readable
+    throughout and an interrupted seal is simply run again. Returns the
+    index, or None if another process holds the day. The day's lock file
+    is left in place: a process waiting on it would otherwise hold a lock
+    on a removed file while a newcomer locks a new one.
+    """
+    with open(csv_file + ".lock", "a+b") as lock_handle:
+        if not lock(lock_handle, blocking=False):
+            return None
+        try:
+            if any(segment_in_use(path) for path in list_segments(csv_file)):
+                return None
+            files = live_files(csv_file)
+            if not files:
+                return None
+
+            records = read_shared_day(csv_file) if os.path.isfile(csv_file + ".base") \
+                else read_day(csv_file)
+            path = sealed_path(csv_file)
+            tmp_path = path + ".tmp"
+            index = PartitionIndex(date)
+            with gzip.open(tmp_path, "wt", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(HEADER)
+                for record in records:
+                    index.add(record)
+                    writer.writerow(record)
+            index.finish()
+
+            index.save(index_path(csv_file))
+            os.replace(tmp_path, path)
+            for name in files:
+                os.remove(name)
+        finally:
+            unlock(lock_handle)
+    return index
+
+
+def unseal_day(csv_file):
+    """Turn a sealed day back into a live CSV file so it can be written to
+
+    Does nothing for a day that is not sealed. The CSV file is put in
+    place before the partition is removed, so the day's records are never
+    missing from disk.
+    """
+    path = sealed_path(csv_file)
+    if not os.path.isfile(path):
+        return
+
+    # Live files left by an interrupted seal hold the same records
+    if not os.path.isfile(csv_file):
+        tmp_path = csv_file + ".unseal"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(read_sealed(path))
+        os.replace(tmp_path, csv_file)
+
+    os.remove(path)
+    if os.path.isfile(index_path(csv_file)):
+        os.remove(index_path(csv_file))
+
+
+class PartitionManager:
+    """Keeps track of which day is current and seals the days before it
+
+    ``today`` is read from ``clock`` on every call, so a long-running
+    process notices midnight by comparing it with the day it has open.
+    Days are sealed once they have been over for ``SEAL_GRACE``; the
+    SQLite backend keeps every day in one indexed database, so it has
+    nothing to seal.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", clock=datetime.now):
+        self.data_dir = data_dir
+        self.backend = backend
+        self.clock = clock
+        self._sealing = threading.Lock()
+
+    def today(self):
+        """Return the current date as ``YYYY-MM-DD``"""
+        return self.clock().strftime("%Y-%m-%d")
+
+    def finished_days(self):
+        """Return ``(date, csv_file)`` for live days that are ready to seal"""
+        if self.backend == "sqlite":
+            return []
+        cutoff = (self.clock() - SEAL_GRACE).strftime("%Y-%m-%d")
+        return [(date, path) for date, path in list_partitions(self.data_dir, end=cutoff)
+                if date < cutoff and not path.endswith(SEALED_SUFFIX)]
+
+    def seal_finished(self):
+        """Seal every finished day and return ``{date: index}`` for those sealed"""
+        sealed = {}
+        with self._sealing:
+            for date, csv_file in self.finished_days():
+                index = seal_day(csv_file, date)
+                if index is not None:
+                    sealed[date] = index
+        return sealed
+
+    def seal_async(self):
+        """Seal finished days on a background thread, unless already sealing"""
+        if self._sealing.locked():
+            return
+        threading.Thread(target=self.seal_finished, name="attendance-seal", daemon=True).start()
+
+
+def find_records(data_dir=DATA_DIR, start=None, end=None, department=None,
+                 student_id=None, status=None, after=None, before=None):
+    """Yield ``(date, record)`` for matching records, skipping days by their index
+
+    Returns the number of days skipped once exhausted, as the
+    generator's return value.
+    """
+    skipped = 0
+    for date, path in list_partitions(data_dir, start, end):
+        if not may_match(path, department, student_id, status, after, before):
+            skipped += 1
+            continue
+        for record in iter_partition(path):
+            if department is not None and record[2] != department:
+                continue
+            if student_id is not None and record[0] != student_id:
+                continue
+            if status is not None and record[3] != status:
+                continue
+            if (after is not None and record[4] < after) or \
+                    (before is not None and record[4] > before):
+                continue
+            yield date, record
+    return skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Seal finished days into compressed, indexed partitions and look up "
+                    "records across days; with no filters, list the days"
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--seal", action="store_true",
+                        help="first seal every day that ended over an hour ago")
+    parser.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--department", help="only records of this department")
+    parser.add_argument("--student", help="only records of this student ID")
+    parser.add_argument("--status", choices=STATUSES, help="only records with this status")
+    parser.add_argument("--after", help="only records at or after this HH:MM:SS")
+    parser.add_argument("--before", help="only records at or before this HH:MM:SS")
+    args = parser.parse_args(argv)
+
+    for value in (args.after, args.before):
+        if value is not None and parse_time(value) is None:
+            parser.error("--after and --before must be HH:MM:SS")
+
+    if args.seal:
+        for date, index in PartitionManager(args.data_dir).seal_finished().items():
+            print(f"Sealed {date}: {index.rows} record(s), {index.students} student(s)",
+                  file=sys.stderr)
+
+    filters = (args.department, args.student, args.status, args.after, args.before)
+    if any(value is not None for value in filters):
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["Date", *HEADER])
+        records = find_records(args.data_dir, args.start, args.end, *filters)
+        count = 0
+        while True:
+            try:
+                date, record = next(records)
+            except StopIteration as stop:
+                skipped = stop.value
+                break
+            writer.writerow((date, *record))
+            count += 1
+        print(f"{count} record(s); {skipped} day(s) skipped by their index", file=sys.stderr)
+        return
+
+    for date, path in list_partitions(args.data_dir, args.start, args.end):
+        index = PartitionIndex.load(index_path(path)) if path.endswith(SEALED_SUFFIX) else None
+        if index is None:
+            print(f"{date}  {'sealed' if path.endswith(SEALED_SUFFIX) else 'live'}")
+            continue
+        counts = ", ".join(f"{status}: {count}" for status, count in sorted(index.statuses.items()))
+        print(f"{date}  sealed  {index.rows} record(s), {index.students} student(s), "
+              f"{index.first_time or '-'} to {index.last_time or '-'}  {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import csv
+import os
+import queue
+import threading
+from bisect import bisect_left, insort
+
+from attendance_backend import DATA_DIR
+
+ROSTER_HEADER = ["Student ID", "Name", "Department"]
+ROSTER_NAME = "roster.csv"
+
+
+def roster_path(data_dir=DATA_DIR):
+    """Return the path of the student roster"""
+    return os.path.join(data_dir, ROSTER_NAME)
+
+
+def read_roster(path):
+    """Return ``{student_id: (student_id, name, department)}`` from a roster file
+
+    Later rows for the same ID replace earlier ones, so changes can simply
+    be appended to the file.
+    """
+    students = {}
+    if not os.path.isfile(path):
+        return students
+
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+
+        for row in reader:
+            if len(row) == 3:
+                students[row[0]] = tuple(row)
+    return students
+
+
+def write_roster(path, students):
+    """Replace the roster file with ``students``, sorted by ID"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ROSTER_HEADER)
+        writer.writerows(students[student_id] for student_id in sorted(students))
+    os.replace(tmp_path, path)
+
+
+class Roster:
+    """Known students with prefix indexes on ID and name
+
+    Each index is a sorted list of ``(key, student_id)`` pairs, where the
+    key is the casefolded ID or name, so the students starting with a
+    prefix are a contiguous run found with one bisect. ``load_async``
+    reads the file on a background thread; until it is done ``ready`` is
+    unset and lookups find nothing. Students remembered in the meantime
+    are applied once loading finishes.
+
+    Remembered students are indexed at once but appended to the file by a
+    background thread, so the caller never waits on the disk; ``flush``
+    waits for the appends and ``error`` holds the last one that failed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ready = threading.Event()
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._students = {}
+        self._by_id = []
+        self._by_name = []
+        self._pending = []
+        self._appends = queue.Queue()
+        self._appender = None
+
+    def __len__(self):
+        return len(self._students)
+
+    def load(self):
+        """Read the roster file and build the indexes"""
+        students = read_roster(self.path)
+        by_id = sorted((student_id.casefold(), student_id) for student_id in students)
+        by_name = sorted((student[1].casefold(), student_id)
+                         for student_id, student in students.items())
+
+        with self._lock:
+            self._students = students
+            self._by_id = by_id
+            self._by_name = by_name
+            pending, self._pending = self._pending, []
+            for student in pending:
+                self._index(student)
+            self.ready.set()
+
+    def load_async(self):
+        """Load the roster on a background thread"""
+        self.ready.clear()
+        threading.Thread(target=self.load, name="attendance-roster", daemon=True).start()
+
+    def get(self, student_id):
+        """Return ``(student_id, name, department)`` for an ID, or None"""
+        return self._students.get(student_id)
+
+    def students(self):
+        """Return every student, in ID order"""
+        with self._lock:
+            return [self._students[student_id] for _, student_id in self._by_id]
+
+    def by_id(self, prefix, limit=10):
+        """Return up to ``limit`` students whose ID starts with ``prefix``"""
+        return self._match(self._by_id, prefix, limit)
+
+    def by_name(self, prefix, limit=10):
+        """Return up to ``limit`` students whose name starts with ``prefix``"""
+        return self._match(self._by_name, prefix, limit)
+
+    def remember(self, student):
+        """Add or update a student and queue the change for the roster file
+
+        Returns False without writing when the roster already has the same
+        name and department for the ID.
+        """
+        student = tuple(student)
+        with self._lock:
+            if self.ready.is_set():
+                if self._students.get(student[0]) == student:
+                    return False
+                self._index(student)
+            else:
+                self._pending.append(student)
+
+            if self._appender is None:
+                self._appender = threading.Thread(target=self._append, name="attendance-roster-writer",
+                                                  daemon=True)
+                self._appender.start()
+        self._appends.put(student)
+        return True
+
+    def flush(self):
+        """Block until every remembered student has been appended to the file"""
+        self._appends.join()
+
+    def _append(self):
+        while True:
+            students = [self._appends.get()]
+            while True:
+                try:
+                    students.append(self._appends.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                exists = os.path.isfile(self.path)
+                with open(self.path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if not exists:
+                        writer.writerow(ROSTER_HEADER)
+                    writer.writerows(students)
+            except OSError as e:
+                self.error = e
+            finally:
+                for _ in students:
+                    self._appends.task_done()
+
+    def _index(self, student):
+        student_id = student[0]
+        old = self._students.get(student_id)
+        if old is None:
+            insort(self._by_id, (student_id.casefold(), student_id))
+        elif old[1] != student[1]:
+            self._by_name.pop(bisect_left(self._by_name, (old[1].casefold(), student_id)))
+        if old is None or old[1] != student[1]:
+            insort(self._by_name, (student[1].casefold(), student_id))
+        self._students[student_id] = student
+
+    def _match(self, index, prefix, limit):
+        prefix = prefix.casefold()
+        if not prefix:
+            return []
+
+        matches = []
+        position = bisect_left(index, (prefix,))
+        while position < len(index) and len(matches) < limit:
+            key, student_id = index[position]
+            if not key.startswith(prefix):
+                break
+            matches.append(self._students[student_id])
+            position += 1
+        return matches
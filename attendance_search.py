@@ -0,0 +1,158 @@
+from attendance_metrics import metrics
+from attendance_store import ADDED, UPDATED, DELETED, CLEARED, LOADED
+
+GRAM = 3
+
+
+def trigrams(text):
+    """Return the distinct three-character substrings of a string"""
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class SearchIndex:
+    """Substring search over student ID, name, department and status
+
+    Matching follows the View Records search: a record matches when the
+    lower-cased term occurs in any of its first four fields. IDs and names
+    are indexed by trigram, so a term of three or more characters only
+    checks the rows that contain all of its trigrams. Departments and
+    statuses repeat heavily, so they are indexed by whole value instead
+    and matched by scanning the handful of distinct values.
+
+    The last result is remembered: when the next term contains the
+    previous one, only the previous matches are checked again. Results are
+    lists of row IDs in check-in order.
+
+    An attached store is indexed lazily: loading a day only marks the
+    index stale, and it is rebuilt by the first search after that.
+    """
+
+    def __init__(self, store=None):
+        self._text = {}
+        self._grams = {}
+        self._values = {}
+        self._last_term = None
+        self._last_result = None
+        self._store = None
+        self._stale = False
+
+        if store is not None:
+            self.attach(store)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._text)
+
+    def attach(self, store):
+        """Index a store's records and follow its changes"""
+        self.clear()
+        self._store = store
+        self._stale = True
+        store.subscribe(self._on_change)
+
+    def add(self, row_id, record):
+        """Index a record"""
+        student_id, name, dept, status = (field.lower() for field in record[:4])
+        self._text[row_id] = "\0".join((student_id, name, dept, status))
+
+        for gram in trigrams(student_id) | trigrams(name):
+            self._grams.setdefault(gram, set()).add(row_id)
+        for value in {dept, status}:
+            self._values.setdefault(value, set()).add(row_id)
+
+        self._last_term = None
+
+    def remove(self, row_id):
+        """Drop a record from the index"""
+        self._unindex(row_id)
+        del self._text[row_id]
+
+    def clear(self):
+        """Drop every record from the index"""
+        self._text.clear()
+        self._grams.clear()
+        self._values.clear()
+        self._last_term = None
+
+    def search(self, term):
+        """Return the row IDs of records matching a search term"""
+        with metrics.timer("search.query"):
+            self._refresh()
+            term = term.lower()
+            if not term:
+                return list(self._text)
+
+            if self._last_term is not None and self._last_term in term:
+                # Narrow the previous result instead of searching again
+                result = [row_id for row_id in self._last_result
+                          if term in self._text[row_id]]
+            else:
+                matches = set()
+                for value, row_ids in self._values.items():
+                    if term in value:
+                        matches |= row_ids
+                for row_id in self._candidates(term):
+                    if row_id not in matches and term in self._text[row_id]:
+                        matches.add(row_id)
+                result = sorted(matches)
+
+            self._last_term = term
+            self._last_result = result
+            return result
+
+    def _refresh(self):
+        """Rebuild the index from the attached store after a load"""
+        if self._stale:
+            self._stale = False
+            self.clear()
+            with metrics.timer("search.rebuild"):
+                for row_id, record in self._store.items():
+                    self.add(row_id, record)
+
+    def _candidates(self, term):
+        """Return the rows whose ID or name may contain a term"""
+        if len(term) < GRAM:
+            return self._text
+
+        postings = []
+        for gram in trigrams(term):
+            row_ids = self._grams.get(gram)
+            if not row_ids:
+                return ()
+            postings.append(row_ids)
+
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def _unindex(self, row_id):
+        student_id, name, dept, status = self._text[row_id].split("\0")
+
+        for gram in trigrams(student_id) | trigrams(name):
+            self._discard(self._grams, gram, row_id)
+        for value in {dept, status}:
+            self._discard(self._values, value, row_id)
+
+        self._last_term = None
+
+    def _discard(self, index, key, row_id):
+        row_ids = index[key]
+        row_ids.discard(row_id)
+        if not row_ids:
+            del index[key]
+
+    def _on_change(self, event, row_id, record, old):
+        if event == LOADED:
+            self.clear()
+            self._stale = True
+        elif self._stale:
+            return  # The rebuild will pick the change up
+        elif event == ADDED:
+            self.add(row_id, record)
+        elif event == UPDATED:
+            # Re-adding overwrites the text in place, keeping the row's position
+            self._unindex(row_id)
+            self.add(row_id, record)
+        elif event == DELETED:
+            self.remove(row_id)
+        elif event == CLEARED:
+            self.clear()
@@ -0,0 +1,455 @@
+import csv
+import glob
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+from attendance_journal import UPSERT, DELETE, BEGIN, COMMIT, read_day, unfinished_transaction
+from attendance_metrics import metrics
+from attendance_store import write_csv
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# msvcrt only has exclusive byte-range locks, so lock one byte far past any data
+LOCK_OFFSET = 1 << 40
+
+# Stamp of records that predate the shared files
+ORIGIN = (0, "")
+
+
+def lock(f, blocking=True):
+    """Take an exclusive lock on an open file, shared with other processes
+
+    Returns False instead of waiting when ``blocking`` is off and another
+    process holds the lock.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    os.lseek(f.fileno(), LOCK_OFFSET, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def unlock(f):
+    """Release a lock taken with ``lock``"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        os.lseek(f.fileno(), LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def segment_writer(path):
+    """Return the writer ID in a segment file name"""
+    return os.path.basename(path).rsplit(".", 2)[-2]
+
+
+def list_segments(csv_file):
+    """Return the segment files of a day"""
+    return sorted(glob.glob(glob.escape(csv_file) + ".seg.*.*"))
+
+
+def read_segment(path, start=0):
+    """Return ``(entries, end)`` for the complete lines of a segment after ``start``
+
+    Each entry is ``(stamp, key, record)`` where ``stamp`` is
+    ``(timestamp, writer)`` and ``record`` is None for a deletion. A line
+    or transaction still being written is left for the next read.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    begin = unfinished_transaction(data[:end])
+    if begin is not None:
+        end = begin
+
+    writer = segment_writer(path)
+    entries = []
+    for row in csv.reader(io.StringIO(data[:end].decode("utf-8"), newline="")):
+        if len(row) == 8 and row[0] == UPSERT:
+            entries.append(((int(row[2]), writer), row[1], tuple(row[3:])))
+        elif len(row) == 3 and row[0] == DELETE:
+            entries.append(((int(row[2]), writer), row[1], None))
+    return entries, start + end
+
+
+def merge(state, entries):
+    """Apply entries to ``{key: (stamp, record)}``, last writer wins
+
+    Entries are taken in stamp order. An entry replaces the state of its
+    key when its stamp is newer, or equal and its record differs, which
+    only happens for later entries from the same batch. Returns the keys
+    whose records changed, so merging the same entries twice is harmless.
+    """
+    changed = []
+    for stamp, key, record in sorted(entries, key=lambda entry: entry[0]):
+        old = state.get(key)
+        if old is None or stamp > old[0] or (stamp == old[0] and record != old[1]):
+            state[key] = (stamp, record)
+            changed.append(key)
+    return changed
+
+
+def read_base(base_file):
+    """Return ``(folded, state)`` from a day's base file
+
+    ``folded`` maps each live segment's name to the bytes of it already
+    merged into the base, and ``state`` maps every key, deleted or not,
+    to ``(stamp, record)`` in check-in order.
+    """
+    folded = {}
+    state = {}
+    with open(base_file, "r", newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            if row[0] == "#":
+                folded = json.loads(row[1])
+            elif row[0] == UPSERT and len(row) == 9:
+                state[row[1]] = ((int(row[2]), row[3]), tuple(row[4:]))
+            elif row[0] == DELETE and len(row) == 4:
+                state[row[1]] = ((int(row[2]), row[3]), None)
+    return folded, state
+
+
+def load_state(csv_file):
+    """Return ``(state, offsets)`` for a day, merging the base with every segment
+
+    ``offsets`` maps each segment to the bytes of it that were read.
+    Days that have no base yet start from the plain CSV file and its
+    journal, keyed by position.
+    """
+    base_file = csv_file + ".base"
+    if os.path.isfile(base_file):
+        folded, state = read_base(base_file)
+    else:
+        folded = {}
+        state = {f"c{position}": (ORIGIN, record)
+                 for position, record in enumerate(read_day(csv_file))}
+
+    offsets = {}
+    for path in list_segments(csv_file):
+        try:
+            entries, offsets[path] = read_segment(path, folded.get(os.path.basename(path), 0))
+        except FileNotFoundError:
+            continue  # Folded into a newer base while we looked
+        merge(state, entries)
+    return state, offsets
+
+
+def read_shared_day(csv_file):
+    """Return a day's live records from its base and segments"""
+    state, _ = load_state(csv_file)
+    return [record for _, record in state.values() if record is not None]
+
+
+class SharedJournal:
+    """CSV backend that several processes can write to at once
+
+    Each process appends its changes to a segment file of its own,
+    ``attendance_<date>.csv.seg.<writer>.<n>``, so writers never contend
+    for a file and throughput grows with the number of processes. Every
+    record has a key that is unique across writers, and every change is
+    stamped with ``(timestamp, writer)``. Readers merge all segments and
+    the last writer wins for each key. ``sync`` tails the other writers'
+    segments to pick up their changes.
+
+    Compaction takes an exclusive lock on ``attendance_<date>.csv.lock`` so
+    only one process compacts at a time, but nobody else has to wait. It
+    merges every segment into ``attendance_<date>.csv.base``, which keeps
+    keys, stamps and deletions, and records how far each live segment was
+    folded in. Then it rewrites the plain CSV file for export and history.
+    A segment is only deleted once its writer has moved on. A writer holds
+    a lock on its current segment, and compaction rotates the compacting
+    writer's own segment first.
+
+    Every instance of a day must use this backend. Do not mix it with the
+    single-writer journal.
+    """
+
+    def __init__(self, csv_file, compact_min=10000, fsync=False, writer_id=None):
+        self.csv_file = csv_file
+        self.base_file = csv_file + ".base"
+        self.lock_file = csv_file + ".lock"
+        self.writer_id = writer_id or uuid.uuid4().hex[:12]
+        self.compact_min = compact_min
+        self.fsync = fsync
+        self.compaction_error = None
+
+        self._lock = threading.Lock()
+        self._state = {}  # Key -> (stamp, record), as far as this process knows
+        self._keys = {}  # Row ID -> key
+        self._rows = {}  # Key -> row ID
+        self._offsets = {}
+        self._base_stat = None
+        self._next_key = 0
+        self._last_stamp = 0
+
+        self._generation = 0
+        self._segment = None
+        self._file = None
+        self._writer = None
+        self._owner = None
+        self._entries = 0
+
+    def load(self, store):
+        """Replace the store's contents with the day's merged records"""
+        with self._lock:
+            self._base_stat = _stat(self.base_file)
+            state, offsets = load_state(self.csv_file)
+            keys = [key for key, (_, record) in state.items() if record is not None]
+            store.set_base([state[key][1] for key in keys])
+
+            self._state = state
+            self._keys = dict(enumerate(keys))
+            self._rows = {key: row_id for row_id, key in self._keys.items()}
+            self._offsets = {path: end for path, end in offsets.items() if path != self._segment}
+
+    def upsert(self, row_id, record):
+        """Append an added or changed row"""
+        self.apply([(UPSERT, row_id, record)])
+
+    def delete(self, row_id):
+        """Append a tombstone for a deleted row"""
+        self.apply([(DELETE, row_id, None)])
+
+    def apply(self, changes, atomic=False):
+        """Append a batch of ``(UPSERT|DELETE, row_id, record)`` changes to this writer's segment
+
+        An ``atomic`` batch is bracketed by transaction markers, and other
+        writers only merge it once its commit marker is there.
+        """
+        with self._lock, metrics.timer("segments.apply"):
+            if self._file is None:
+                self._open()
+            if metrics.enabled:
+                size = os.fstat(self._file.fileno()).st_size
+
+            # Stamps never go backwards, even if the clock does
+            timestamp = self._last_stamp = max(time.time_ns(), self._last_stamp + 1)
+            stamp = (timestamp, self.writer_id)
+
+            if atomic:
+                self._writer.writerow([BEGIN, len(changes)])
+            for op, row_id, record in changes:
+                key = self._keys.get(row_id)
+                if op == UPSERT:
+                    if key is None:
+                        key = f"{self.writer_id}.{self._next_key}"
+                        self._next_key += 1
+                        self._keys[row_id] = key
+                        self._rows[key] = row_id
+                    record = tuple(record)
+                    self._writer.writerow([UPSERT, key, timestamp, *record])
+                else:
+                    if key is None:
+                        continue
+                    del self._keys[row_id]
+                    del self._rows[key]
+                    self._writer.writerow([DELETE, key, timestamp])
+                self._state[key] = (stamp, record)
+                self._entries += 1
+            if atomic:
+                self._writer.writerow([COMMIT, len(changes)])
+
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            if metrics.enabled:
+                metrics.count("segments.rows", len(changes))
+                metrics.count("segments.bytes", os.fstat(self._file.fileno()).st_size - size)
+
+    def sync(self, store):
+        """Apply other writers' changes to the store
+
+        Returns the row IDs that were ``(added, changed, removed)``. When
+        another process has compacted, the new base is merged first, which
+        covers segments that were folded and deleted in the meantime.
+        """
+        with self._lock:
+            entries = []
+            stat = _stat(self.base_file)
+            folded = {}
+            if stat != self._base_stat:
+                self._base_stat = stat
+                if stat is not None:
+                    folded, base = read_base(self.base_file)
+                    entries.extend((stamp, key, record) for key, (stamp, record) in base.items())
+
+            for path in list_segments(self.csv_file):
+                if path == self._segment:
+                    continue
+                start = self._offsets.get(path)
+                if start is None:
+                    start = folded.get(os.path.basename(path), 0)
+                try:
+                    new, self._offsets[path] = read_segment(path, start)
+                except FileNotFoundError:
+                    self._offsets.pop(path, None)
+                    continue
+                entries.extend(new)
+
+            added, changed, removed = [], [], []
+            for key in merge(self._state, entries):
+                record = self._state[key][1]
+                row_id = self._rows.get(key)
+                if row_id is not None and row_id not in store:
+                    continue  # Deleted here, and the tombstone is still queued
+                if record is None:
+                    if row_id is not None:
+                        store.delete(row_id)
+                        del self._keys[row_id]
+                        del self._rows[key]
+                        removed.append(row_id)
+                elif row_id is not None:
+                    store.update(row_id, record)
+                    changed.append(row_id)
+                else:
+                    row_id = store.add(record)
+                    self._keys[row_id] = key
+                    self._rows[key] = row_id
+                    added.append(row_id)
+
+            return added, changed, removed
+
+    def should_compact(self):
+        """Return True once this writer's segment has grown large"""
+        return self._entries >= self.compact_min
+
+    def compacting(self):
+        """Compactions run inline"""
+        return False
+
+    def compact(self, rows=None, wait=False):
+        """Merge every segment into the base, unless another process is already compacting
+
+        ``rows`` is accepted for compatibility with ``AttendanceJournal``
+        but the merge is always done from the files, since this process may
+        not have seen every other writer's latest changes.
+        """
+        with self._lock, open(self.lock_file, "a+b") as lock_handle:
+            if not lock(lock_handle, blocking=False):
+                return
+            try:
+                # Start a new segment so the current one can be folded and removed
+                self._close_segment()
+                with metrics.timer("segments.compact"):
+                    self._compact()
+            finally:
+                unlock(lock_handle)
+
+    def wait(self):
+        """Nothing runs in the background"""
+
+    def close(self):
+        """Close this writer's segment"""
+        with self._lock:
+            self._close_segment()
+
+    def _open(self):
+        if not os.path.isfile(self.base_file):
+            self._create_base()
+
+        # Lock the segment before it is visible, or a compaction could take it for dead
+        self._generation += 1
+        self._segment = f"{self.csv_file}.seg.{self.writer_id}.{self._generation}"
+        new_file = f"{self.csv_file}.newseg.{self.writer_id}.{self._generation}"
+        self._owner = open(new_file, "a+b")
+        lock(self._owner)
+        os.replace(new_file, self._segment)
+        self._file = open(self._segment, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._entries = 0
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            unlock(self._owner)
+            self._owner.close()
+            self._file = self._writer = self._owner = None
+
+    def _create_base(self):
+        """Turn a day's plain CSV file into the first base, exactly once"""
+        with open(self.lock_file, "a+b") as lock_handle:
+            lock(lock_handle)
+            try:
+                if not os.path.isfile(self.base_file):
+                    self._compact()
+            finally:
+                unlock(lock_handle)
+
+    def _compact(self):
+        """Merge segments into a new base; the caller holds the lock file"""
+        # Decide which segments are finished before reading them, so none
+        # can grow between being read and being removed
+        dead = {path for path in list_segments(self.csv_file) if not segment_in_use(path)}
+        state, offsets = load_state(self.csv_file)
+        folded = {os.path.basename(path): end
+                  for path, end in offsets.items() if path not in dead}
+
+        tmp_file = self.base_file + ".tmp"
+        with open(tmp_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["#", json.dumps(folded)])
+            for key, ((timestamp, writer_id), record) in state.items():
+                if record is None:
+                    writer.writerow([DELETE, key, timestamp, writer_id])
+                else:
+                    writer.writerow([UPSERT, key, timestamp, writer_id, *record])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.base_file)
+
+        # Only now is everything in the dead segments safe in the base
+        for path in dead:
+            if path in offsets:
+                os.remove(path)
+
+        # Keep the plain CSV file current for export and history; the old
+        # single-writer journal is part of the base now
+        tmp_file = self.csv_file + ".tmp"
+        write_csv(tmp_file, (record for _, record in state.values() if record is not None))
+        os.replace(tmp_file, self.csv_file)
+        for path in (self.csv_file + ".journal", self.csv_file + ".journal.1"):
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def segment_in_use(path):
+    """Return True if a writer still holds its lock on a segment"""
+    try:
+        with open(path, "rb") as f:
+            if not lock(f, blocking=False):
+                return True
+            unlock(f)
+            return False
+    except FileNotFoundError:
+        return False
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
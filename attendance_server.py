@@ -0,0 +1,520 @@
+import argparse
+import asyncio
+import json
+import os
+from collections import deque
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from attendance_backend import BACKENDS, DATA_DIR, csv_path, open_backend
+from attendance_journal import UPSERT, DELETE
+from attendance_metrics import metrics
+from attendance_partitions import PartitionManager
+from attendance_search import SearchIndex
+from attendance_store import AttendanceStore, LOADED, CLEARED, validate_record, write_csv
+from attendance_writer import AttendanceWriter
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Changes kept for clients catching up; older clients reload everything
+CHANGE_LOG = 100000
+
+# How often a server following today checks whether the date has changed
+ROLLOVER_SECONDS = 30
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024 * 1024
+
+FIELDS = ("student_id", "name", "department", "status", "time")
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    """A request that cannot be served, with the HTTP status to answer it with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def record_from(data, old=None):
+    """Build a record from a JSON object, keeping ``old`` fields it leaves out
+
+    New records without a time are stamped with the current time, as
+    Submit does. Raises ``RequestError`` when the record would not pass
+    Submit's validation.
+    """
+    if not isinstance(data, dict):
+        raise RequestError(400, "Expected a JSON object")
+
+    defaults = old or ("", "", "", "Present", datetime.now().strftime("%H:%M:%S"))
+    record = tuple(
+        str(data[field]).strip() if data.get(field) is not None else default
+        for field, default in zip(FIELDS, defaults)
+    )
+    error = validate_record(record)
+    if error is not None:
+        raise RequestError(400, error)
+    return record
+
+
+class AttendanceService:
+    """The one owner of a day's records, shared by every client
+
+    All requests are handled on the event loop thread, so changes to the
+    store are serialized without locks. Every change is queued on a single
+    ``AttendanceWriter``, which batches whatever arrives while the previous
+    batch is being written. Changes are also numbered and kept in a short
+    log so clients can fetch what others changed since they last looked.
+
+    Without a ``date`` the service follows today: ``roll_over`` moves it
+    on to the new day after midnight and seals the finished days.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", date=None, fsync=False):
+        self.data_dir = data_dir
+        self.backend_kind = backend
+        self.fsync = fsync
+        self.partitions = PartitionManager(data_dir, backend)
+        self.follow_today = date is None
+        self.date = date or self.partitions.today()
+        self.csv_file = csv_path(data_dir, self.date)
+
+        self.store = AttendanceStore()
+        self.backend = open_backend(backend, data_dir, self.date, fsync=fsync)
+        self.writer = AttendanceWriter(self.backend)
+        self.search_index = SearchIndex(self.store)
+
+        self.revision = 0
+        self.changes = deque(maxlen=CHANGE_LOG)
+        self._origin = None
+        self.store.subscribe(self._on_change)
+
+        self.backend.load(self.store)
+        self.writer.start()
+        if self.follow_today:
+            self.partitions.seal_async()
+
+    def roll_over(self):
+        """Open today's records if the date has changed; return True if it had
+
+        The store is reloaded, so clients are told to reload as well.
+        """
+        date = self.partitions.today()
+        if not self.follow_today or date == self.date:
+            return False
+
+        self.close()
+        self.date = date
+        self.csv_file = csv_path(self.data_dir, date)
+        self.backend = open_backend(self.backend_kind, self.data_dir, date, fsync=self.fsync)
+        self.writer = AttendanceWriter(self.backend)
+        self.backend.load(self.store)
+        self.writer.start()
+        self.partitions.seal_async()
+        return True
+
+    def status(self, query):
+        return 200, {
+            "date": self.date,
+            "records": len(self.store),
+            "revision": self.revision,
+            "pending": self.writer.pending(),
+            "csv_file": os.path.abspath(self.csv_file),
+        }
+
+    def list_records(self, query):
+        """Records in check-in order, optionally filtered and paged"""
+        filters = [(index, query[field]) for index, field in enumerate(FIELDS) if field in query]
+        offset = int(query.get("offset", 0))
+        limit = int(query["limit"]) if "limit" in query else None
+
+        rows = []
+        for row_id, record in self.store.items():
+            if all(record[index] == value for index, value in filters):
+                rows.append([row_id, *record])
+        end = None if limit is None else offset + limit
+        return 200, {"revision": self.revision, "records": rows[offset:end]}
+
+    def search(self, query):
+        limit = int(query.get("limit", 1000))
+        row_ids = self.search_index.search(query.get("q", ""))
+        return 200, {
+            "total": len(row_ids),
+            "records": [[row_id, *self.store.get(row_id)] for row_id in row_ids[:limit]],
+        }
+
+    def get_record(self, row_id):
+        return 200, {"row_id": row_id, "record": self._get(row_id)}
+
+    def submit(self, data, origin=None):
+        record = record_from(data)
+        row_id = self._change(origin, self.store.add, record)
+        self.writer.upsert(row_id, record)
+        self._after_write()
+        return 201, {"row_id": row_id, "record": record, "revision": self.revision}
+
+    def edit(self, row_id, data, origin=None):
+        record = record_from(data, self._get(row_id))
+        self._change(origin, self.store.update, row_id, record)
+        self.writer.upsert(row_id, record)
+        self._after_write()
+        return 200, {"row_id": row_id, "record": record, "revision": self.revision}
+
+    def delete(self, row_id, origin=None):
+        self._get(row_id)
+        self._change(origin, self.store.delete, row_id)
+        self.writer.delete(row_id)
+        self._after_write()
+        return 200, {"row_id": row_id, "revision": self.revision}
+
+    def batch(self, data, origin=None):
+        """Apply ``{"changes": [...]}`` from a client's own write-behind queue
+
+        Each change is ``{"op": "U"|"D", "ref": ..., "id": ..., "record": [...]}``.
+        Upserts without an ``id`` create a record; later changes in the same
+        batch may refer to it by its ``ref``. The response maps each such
+        ``ref`` to the row ID it was given. Everything is validated before
+        anything is applied, so a bad batch changes nothing. With
+        ``"atomic": true`` the batch is also written as one transaction.
+        """
+        changes = data.get("changes") if isinstance(data, dict) else None
+        if not isinstance(changes, list):
+            raise RequestError(400, "Expected a list of changes")
+
+        records = []
+        for change in changes:
+            if not isinstance(change, dict) or change.get("op") not in (UPSERT, DELETE):
+                raise RequestError(400, "Each change needs an op of U or D")
+            row_id = change.get("id")
+            if row_id is not None and (not isinstance(row_id, int) or isinstance(row_id, bool)):
+                raise RequestError(400, "A change's id must be a row ID")
+            record = None
+            if change["op"] == UPSERT:
+                record = record_from(dict(zip(FIELDS, change.get("record") or ())))
+            records.append(record)
+
+        atomic = bool(data.get("atomic"))
+        writes = []
+        ids = {}
+        for change, record in zip(changes, records):
+            row_id = change.get("id")
+            if row_id is None:
+                row_id = ids.get(str(change.get("ref")))
+
+            if change["op"] == UPSERT and row_id is None:
+                row_id = self._change(origin, self.store.add, record)
+                ids[str(change.get("ref"))] = row_id
+                writes.append((UPSERT, row_id, record))
+            elif row_id is not None and row_id in self.store:
+                if change["op"] == UPSERT:
+                    self._change(origin, self.store.update, row_id, record)
+                    writes.append((UPSERT, row_id, record))
+                else:
+                    self._change(origin, self.store.delete, row_id)
+                    writes.append((DELETE, row_id, None))
+
+        if atomic:
+            self.writer.transaction(writes)
+        else:
+            for op, row_id, record in writes:
+                if op == UPSERT:
+                    self.writer.upsert(row_id, record)
+                else:
+                    self.writer.delete(row_id)
+        self._after_write()
+        return 200, {"ids": ids, "revision": self.revision}
+
+    def changes_since(self, query):
+        """Changes after a revision, leaving out the asking client's own"""
+        since = int(query.get("since", 0))
+        client = query.get("client")
+        oldest = self.changes[0][0] if self.changes else self.revision + 1
+
+        if since < oldest - 1 or any(
+            event in (LOADED, CLEARED) for _, _, event, _, _ in self._after(since)
+        ):
+            return 200, {"revision": self.revision, "reload": True, "changes": []}
+
+        return 200, {
+            "revision": self.revision,
+            "reload": False,
+            "changes": [
+                [revision, event, row_id, record]
+                for revision, origin, event, row_id, record in self._after(since)
+                if origin is None or origin != client
+            ],
+        }
+
+    async def compact(self, data=None, origin=None):
+        """Bring the day's CSV file up to date with every change so far
+
+        The records are taken on the event loop, but waiting for the
+        writer and writing files happen on an executor thread, so other
+        requests are still served meanwhile.
+        """
+        # The day may roll over while this waits, so hold on to its objects
+        writer, backend, csv_file = self.writer, self.backend, self.csv_file
+        rows = list(self.store.items())
+        writer.compact(rows, force=True)
+
+        def wait():
+            writer.flush()
+            backend.wait()
+            if not hasattr(backend, "csv_file"):
+                write_csv(csv_file, (record for _, record in rows))
+
+        await asyncio.get_running_loop().run_in_executor(None, wait)
+        error = writer.error or backend.compaction_error
+        if error is not None:
+            writer.error = backend.compaction_error = None
+            raise RequestError(500, f"Failed to save changes: {error}")
+        return 200, {"csv_file": os.path.abspath(csv_file), "revision": self.revision}
+
+    def close(self):
+        """Write out queued changes and close storage"""
+        self.writer.close()
+        self.backend.wait()
+        self.backend.close()
+
+    def _get(self, row_id):
+        try:
+            return self.store.get(row_id)
+        except (KeyError, IndexError):
+            raise RequestError(404, f"No record {row_id}") from None
+
+    def _change(self, origin, method, *args):
+        self._origin = origin
+        try:
+            return method(*args)
+        finally:
+            self._origin = None
+
+    def _after(self, since):
+        # The log is in revision order, so walk back from the newest change
+        changes = []
+        for change in reversed(self.changes):
+            if change[0] <= since:
+                break
+            changes.append(change)
+        changes.reverse()
+        return changes
+
+    def _after_write(self):
+        if self.backend.should_compact() and not self.writer.compaction_queued():
+            self.writer.compact(list(self.store.items()))
+
+    def _on_change(self, event, row_id, record, old):
+        self.revision += 1
+        self.changes.append((self.revision, self._origin, event, row_id, record))
+
+
+class AttendanceServer:
+    """Minimal HTTP/1.1 front end for an ``AttendanceService``
+
+    Speaks JSON over keep-alive connections using only asyncio streams.
+
+        GET    /status
+        GET    /records?student_id=&department=&status=&offset=&limit=
+        GET    /records/<row_id>
+        POST   /records              {"student_id", "name", "department", "status"}
+        PUT    /records/<row_id>     any of the same fields, plus "time"
+        DELETE /records/<row_id>
+        GET    /search?q=&limit=
+        POST   /batch                see ``AttendanceService.batch``
+        GET    /changes?since=&client=
+        POST   /compact
+
+    Writes may name their client with an ``X-Client`` header so that
+    client is not sent its own changes back from ``/changes``.
+    """
+
+    def __init__(self, service, host=HOST, port=PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._server = None
+
+    async def start(self):
+        """Start listening and return the bound port"""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, backlog=1024
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as e:
+                    # The body was not read, so the connection cannot be reused
+                    metrics.count(f"http.{e.status}")
+                    await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+
+                with metrics.timer("http.request"):
+                    status, payload = await self.dispatch(method, target, headers, body)
+                self.requests += 1
+                metrics.count(f"http.{status}")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            .encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = headers.get("content-length", "0")
+        if not (length.isascii() and length.isdigit()):
+            raise RequestError(400, "Content-Length must be a whole number of bytes")
+        length = int(length)
+        if length > MAX_BODY:
+            raise RequestError(413, f"Request bodies are limited to {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def dispatch(self, method, target, headers, body):
+        """Route one request and return ``(status, payload)``"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        origin = headers.get("x-client")
+        service = self.service
+
+        try:
+            data = json.loads(body) if body else {}
+
+            if parts == ["status"] and method == "GET":
+                return service.status(query)
+            if parts == ["search"] and method == "GET":
+                return service.search(query)
+            if parts == ["changes"] and method == "GET":
+                return service.changes_since(query)
+            if parts == ["batch"] and method == "POST":
+                return service.batch(data, origin)
+            if parts == ["compact"] and method == "POST":
+                return await service.compact(data, origin)
+            if parts == ["records"]:
+                if method == "GET":
+                    return service.list_records(query)
+                if method == "POST":
+                    return service.submit(data, origin)
+                raise RequestError(405, f"{method} not allowed on /records")
+            if len(parts) == 2 and parts[0] == "records":
+                row_id = int(parts[1])
+                if method == "GET":
+                    return service.get_record(row_id)
+                if method == "PUT":
+                    return service.edit(row_id, data, origin)
+                if method == "DELETE":
+                    return service.delete(row_id, origin)
+                raise RequestError(405, f"{method} not allowed on /records/<id>")
+            raise RequestError(404, f"No such endpoint: {url.path}")
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve one day's attendance over HTTP so several kiosks can share it"
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--date", help="day to serve, YYYY-MM-DD (default: today, rolling over at midnight)")
+    parser.add_argument("--fsync", action="store_true", help="fsync every batch")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="dump timings to FILE every few seconds (Prometheus text for .prom); "
+                             "SIGUSR1 toggles a cProfile capture")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.start_dump(args.metrics)
+        metrics.install_profile_signal()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    service = AttendanceService(args.data_dir, args.backend, args.date, args.fsync)
+    server = AttendanceServer(service, args.host, args.port)
+
+    async def roll_over():
+        while True:
+            await asyncio.sleep(ROLLOVER_SECONDS)
+            if service.roll_over():
+                print(f"Serving {service.date} ({len(service.store)} records)")
+
+    async def run():
+        port = await server.start()
+        print(f"Serving {service.date} ({len(service.store)} records) on http://{args.host}:{port}")
+        rollover = asyncio.create_task(roll_over())
+        try:
+            await server.serve_forever()
+        finally:
+            rollover.cancel()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        metrics.stop_dump()
+
+
+if __name__ == "__main__":
+    main()
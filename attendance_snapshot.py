@@ -0,0 +1,205 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from attendance_store import format_time, parse_time
+
+MAGIC = b"ATTSNAP2"
+PREFIX = struct.Struct("<8sI")  # Magic, then the length of the JSON header
+ALIGN = 8
+
+# Map files only where an open mapping does not block replacing the file
+USE_MMAP = os.name != "nt"
+
+
+def snapshot_path(csv_file):
+    """Return the snapshot path that belongs to a day's CSV file"""
+    return os.path.splitext(csv_file)[0] + ".snap"
+
+
+def fingerprint(path):
+    """Return the size and modification time identifying a file's contents"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _pack_strings(values):
+    """Return UTF-8 offsets and blob for a list of strings"""
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_snapshot(path, records, source):
+    """Write records to a binary snapshot describing the CSV file ``source``
+
+    Departments, statuses and any time that is not plain ``HH:MM:SS`` are
+    interned in a symbol table and stored as 32-bit codes; other
+    times are stored as integer seconds since midnight. IDs and names are
+    packed into offset-indexed UTF-8 blobs. Every column is a native array
+    aligned to 8 bytes, so a reader can map the file and address rows
+    directly. The snapshot is written to a temporary file and renamed.
+    """
+    symbols = {}
+    ids = []
+    names = []
+    depts = array("I")
+    statuses = array("I")
+    times = array("i")
+
+    for student_id, name, dept, status, time in records:
+        ids.append(student_id)
+        names.append(name)
+        depts.append(symbols.setdefault(dept, len(symbols)))
+        statuses.append(symbols.setdefault(status, len(symbols)))
+        seconds = parse_time(time)
+        if seconds is None:
+            seconds = -1 - symbols.setdefault(time, len(symbols))
+        times.append(seconds)
+
+    symbol_offsets, symbol_blob = _pack_strings(list(symbols))
+    id_offsets, id_blob = _pack_strings(ids)
+    name_offsets, name_blob = _pack_strings(names)
+    sections = [
+        ("symbol_offsets", symbol_offsets.tobytes()),
+        ("symbol_blob", symbol_blob),
+        ("id_offsets", id_offsets.tobytes()),
+        ("id_blob", id_blob),
+        ("name_offsets", name_offsets.tobytes()),
+        ("name_blob", name_blob),
+        ("depts", depts.tobytes()),
+        ("statuses", statuses.tobytes()),
+        ("times", times.tobytes()),
+    ]
+
+    header = {
+        "rows": len(ids),
+        "symbols": len(symbols),
+        "byteorder": sys.byteorder,
+        "source": fingerprint(source),
+        "sections": {},
+    }
+
+    # The header records where each section starts, so lay them out first
+    position = 0
+    for name, data in sections:
+        header["sections"][name] = [position, len(data)]
+        position += -len(data) % ALIGN + len(data)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (-(PREFIX.size + len(header_bytes)) % ALIGN)
+    start = PREFIX.size + len(header_bytes)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in sections:
+            f.seek(start + header["sections"][name][0])
+            f.write(data)
+        f.truncate(start + position)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only sequence of records backed by a snapshot file
+
+    Opening a snapshot only reads its header and symbol table; rows are
+    decoded one at a time when indexed, straight from the mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if USE_MMAP:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buffer = f.read()
+
+        view = memoryview(self._buffer)
+        magic, header_size = PREFIX.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an attendance snapshot")
+
+        self.header = json.loads(bytes(view[PREFIX.size:PREFIX.size + header_size]))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a machine with different byte order")
+
+        start = PREFIX.size + header_size
+        columns = {}
+        for name, (offset, size) in self.header["sections"].items():
+            columns[name] = view[start + offset:start + offset + size]
+
+        self._rows = self.header["rows"]
+        self._id_offsets = columns["id_offsets"].cast("I")
+        self._id_blob = columns["id_blob"]
+        self._name_offsets = columns["name_offsets"].cast("I")
+        self._name_blob = columns["name_blob"]
+        self._depts = columns["depts"].cast("I")
+        self._statuses = columns["statuses"].cast("I")
+        self._times = columns["times"].cast("i")
+
+        symbol_offsets = columns["symbol_offsets"].cast("I")
+        symbol_blob = columns["symbol_blob"]
+        self.symbols = [
+            str(symbol_blob[symbol_offsets[i]:symbol_offsets[i + 1]], "utf-8")
+            for i in range(self.header["symbols"])
+        ]
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError(index)
+
+        seconds = self._times[index]
+        return (
+            str(self._id_blob[self._id_offsets[index]:self._id_offsets[index + 1]], "utf-8"),
+            str(self._name_blob[self._name_offsets[index]:self._name_offsets[index + 1]], "utf-8"),
+            self.symbols[self._depts[index]],
+            self.symbols[self._statuses[index]],
+            format_time(seconds) if seconds >= 0 else self.symbols[-1 - seconds],
+        )
+
+    def __iter__(self):
+        for index in range(self._rows):
+            yield self[index]
+
+    def column(self, field):
+        """Return one field of every row as a list, without decoding whole records"""
+        if field < 2:
+            offsets, blob = ((self._id_offsets, self._id_blob),
+                             (self._name_offsets, self._name_blob))[field]
+            return [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(self._rows)]
+        if field < 4:
+            return list(map(self.symbols.__getitem__, (self._depts, self._statuses)[field - 2]))
+
+        # Each distinct time is formatted once
+        times = {seconds: format_time(seconds) if seconds >= 0 else self.symbols[-1 - seconds]
+                 for seconds in set(self._times)}
+        return list(map(times.__getitem__, self._times))
+
+    def matches(self, source):
+        """Return True if the snapshot still describes the CSV file ``source``"""
+        try:
+            return self.header["source"] == fingerprint(source)
+        except OSError:
+            return False
+
+
+def open_snapshot(path, source):
+    """Return the snapshot at ``path`` if it is current for ``source``, else None"""
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    return snapshot if snapshot.matches(source) else None
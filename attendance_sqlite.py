@@ -0,0 +1,241 @@
+import argparse
+import os
+import sqlite3
+import threading
+
+from attendance_journal import UPSERT, DELETE
+from attendance_metrics import metrics
+from attendance_store import RecordColumns
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    date TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    department TEXT NOT NULL,
+    status TEXT NOT NULL,
+    time TEXT NOT NULL,
+    PRIMARY KEY (date, row_id)
+);
+CREATE INDEX IF NOT EXISTS attendance_date_student ON attendance (date, student_id);
+CREATE INDEX IF NOT EXISTS attendance_student ON attendance (student_id, date);
+CREATE INDEX IF NOT EXISTS attendance_department ON attendance (department, date);
+"""
+
+UPSERT_SQL = "INSERT OR REPLACE INTO attendance VALUES (?, ?, ?, ?, ?, ?, ?)"
+DELETE_SQL = "DELETE FROM attendance WHERE date = ? AND row_id = ?"
+
+
+def connect(db_path, fsync=False):
+    """Open an attendance database in WAL mode, creating the schema"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SQLiteBackend:
+    """Stores attendance in one SQLite database shared by every day
+
+    A drop-in alternative to ``AttendanceJournal``: it loads one day into
+    an ``AttendanceStore`` and applies batches of upserts and deletes, each
+    batch in a single transaction with ``executemany``. The connection is
+    opened once and reused. Indexes on date, student and department make
+    questions across days cheap, see ``query``.
+    """
+
+    def __init__(self, db_path, date, fsync=False):
+        self.db_path = db_path
+        self.date = date
+        self.fsync = fsync
+        self.compaction_error = None
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_ids = {}
+        self._next_disk_id = 0
+
+    def load(self, store):
+        """Replace the store's contents with the day's records
+
+        The rows become the store's base in one step, so listeners see a
+        single load rather than an addition per row.
+        """
+        conn = self._connection()
+
+        with self._lock:
+            rows = conn.execute(
+                "SELECT row_id, student_id, name, department, status, time "
+                "FROM attendance WHERE date = ? ORDER BY row_id",
+                (self.date,)
+            )
+
+            # The base is numbered in row order, so row ID n is the nth row
+            records = RecordColumns()
+            self._disk_ids = {}
+            self._next_disk_id = 0
+            for disk_id, *record in rows:
+                self._disk_ids[records.append(record)] = disk_id
+                self._next_disk_id = disk_id + 1
+
+        store.set_base(records)
+
+    def upsert(self, row_id, record):
+        """Store an added or changed row"""
+        self.apply([(UPSERT, row_id, record)])
+
+    def delete(self, row_id):
+        """Remove a deleted row"""
+        self.apply([(DELETE, row_id, None)])
+
+    def apply(self, changes, atomic=False):
+        """Apply a batch of ``(UPSERT|DELETE, row_id, record)`` changes in one transaction
+
+        Every batch is a transaction, so ``atomic`` needs nothing more.
+        """
+        conn = self._connection()
+
+        with self._lock, metrics.timer("sqlite.apply"), conn:
+            upserts = []
+            for op, row_id, record in changes:
+                if op == UPSERT:
+                    disk_id = self._disk_ids.get(row_id)
+                    if disk_id is None:
+                        disk_id = self._disk_ids[row_id] = self._next_disk_id
+                        self._next_disk_id += 1
+                    upserts.append((self.date, disk_id, *record))
+                    continue
+
+                # Keep upserts and deletes in order around each delete
+                if upserts:
+                    conn.executemany(UPSERT_SQL, upserts)
+                    upserts = []
+                disk_id = self._disk_ids.pop(row_id, None)
+                if disk_id is not None:
+                    conn.execute(DELETE_SQL, (self.date, disk_id))
+
+            if upserts:
+                conn.executemany(UPSERT_SQL, upserts)
+
+    def should_compact(self):
+        """SQLite reuses free pages itself, so there is nothing to compact"""
+        return False
+
+    def compacting(self):
+        """Checkpoints run inline, so one is never in progress"""
+        return False
+
+    def compact(self, rows, wait=False):
+        """Checkpoint the write-ahead log into the database file"""
+        with self._lock, metrics.timer("sqlite.checkpoint"):
+            self._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def wait(self):
+        """Nothing runs in the background"""
+
+    def query(self, student_id=None, department=None, start=None, end=None):
+        """Yield ``(date, student_id, name, department, status, time)`` rows
+
+        Every argument is optional; ``start`` and ``end`` are inclusive
+        ``YYYY-MM-DD`` dates.
+        """
+        clauses = []
+        params = []
+        for clause, value in (("student_id = ?", student_id),
+                              ("department = ?", department),
+                              ("date >= ?", start),
+                              ("date <= ?", end)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = "SELECT date, student_id, name, department, status, time FROM attendance"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date, row_id"
+
+        # A separate connection keeps long reads out of the writer's way
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield from conn.execute(sql, params)
+        finally:
+            conn.close()
+
+    def dates(self, start=None, end=None):
+        """Return the days that have records, between inclusive ``start`` and ``end``"""
+        if not os.path.isfile(self.db_path):
+            return []
+        sql = "SELECT DISTINCT date FROM attendance WHERE date >= ? AND date <= ? ORDER BY date"
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [date for date, in conn.execute(sql, (start or "", end or "9999"))]
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.db_path, self.fsync)
+        return self._conn
+
+
+def migrate_csv(data_dir, db_path, replace=False):
+    """Bulk-load every day in a data folder into a database
+
+    Live and sealed days, and days written by several processes, are all
+    read. Days already present in the database are skipped unless
+    ``replace`` is set. Returns ``{date: rows loaded}``.
+    """
+    # Imported here, as the partitions module builds on this one
+    from attendance_partitions import iter_partition, list_partitions
+
+    conn = connect(db_path)
+    loaded = {}
+
+    try:
+        for date, path in list_partitions(data_dir):
+            with conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM attendance WHERE date = ? LIMIT 1", (date,)
+                ).fetchone()
+                if exists and not replace:
+                    continue
+
+                conn.execute("DELETE FROM attendance WHERE date = ?", (date,))
+                cursor = conn.executemany(
+                    UPSERT_SQL,
+                    ((date, disk_id, *record) for disk_id, record in enumerate(iter_partition(path)))
+                )
+                loaded[date] = cursor.rowcount
+    finally:
+        conn.close()
+
+    return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Migrate attendance CSV files into an SQLite database"
+    )
+    parser.add_argument("--data-dir", default="attendance_data")
+    parser.add_argument("--db", default=os.path.join("attendance_data", "attendance.db"))
+    parser.add_argument("--replace", action="store_true",
+                        help="reload days that are already in the database")
+    args = parser.parse_args(argv)
+
+    loaded = migrate_csv(args.data_dir, args.db, args.replace)
+    for date, count in loaded.items():
+        print(f"{date}: {count} record(s)")
+    print(f"Migrated {len(loaded)} day(s) into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+import csv
+import os
+from array import array
+
+HEADER = ["Student ID", "Name", "Department", "Status", "Time"]
+STATUSES = ("Present", "Absent", "Late")
+
+# One-byte status codes for RecordColumns; ODD marks a status or time kept as text
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+ODD = 255
+
+# Change events passed to store listeners
+ADDED = "added"
+UPDATED = "updated"
+DELETED = "deleted"
+CLEARED = "cleared"
+LOADED = "loaded"
+
+
+def parse_time(value):
+    """Return seconds since midnight for ``HH:MM:SS``, or None"""
+    if len(value) != 8 or value[2] != ":" or value[5] != ":" or not value.isascii():
+        return None
+    # int() would also take a sign or spaces, as in " 1:00:00"
+    if not (value[:2].isdigit() and value[3:5].isdigit() and value[6:].isdigit()):
+        return None
+    hours, minutes, seconds = int(value[:2]), int(value[3:5]), int(value[6:])
+    if hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_time(seconds):
+    """Return ``HH:MM:SS`` for seconds since midnight"""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def validate_record(record):
+    """Return why Submit would reject a record, or None if it is valid"""
+    student_id, name, _, status, time = record
+    if not student_id or not name:
+        return "Student ID and Name are required!"
+    if status not in STATUSES:
+        return f"Status must be one of {', '.join(STATUSES)}"
+    if parse_time(time) is None:
+        return "Time must be HH:MM:SS"
+    return None
+
+
+def read_csv(path):
+    """Yield attendance records from a day's CSV file"""
+    if not os.path.isfile(path):
+        return
+
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+
+        for row in reader:
+            if len(row) == 5:  # Ensure correct number of columns
+                yield tuple(row)
+
+
+def write_csv(path, records):
+    """Write attendance records to a CSV file, replacing its contents"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(records)
+
+
+class StringPool(dict):
+    """Interns strings as small integer codes, each distinct value stored once
+
+    ``pool[value]`` returns a string's code, adding it if it is new, and
+    ``pool.values[code]`` returns the string.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+
+    def __missing__(self, value):
+        code = self[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+
+class RecordColumns:
+    """Compact sequence of attendance records, one array per field
+
+    A row costs 17 bytes instead of a tuple of five strings: student IDs,
+    names and departments are pooled and stored as 32-bit codes, the
+    status as one byte and the time as seconds since midnight. Rows whose
+    status is not one of ``STATUSES`` or whose time is not ``HH:MM:SS``
+    keep both as text on the side, so every record reads back exactly as
+    it was written.
+
+    Indexing returns a fresh ``(student_id, name, department, status,
+    time)`` tuple. Rows can be appended and replaced but not removed, and
+    pooled strings are kept until the columns are dropped.
+    """
+
+    def __init__(self, records=()):
+        self.ids = StringPool()
+        self.names = StringPool()
+        self.departments = StringPool()
+
+        self._ids = array("I")
+        self._names = array("I")
+        self._departments = array("I")
+        self._statuses = array("B")
+        self._times = array("i")
+        self._odd = {}  # Index -> (status, time) as text
+        self._seconds = {}  # Parsed times, at most one per second of the day
+
+        self.extend(records)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._ids)
+        if not 0 <= index < len(self._ids):
+            raise IndexError(index)
+
+        status = self._statuses[index]
+        if status == ODD:
+            status, time = self._odd[index]
+        else:
+            status, time = STATUSES[status], format_time(self._times[index])
+        return (
+            self.ids.values[self._ids[index]],
+            self.names.values[self._names[index]],
+            self.departments.values[self._departments[index]],
+            status,
+            time,
+        )
+
+    def __setitem__(self, index, record):
+        if index < 0:
+            index += len(self._ids)
+        if not 0 <= index < len(self._ids):
+            raise IndexError(index)
+
+        student_id, name, dept, status, time = record
+        self._ids[index] = self.ids[student_id]
+        self._names[index] = self.names[name]
+        self._departments[index] = self.departments[dept]
+        self._statuses[index], self._times[index] = self._encode(index, status, time)
+
+    def __iter__(self):
+        for index in range(len(self._ids)):
+            yield self[index]
+
+    def append(self, record):
+        """Add a record and return its index"""
+        index = len(self._ids)
+        student_id, name, dept, status, time = record
+        code = STATUS_CODES.get(status)
+        seconds = self._seconds.get(time)
+        if code is None or seconds is None:
+            code, seconds = self._encode(index, status, time)
+
+        self._ids.append(self.ids[student_id])
+        self._names.append(self.names[name])
+        self._departments.append(self.departments[dept])
+        self._statuses.append(code)
+        self._times.append(seconds)
+        return index
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def column(self, field):
+        """Return one field of every row as a list, without decoding whole records"""
+        if field < 3:
+            pool, codes = ((self.ids, self._ids), (self.names, self._names),
+                           (self.departments, self._departments))[field]
+            return list(map(pool.values.__getitem__, codes))
+
+        if field == 3:
+            values = list(map((STATUSES + ("",) * (256 - len(STATUSES))).__getitem__, self._statuses))
+        else:
+            # Each distinct second is formatted once
+            times = {seconds: format_time(seconds) if seconds >= 0 else ""
+                     for seconds in set(self._times)}
+            values = list(map(times.__getitem__, self._times))
+        for index, odd in self._odd.items():
+            values[index] = odd[field - 3]
+        return values
+
+    def nbytes(self):
+        """Return the size of the column arrays, leaving out the pools"""
+        return sum(column.itemsize * len(column) for column in (
+            self._ids, self._names, self._departments, self._statuses, self._times
+        ))
+
+    def _encode(self, index, status, time):
+        """Return the status code and seconds for a row, noting odd values"""
+        code = STATUS_CODES.get(status)
+        seconds = parse_time(time)
+        if code is None or seconds is None:
+            self._odd[index] = (status, time)
+            return ODD, -1
+        self._odd.pop(index, None)
+        self._seconds[time] = seconds
+        return code, seconds
+
+
+class AttendanceStore:
+    """In-memory attendance records for one day, independent of any UI
+
+    Every record is a ``(student_id, name, department, status, time)``
+    tuple of strings, addressed by an integer row ID that stays stable
+    until the store is cleared. Row IDs are handed out in insertion order,
+    so iterating the store yields records in the order they were checked
+    in. Added rows are kept in ``RecordColumns``, so records are decoded
+    into tuples as they are read.
+
+    A day can be loaded with ``set_base``, which takes any sequence of
+    records (such as a memory-mapped ``Snapshot``) and uses it as rows
+    ``0 .. len(base) - 1`` without copying or decoding it. Changes to those
+    rows are kept on top of the base, and the per-student index is only
+    built the first time it is needed.
+
+    Listeners registered with ``subscribe`` are called as
+    ``listener(event, row_id, record, old)`` after every change, and with
+    ``LOADED`` after ``set_base``.
+    """
+
+    def __init__(self):
+        self._base = ()
+        self._changed = {}
+        self._deleted = set()
+        self._rows = RecordColumns()
+        self._by_student = None
+        self._next_id = 0
+        self._listeners = []
+
+    def __len__(self):
+        return self._next_id - len(self._deleted)
+
+    def __contains__(self, row_id):
+        return 0 <= row_id < self._next_id and row_id not in self._deleted
+
+    def __iter__(self):
+        return iter(self.row_ids())
+
+    def set_base(self, records):
+        """Replace the store's contents with a sequence of records"""
+        self._reset()
+        self._base = records
+        self._next_id = len(records)
+        self._notify(LOADED, None, None, None)
+
+    def add(self, record):
+        """Add a record and return its new row ID"""
+        record = tuple(record)
+        row_id = self._next_id
+        self._next_id += 1
+
+        self._rows.append(record)
+        if self._by_student is not None:
+            self._by_student.setdefault(record[0], []).append(row_id)
+        self._notify(ADDED, row_id, record, None)
+        return row_id
+
+    def extend(self, records):
+        """Add many records and return the first new row ID"""
+        first = self._next_id
+        for record in records:
+            self.add(record)
+        return first
+
+    def get(self, row_id):
+        """Return the record stored under a row ID"""
+        if row_id < len(self._base):
+            if row_id < 0 or row_id in self._deleted:
+                raise KeyError(row_id)
+            record = self._changed.get(row_id)
+            return record if record is not None else tuple(self._base[row_id])
+        if row_id >= self._next_id or row_id in self._deleted:
+            raise KeyError(row_id)
+        return self._rows[row_id - len(self._base)]
+
+    def update(self, row_id, record):
+        """Replace the record stored under a row ID, keeping its position"""
+        record = tuple(record)
+        old = self.get(row_id)
+        if row_id < len(self._base):
+            self._changed[row_id] = record
+        else:
+            self._rows[row_id - len(self._base)] = record
+
+        if old[0] != record[0] and self._by_student is not None:
+            self._unindex(old[0], row_id)
+            self._by_student.setdefault(record[0], []).append(row_id)
+        self._notify(UPDATED, row_id, record, old)
+        return old
+
+    def delete(self, row_id):
+        """Remove a record and return it"""
+        old = self.get(row_id)
+        self._deleted.add(row_id)
+        self._changed.pop(row_id, None)
+
+        if self._by_student is not None:
+            self._unindex(old[0], row_id)
+        self._notify(DELETED, row_id, None, old)
+        return old
+
+    def clear(self):
+        """Remove every record"""
+        self._reset()
+        self._notify(CLEARED, None, None, None)
+
+    def subscribe(self, listener):
+        """Call a listener after every change to the store"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop calling a listener registered with subscribe"""
+        self._listeners.remove(listener)
+
+    def row_ids(self):
+        """Return all row IDs in check-in order"""
+        if self._deleted:
+            return [row_id for row_id in range(self._next_id) if row_id not in self._deleted]
+        return list(range(self._next_id))
+
+    def items(self):
+        """Yield ``(row_id, record)`` pairs in check-in order"""
+        if self._deleted or self._changed:
+            for row_id in range(len(self._base)):
+                if row_id not in self._deleted:
+                    record = self._changed.get(row_id)
+                    yield row_id, record if record is not None else tuple(self._base[row_id])
+        else:
+            for row_id, record in enumerate(self._base):
+                yield row_id, tuple(record)
+
+        for row_id, record in enumerate(self._rows, len(self._base)):
+            if row_id not in self._deleted:
+                yield row_id, record
+
+    def column(self, field):
+        """Return one field of every record as a list, in check-in order
+
+        Columnar bases such as ``RecordColumns`` and ``Snapshot`` are read
+        a field at a time, which is much faster than decoding every record.
+        """
+        base = self._base
+        if hasattr(base, "column"):
+            values = base.column(field)
+        else:
+            values = [record[field] for record in base]
+        values += self._rows.column(field)
+
+        for row_id, record in self._changed.items():
+            values[row_id] = record[field]
+        if self._deleted:
+            values = [value for row_id, value in enumerate(values) if row_id not in self._deleted]
+        return values
+
+    def records(self):
+        """Yield all records in check-in order"""
+        for _, record in self.items():
+            yield record
+
+    def find_student(self, student_id):
+        """Return the row IDs recorded for a student ID"""
+        if self._by_student is None:
+            self._by_student = {}
+            for row_id, record in self.items():
+                self._by_student.setdefault(record[0], []).append(row_id)
+        return list(self._by_student.get(student_id, ()))
+
+    def load_csv(self, path):
+        """Replace the store's contents with the records in a CSV file"""
+        self.set_base(RecordColumns(read_csv(path)))
+
+    def write_csv(self, path):
+        """Write every record to a CSV file"""
+        write_csv(path, self.records())
+
+    def _reset(self):
+        self._base = ()
+        self._changed = {}
+        self._deleted = set()
+        self._rows = RecordColumns()
+        self._by_student = None
+        self._next_id = 0
+
+    def _notify(self, event, row_id, record, old):
+        for listener in self._listeners:
+            listener(event, row_id, record, old)
+
+    def _unindex(self, student_id, row_id):
+        row_ids = self._by_student[student_id]
+        row_ids.remove(row_id)
+        if not row_ids:
+            del self._by_student[student_id]
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from operator import itemgetter
+
+from attendance_backend import BACKENDS, DATA_DIR
+from attendance_export import list_days
+from attendance_history import STATUS_INDEX, summarize
+from attendance_metrics import metrics
+from attendance_store import ADDED, UPDATED, DELETED, CLEARED, LOADED, STATUSES
+
+SUMMARY_NAME = "attendance_summary.json"
+
+# Months in which a term starts; each term runs until the next one starts
+TERM_MONTHS = (1, 7)
+
+
+def term_start(date):
+    """Return the first day of the term ``date`` (``YYYY-MM-DD``) falls in"""
+    year, month = int(date[:4]), int(date[5:7])
+    months = [start for start in TERM_MONTHS if start <= month]
+    if not months:
+        year, months = year - 1, TERM_MONTHS
+    return f"{year:04d}-{max(months):02d}-01"
+
+
+def counts_path(data_dir, date):
+    """Return the file holding one counted day's counts, kept beside its records"""
+    return os.path.join(data_dir, f"attendance_{date}.counts")
+
+
+def _write_json(path, data):
+    """Write JSON, replacing the file atomically"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Counts:
+    """Present, absent and late counts in total, per student and per department
+
+    Every count is a ``[present, absent, late]`` list, as in
+    ``attendance_history``, so any lookup is a single dict access.
+    Records with a status the application does not know are not counted.
+    """
+
+    def __init__(self):
+        self.totals = [0, 0, 0]
+        self.students = {}
+        self.departments = {}
+
+    def add(self, student_id, department, status, count=1):
+        """Count a record, or take one off with a negative ``count``"""
+        index = STATUS_INDEX.get(status)
+        if index is None:
+            return
+        self.totals[index] += count
+        for counts, key in ((self.students, student_id), (self.departments, department)):
+            row = counts.get(key)
+            if row is None:
+                row = counts[key] = [0, 0, 0]
+            row[index] += count
+            if not any(row):
+                del counts[key]
+
+    def add_records(self, records, sign=1):
+        """Count many records, or take them off with ``sign=-1``"""
+        self.add_keys(map(itemgetter(0, 2, 3), records), sign)
+
+    def add_keys(self, keys, sign=1):
+        """Count ``(student_id, department, status)`` keys, one per record"""
+        # Counting whole keys in C is much faster than a Python loop per row
+        for (student_id, department, status), count in Counter(keys).items():
+            self.add(student_id, department, status, sign * count)
+
+    def merge(self, other, sign=1):
+        """Add another set of counts, or take it off with ``sign=-1``"""
+        for index, count in enumerate(other.totals):
+            self.totals[index] += sign * count
+        for mine, theirs in ((self.students, other.students), (self.departments, other.departments)):
+            for key, counts in theirs.items():
+                row = mine.get(key)
+                if row is None:
+                    row = mine[key] = [0, 0, 0]
+                for index, count in enumerate(counts):
+                    row[index] += sign * count
+                if not any(row):
+                    del mine[key]
+
+    def to_dict(self):
+        return {"totals": self.totals, "students": self.students, "departments": self.departments}
+
+    @classmethod
+    def from_dict(cls, data):
+        counts = cls()
+        counts.totals = list(data["totals"])
+        counts.students = {key: list(row) for key, row in data["students"].items()}
+        counts.departments = {key: list(row) for key, row in data["departments"].items()}
+        return counts
+
+
+class AttendanceSummary:
+    """Running attendance counts for the open day and for the term so far
+
+    ``day`` follows a store's changes as they happen: an add, edit or
+    delete moves a handful of counters. Like ``RecordIndex``, a load
+    only marks the day stale, and the first lookup after it recounts the
+    day in one pass over the store's columns.
+
+    ``past`` holds the term's earlier days. It is kept in ``SUMMARY_NAME``
+    in the data folder along with a fingerprint of each day counted, and
+    every day's own counts are kept beside its records, so ``refresh``
+    only reads days that are new or have changed since the last run; a
+    changed day has its old counts taken off before the new ones are
+    added.
+
+    Lookups add the day to the past, so they cost the same however many
+    records or days there are.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, backend="csv", store=None):
+        self.data_dir = data_dir
+        self.backend = backend
+        self.day = Counts()
+        self.past = Counts()
+        self.term = None
+        self.days = 0
+        self._refreshing = threading.Lock()
+        self._store = store
+        self._stale = False
+
+        if store is not None:
+            store.subscribe(self._on_change)
+
+    def overall(self, term=False):
+        """Return present, absent, late, attendance % and late % over every student"""
+        self._refresh_day()
+        return summarize(self._add(self.day.totals, self.past.totals if term else None))
+
+    def status(self, status, term=False):
+        """Return how many records have a status"""
+        return self.overall(term)[STATUS_INDEX[status]]
+
+    def student(self, student_id, term=False):
+        """Return present, absent, late, attendance % and late % for a student"""
+        return self._lookup("students", student_id, term)
+
+    def department(self, department, term=False):
+        """Return present, absent, late, attendance % and late % for a department"""
+        return self._lookup("departments", department, term)
+
+    def load_day(self, records):
+        """Count the open day afresh from its records"""
+        day = Counts()
+        day.add_records(records)
+        self.day = day
+
+    def refresh(self, today):
+        """Bring the term's days before ``today`` up to date and save them"""
+        with self._refreshing, metrics.timer("summary.refresh"):
+            start = term_start(today)
+            days = [day for day in list_days(self.data_dir, start, today, self.backend) if day[0] < today]
+            path = os.path.join(self.data_dir, SUMMARY_NAME)
+            state = _read_json(path)
+
+            past, seen = Counts(), {}
+            if state is not None and state.get("term") == start:
+                past, seen = Counts.from_dict(state["counts"]), dict(state["days"])
+            if not self._fold(past, seen, days):
+                # A changed day's old counts are lost, so count the term again
+                past, seen = Counts(), {}
+                self._fold(past, seen, days)
+
+            if state is None or state.get("term") != start or state["days"] != seen:
+                _write_json(path, {"term": start, "days": seen, "counts": past.to_dict()})
+            self.past, self.term, self.days = past, start, len(seen)
+
+    def refresh_async(self, today):
+        """Refresh on a background thread and return it, unless already refreshing"""
+        if self._refreshing.locked():
+            return None
+        thread = threading.Thread(target=self.refresh, args=(today,),
+                                  name="attendance-summary", daemon=True)
+        thread.start()
+        return thread
+
+    def _fold(self, past, seen, days):
+        """Count new and changed days into ``past``; False if a day could not be taken off"""
+        listed = {date for date, _, _ in days}
+        for date in [date for date in seen if date not in listed]:
+            if not self._take_off(past, date):
+                return False
+            del seen[date]
+
+        for date, fingerprint, read in days:
+            if date in seen:
+                # Days in an SQLite database have no fingerprint and are counted once
+                if fingerprint is None or seen[date] == fingerprint:
+                    continue
+                if not self._take_off(past, date):
+                    return False
+                del seen[date]
+
+            counts = Counts()
+            try:
+                counts.add_records(read())
+            except OSError:
+                continue  # Being sealed or reopened; counted on the next refresh
+            _write_json(counts_path(self.data_dir, date), counts.to_dict())
+            past.merge(counts)
+            seen[date] = fingerprint
+        return True
+
+    def _take_off(self, past, date):
+        data = _read_json(counts_path(self.data_dir, date))
+        if data is None:
+            return False
+        past.merge(Counts.from_dict(data), -1)
+        return True
+
+    def _refresh_day(self):
+        """Recount the day from the attached store after a load"""
+        if not self._stale:
+            return
+        self._stale = False
+        day = Counts()
+        with metrics.timer("summary.day"):
+            store = self._store
+            day.add_keys(zip(store.column(0), store.column(2), store.column(3)))
+        self.day = day
+
+    def _lookup(self, field, key, term):
+        self._refresh_day()
+        past = getattr(self.past, field).get(key) if term else None
+        return summarize(self._add(getattr(self.day, field).get(key, (0, 0, 0)), past))
+
+    def _add(self, counts, more):
+        if more is None:
+            return list(counts)
+        return [count + extra for count, extra in zip(counts, more)]
+
+    def _on_change(self, event, row_id, record, old):
+        if event == LOADED:
+            self.day = Counts()
+            self._stale = True
+        elif self._stale:
+            return  # The recount will pick the change up
+        elif event == CLEARED:
+            self.day = Counts()
+        elif event == ADDED:
+            self.day.add(record[0], record[2], record[3])
+        elif event == UPDATED:
+            self.day.add(old[0], old[2], old[3], -1)
+            self.day.add(record[0], record[2], record[3])
+        elif event == DELETED:
+            self.day.add(old[0], old[2], old[3], -1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Attendance counts for a day and for its term up to that day"
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="csv")
+    parser.add_argument("--date", help="day to summarize, YYYY-MM-DD (default: today)")
+    parser.add_argument("--department", help="also show this department")
+    parser.add_argument("--student", help="also show this student ID")
+    args = parser.parse_args(argv)
+
+    date = args.date or datetime.now().strftime("%Y-%m-%d")
+    summary = AttendanceSummary(args.data_dir, args.backend)
+    summary.refresh(date)
+    for day, _, read in list_days(args.data_dir, date, date, args.backend):
+        summary.load_day(read())
+
+    rows = [("All", summary.overall, None)]
+    if args.department:
+        rows.append((args.department, summary.department, args.department))
+    if args.student:
+        rows.append((args.student, summary.student, args.student))
+
+    print(f"Term from {summary.term}, {summary.days} earlier day(s) counted")
+    print(f"{'':<20} {'':<6} " + " ".join(f"{status:>8}" for status in STATUSES)
+          + f" {'Attend %':>9} {'Late %':>7}")
+    for label, lookup, key in rows:
+        for span, term in ((date, False), ("term", True)):
+            values = lookup(key, term) if key is not None else lookup(term)
+            present, absent, late, attendance, late_rate = values
+            print(f"{label:<20} {span[-5:] if not term else span:<6} "
+                  f"{present:>8} {absent:>8} {late:>8} {attendance:>9} {late_rate:>7}")
+
+
+if __name__ == "__main__":
+    main()
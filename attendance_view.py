@@ -0,0 +1,508 @@
+import bisect
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from attendance_metrics import metrics
+from attendance_store import ADDED, DELETED, CLEARED, LOADED
+
+# Column key, heading, width and anchor for the records tables
+COLUMNS = (
+    ("id", "Student ID", 120, tk.CENTER),
+    ("name", "Name", 180, tk.W),
+    ("dept", "Department", 180, tk.W),
+    ("status", "Status", 100, tk.CENTER),
+    ("time", "Time", 120, tk.CENTER),
+)
+
+# Longest a store change waits to be drawn: one frame at 60 fps
+FRAME_MS = 16
+
+# How long a notification stays up; errors stay twice as long
+TOAST_MS = 3000
+
+# Background and text colour of each kind of notification
+TOAST_COLOURS = {
+    "info": ("#2c3e50", "white"),
+    "warning": ("#d35400", "white"),
+    "error": ("#c0392b", "white"),
+}
+
+
+class RecordsView(ttk.Frame):
+    """Attendance table that only materializes the rows on screen
+
+    The view holds a list of row IDs and looks records up through
+    ``get_record`` when they scroll into sight. The underlying Treeview
+    only ever contains the visible rows plus ``buffer`` spare items, which
+    are refilled as the user scrolls, so showing a million records costs
+    the same as showing thirty.
+
+    Selection is tracked by row ID, so it survives scrolling, and supports
+    the usual click, Ctrl-click and Shift-click gestures. The Treeview
+    itself is exposed as ``tree`` for binding extra events. ``columns``
+    takes the same shape as ``COLUMNS``, for tables of other rows.
+
+    With a ``sorter`` (such as ``RecordIndex``) clicking a heading sorts
+    by that column, then sorts it descending, then returns to check-in
+    order. Rows are ordered with ``sorter.sort(row_ids, column, reverse)``
+    and rows added later are put in place with ``sorter.key(column)``, so
+    the view never reads records back to compare them.
+    """
+
+    def __init__(self, master, get_record, buffer=5, columns=COLUMNS, sorter=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.get_record = get_record
+        self.buffer = buffer
+        self.sorter = sorter
+
+        self._row_ids = []
+        self._top = 0
+        self._visible = 20
+        self._items = []
+        self._item_rows = {}
+        self._selection = set()
+        self._anchor = None
+        self._sort = None  # (column, reverse), or None for the order rows were given in
+        self._headings = [column[:2] for column in columns]
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=[column[0] for column in columns],
+            show="headings",
+            selectmode="extended"
+        )
+
+        for index, (key, heading, width, anchor) in enumerate(columns):
+            self.tree.heading(key, text=heading, anchor=anchor)
+            self.tree.column(key, width=width, anchor=anchor)
+            if sorter is not None:
+                self.tree.heading(key, command=lambda index=index: self.sort_by(index))
+
+        self.scrollbar = ttk.Scrollbar(
+            self,
+            orient=tk.VERTICAL,
+            command=self._on_scrollbar
+        )
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        # Take over scrolling and selection from the Treeview
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Button-1>", lambda e: self._on_click(e, "set"))
+        self.tree.bind("<Control-Button-1>", lambda e: self._on_click(e, "toggle"))
+        self.tree.bind("<Shift-Button-1>", lambda e: self._on_click(e, "range"))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._visible))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._visible))
+        self.tree.bind("<Home>", lambda e: self._scroll_to(0))
+        self.tree.bind("<End>", lambda e: self._scroll_to(len(self._row_ids)))
+
+    def __len__(self):
+        return len(self._row_ids)
+
+    def set_rows(self, row_ids):
+        """Show the given row IDs, in order or sorted, from the top"""
+        self._row_ids = self._ordered(row_ids)
+        self._selection.intersection_update(self._row_ids)
+        self._top = 0
+        self._render()
+
+    def append(self, row_id):
+        """Add a row to the end of the view, or in place when sorted"""
+        self.extend((row_id,))
+
+    def extend(self, row_ids):
+        """Add many rows to the end of the view, or in place when sorted, redrawing once"""
+        if self._sort is None:
+            self._row_ids.extend(row_ids)
+        else:
+            column, reverse = self._sort
+            key = self.sorter.key(column)
+            if reverse:
+                key = lambda row_id, key=key: -key(row_id)
+            for row_id in row_ids:
+                bisect.insort(self._row_ids, row_id, key=key)
+        self._render()
+
+    def sort_by(self, column):
+        """Sort by a column, then descending, then back to check-in order"""
+        if self._sort is None or self._sort[0] != column:
+            self._sort = (column, False)
+        elif not self._sort[1]:
+            self._sort = (column, True)
+        else:
+            self._sort = None
+
+        for index, (key, heading) in enumerate(self._headings):
+            if self._sort is not None and self._sort[0] == index:
+                heading += " \u25bc" if self._sort[1] else " \u25b2"
+            self.tree.heading(key, text=heading)
+
+        # Row IDs are handed out in check-in order
+        self._row_ids = self._ordered(self._row_ids) if self._sort else sorted(self._row_ids)
+        self._top = 0
+        self._render()
+
+    def remove(self, row_ids):
+        """Remove rows from the view"""
+        row_ids = set(row_ids)
+        self._row_ids = [row_id for row_id in self._row_ids if row_id not in row_ids]
+        self._selection -= row_ids
+        self._scroll_to(self._top)
+
+    def refresh(self):
+        """Redraw the visible rows after their records changed"""
+        self._render()
+
+    def selection(self):
+        """Return the selected row IDs in display order"""
+        if not self._selection:
+            return []
+        return [row_id for row_id in self._row_ids if row_id in self._selection]
+
+    def selection_set(self, row_ids):
+        """Replace the selection"""
+        self._selection = set(row_ids)
+        self._render()
+
+    def identify_row(self, y):
+        """Return the row ID at a y coordinate, or None"""
+        return self._item_rows.get(self.tree.identify_row(y))
+
+    def see(self, row_id):
+        """Scroll so a row is visible"""
+        index = self._row_ids.index(row_id)
+        if not self._top <= index < self._top + self._visible:
+            self._scroll_to(index - self._visible // 2)
+
+    def _ordered(self, row_ids):
+        if self._sort is None:
+            return list(row_ids)
+        column, reverse = self._sort
+        return self.sorter.sort(row_ids, column, reverse)
+
+    def _render(self):
+        """Fill the materialized items with the records in view"""
+        with metrics.timer("view.render"):
+            rows = self._row_ids[self._top:self._top + self._visible + self.buffer]
+
+            while len(self._items) < len(rows):
+                self._items.append(self.tree.insert("", tk.END))
+            while len(self._items) > len(rows):
+                self.tree.delete(self._items.pop())
+
+            self._item_rows = {}
+            selected = []
+            for item, row_id in zip(self._items, rows):
+                self.tree.item(item, values=self.get_record(row_id))
+                self._item_rows[item] = row_id
+                if row_id in self._selection:
+                    selected.append(item)
+
+            self.tree.selection_set(selected)
+            self.tree.yview_moveto(0)
+            self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self._row_ids)
+        if total <= self._visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + self._visible) / total)
+
+    def _scroll_to(self, top):
+        last = max(0, len(self._row_ids) - self._visible)
+        self._top = max(0, min(int(top), last))
+        self._render()
+        return "break"
+
+    def _scroll_by(self, rows):
+        return self._scroll_to(self._top + rows)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * len(self._row_ids))
+        elif unit == "pages":
+            self._scroll_by(int(amount) * self._visible)
+        else:
+            self._scroll_by(int(amount))
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, event.height // row_height - 1)  # Less the heading row
+        if visible != self._visible:
+            self._visible = visible
+            self._scroll_to(self._top)
+
+    def _on_click(self, event, mode):
+        self.tree.focus_set()
+        row_id = self.identify_row(event.y)
+        if row_id is None:
+            return None  # Let headings and the empty area behave normally
+
+        if mode == "toggle":
+            self._selection ^= {row_id}
+            self._anchor = row_id
+        elif mode == "range" and self._anchor in self._selection:
+            start = self._row_ids.index(self._anchor)
+            end = self._row_ids.index(row_id)
+            if start > end:
+                start, end = end, start
+            self._selection = set(self._row_ids[start:end + 1])
+        else:
+            self._selection = {row_id}
+            self._anchor = row_id
+
+        self._render()
+        self.event_generate("<<RecordsSelect>>")
+        return "break"
+
+    def _move_selection(self, step):
+        if not self._row_ids:
+            return "break"
+
+        if self._anchor in self._selection:
+            index = self._row_ids.index(self._anchor) + step
+        else:
+            index = self._top
+        index = max(0, min(index, len(self._row_ids) - 1))
+
+        self._anchor = self._row_ids[index]
+        self._selection = {self._anchor}
+        self.see(self._anchor)
+        self._render()
+        self.event_generate("<<RecordsSelect>>")
+        return "break"
+
+
+class SuggestionList:
+    """Drop-down of suggestions under an entry, refreshed as the user types
+
+    ``lookup(text)`` returns ``(label, value)`` pairs for the entry's text
+    and ``on_pick(value)`` is called when one is chosen by clicking it or
+    pressing Return. Down moves from the entry into the list and Escape
+    closes it. The list is a plain Listbox placed over the window, so it
+    needs no window of its own.
+    """
+
+    def __init__(self, entry, lookup, on_pick, rows=8):
+        self.entry = entry
+        self.lookup = lookup
+        self.on_pick = on_pick
+        self.rows = rows
+
+        self._values = []
+        self._text = None
+
+        self.listbox = tk.Listbox(
+            entry.winfo_toplevel(),
+            height=rows,
+            activestyle="dotbox",
+            exportselection=False
+        )
+
+        entry.bind("<KeyRelease>", self._on_key, add="+")
+        entry.bind("<Down>", self._focus_list, add="+")
+        entry.bind("<Escape>", lambda e: self.hide(), add="+")
+        entry.bind("<FocusOut>", self._on_focus_out, add="+")
+        self.listbox.bind("<ButtonRelease-1>", self._pick)
+        self.listbox.bind("<Return>", self._pick)
+        self.listbox.bind("<Escape>", lambda e: self._back_to_entry())
+        self.listbox.bind("<FocusOut>", self._on_focus_out)
+
+    def update(self):
+        """Look up suggestions for the entry's text and show or hide the list"""
+        text = self.entry.get().strip()
+        self._text = text
+        suggestions = self.lookup(text) if text else []
+        if not suggestions:
+            self.hide()
+            return
+
+        self._values = [value for _, value in suggestions]
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *(label for label, _ in suggestions))
+        self.listbox.config(height=min(self.rows, len(suggestions)))
+        self.listbox.place(in_=self.entry, x=0, rely=1.0, relwidth=1.0)
+        self.listbox.lift()
+
+    def hide(self):
+        """Close the list"""
+        self.listbox.place_forget()
+        self._values = []
+
+    def _on_key(self, event):
+        # Only a change to the text needs a new lookup
+        if self.entry.get().strip() != self._text:
+            self.update()
+
+    def _focus_list(self, event):
+        if not self._values:
+            return None
+        self.listbox.focus_set()
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(0)
+        self.listbox.activate(0)
+        return "break"
+
+    def _back_to_entry(self):
+        self.hide()
+        self.entry.focus_set()
+
+    def _pick(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return None
+        value = self._values[selection[0]]
+        self._back_to_entry()
+        self.on_pick(value)
+        self._text = self.entry.get().strip()
+        return "break"
+
+    def _on_focus_out(self, event):
+        # Wait for focus to land, since it may be moving between entry and list
+        self.entry.after(100, self._hide_unless_focused)
+
+    def _hide_unless_focused(self):
+        try:
+            focus = self.entry.focus_get()
+        except KeyError:
+            focus = None  # Focus is in a popup Tk does not know by name
+        if focus not in (self.entry, self.listbox):
+            self.hide()
+
+
+class UpdateScheduler:
+    """Draws store changes in record views once a frame instead of once a change
+
+    Store events are only noted as they arrive, so a burst of thousands
+    of adds, edits or deletes costs one extend, one removal pass and one
+    redraw per view when the frame is flushed, ``interval`` ms after the
+    first of them. ``views()`` returns the open views: new rows go to the
+    first, which shows the whole day, and removals and redraws go to all.
+    A load or clear shows every row of the store in each view again.
+    ``on_flush()``, if given, is called after every flush that drew
+    something.
+
+    Events from other threads, such as a background load, are noted but
+    not scheduled, since only the Tk thread may touch widgets; call
+    ``flush`` from it once they are done.
+    """
+
+    def __init__(self, widget, store, views, interval=FRAME_MS, on_flush=None):
+        self.widget = widget
+        self.store = store
+        self.views = views
+        self.interval = interval
+        self.on_flush = on_flush
+
+        self._lock = threading.Lock()
+        self._job = None
+        self._reset()
+        store.subscribe(self._on_change)
+
+    def flush(self):
+        """Draw every change noted so far"""
+        with self._lock:
+            self._job = None
+            reload, added, removed, changed = self._reload, self._added, self._removed, self._changed
+            self._reset()
+        if not (reload or added or removed or changed):
+            return
+
+        with metrics.timer("ui.flush"):
+            views = self.views()
+            if reload:
+                row_ids = self.store.row_ids()
+                for view in views:
+                    view.set_rows(row_ids)
+            else:
+                if removed:
+                    for view in views:
+                        view.remove(removed)
+                if added:
+                    views[0].extend([row_id for row_id in added if row_id not in removed])
+                if changed:
+                    for view in views:
+                        view.refresh()
+                metrics.count("ui.flushed_rows", len(added) + len(removed))
+
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _reset(self):
+        self._reload = False
+        self._added = []
+        self._removed = set()
+        self._changed = False
+
+    def _on_change(self, event, row_id, record, old):
+        with self._lock:
+            if event in (LOADED, CLEARED):
+                self._reset()
+                self._reload = True
+            elif self._reload:
+                pass  # Everything is shown again anyway
+            elif event == ADDED:
+                self._added.append(row_id)
+            elif event == DELETED:
+                self._removed.add(row_id)
+            else:
+                self._changed = True
+
+            if self._job is None and threading.current_thread() is threading.main_thread():
+                self._job = self.widget.after(self.interval, self.flush)
+
+
+class Toast:
+    """Notification shown over the bottom of a window for a few seconds
+
+    Unlike a message box it neither blocks the event loop nor waits for
+    a click: a new message replaces the one showing and restarts its
+    timer, so a burst of notices never piles up. Clicking it hides it.
+    """
+
+    def __init__(self, master, duration=TOAST_MS):
+        self.master = master
+        self.duration = duration
+        self._job = None
+
+        self.label = tk.Label(
+            master,
+            padx=12,
+            pady=6,
+            justify=tk.LEFT,
+            wraplength=520,
+            font=("Helvetica", 10)
+        )
+        self.label.bind("<Button-1>", lambda e: self.hide())
+
+    def show(self, text, kind="info"):
+        """Show a message; ``kind`` is info, warning or error"""
+        background, foreground = TOAST_COLOURS[kind]
+        self.label.config(text=text, background=background, foreground=foreground)
+        self.label.place(relx=0.5, rely=1.0, y=-40, anchor=tk.S)
+        self.label.lift()
+
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+        duration = self.duration * 2 if kind == "error" else self.duration
+        self._job = self.master.after(duration, self.hide)
+
+    def hide(self):
+        """Take the message down"""
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
+        self.label.place_forget()
@@ -0,0 +1,168 @@
+import queue
+import threading
+import time
+
+from attendance_journal import UPSERT, DELETE
+from attendance_metrics import metrics
+
+COMPACT = "C"
+TRANSACTION = "T"
+_STOP = "S"
+
+
+class AttendanceWriter:
+    """Write-behind thread that persists store changes in batches
+
+    Changes are queued by the caller and written by a single background
+    thread. Whatever has queued up while the previous batch was being
+    written goes out as the next batch (group commit), up to
+    ``batch_size`` changes; when fewer are waiting the thread lingers up
+    to ``max_latency`` seconds for more. Durability per batch is decided
+    by the backend's ``fsync`` setting.
+
+    Compactions are queued like any other change, so the snapshot passed
+    to ``compact`` always matches exactly the changes written before it.
+    A ``transaction`` is never split across or merged into batches: it
+    is written on its own as one atomic ``apply``.
+    The backend is an ``AttendanceJournal`` or ``SQLiteBackend``.
+    ``close`` drains the queue before returning, so nothing accepted is
+    lost on a clean shutdown.
+    """
+
+    def __init__(self, backend, batch_size=512, max_latency=0.005, max_pending=10000):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.max_pending = max_pending
+        self.error = None
+        self.batches = 0
+        self.written = 0
+
+        self._queue = queue.Queue()
+        self._compaction_queued = False
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                name="attendance-writer",
+                daemon=True
+            )
+            self._thread.start()
+
+    def upsert(self, row_id, record):
+        """Queue an added or changed record"""
+        self._queue.put((UPSERT, row_id, record))
+
+    def delete(self, row_id):
+        """Queue a deleted record"""
+        self._queue.put((DELETE, row_id, None))
+
+    def transaction(self, changes):
+        """Queue ``(UPSERT|DELETE, row_id, record)`` changes to be written all or nothing"""
+        self._queue.put((TRANSACTION, None, list(changes)))
+
+    def compact(self, rows, force=False):
+        """Queue a compaction of the journal into ``rows``
+
+        Unless ``force`` is set, returns False without queueing when a
+        compaction is already waiting.
+        """
+        if self._compaction_queued and not force:
+            return False
+        self._compaction_queued = True
+        self._queue.put((COMPACT, None, rows))
+        return True
+
+    def compaction_queued(self):
+        """Return True while a queued compaction has not started yet"""
+        return self._compaction_queued
+
+    def pending(self):
+        """Return the number of queued changes not yet written"""
+        return self._queue.qsize()
+
+    def backlogged(self):
+        """Return True when the queue is longer than ``max_pending``"""
+        return self.pending() >= self.max_pending
+
+    def flush(self):
+        """Block until every queued change has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        if self._thread is None:
+            # Never started, so drain on the calling thread
+            self._queue.put((_STOP, None, None))
+            self._run()
+            return
+
+        self._queue.put((_STOP, None, None))
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_latency
+
+            while len(batch) < self.batch_size and batch[-1][0] != _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+
+            stop = self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Write a batch and return True when it ends with a stop request"""
+        changes = []
+        for op, row_id, record in batch:
+            if op in (UPSERT, DELETE):
+                changes.append((op, row_id, record))
+                continue
+
+            # Transactions, compactions and stop requests apply after the changes before them
+            self._commit(changes)
+            changes = []
+            if op == TRANSACTION:
+                self._commit(record, atomic=True)
+            elif op == COMPACT:
+                try:
+                    with metrics.timer("writer.compact"):
+                        self.backend.compact(record)
+                except Exception as e:
+                    self.error = e
+                self._compaction_queued = False
+            elif op == _STOP:
+                return True
+
+        self._commit(changes)
+        return False
+
+    def _commit(self, changes, atomic=False):
+        if not changes:
+            return
+        try:
+            with metrics.timer("writer.apply"):
+                self.backend.apply(changes, atomic=atomic)
+            self.batches += 1
+            self.written += len(changes)
+            metrics.count("writer.batches")
+            metrics.count("writer.rows", len(changes))
+            metrics.gauge("writer.pending", self._queue.qsize())
+        except Exception as e:
+            self.error = e
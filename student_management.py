@@ -1,14 +1,82 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import csv
+import argparse
 import os
+import queue
+import threading
+import time
 from tkinter import font as tkfont
 
+from attendance_backend import BACKENDS, DATA_DIR, csv_path, open_backend
+from attendance_facets import FACETS, RecordIndex, bitmap_filter, bitmap_rows
+from attendance_metrics import metrics
+from attendance_partitions import PartitionManager
+from attendance_roster import Roster, roster_path
+from attendance_search import SearchIndex
+from attendance_store import AttendanceStore, STATUSES, validate_record
+from attendance_summary import AttendanceSummary
+from attendance_view import RecordsView, SuggestionList, Toast, UpdateScheduler
+from attendance_writer import AttendanceWriter
+
+# Delay between the last keystroke and running a search
+SEARCH_DELAY_MS = 150
+
+# How often the status bar checks on the background writer
+WRITER_POLL_MS = 250
+
+# How often other clients' or processes' changes are fetched
+SYNC_POLL_MS = 1000
+
+# How often the date is checked, to move on to a new day after midnight
+ROLLOVER_POLL_MS = 30000
+
+# Roster matches offered while typing an ID or name
+SUGGESTIONS = 8
+
+# How often imported batches are taken in, and how long each turn may take;
+# half a frame, so the views are still redrawn at 60 fps during an import
+IMPORT_POLL_MS = 16
+IMPORT_BUDGET_MS = 8
+
+# Imported batches waiting for the main thread before the reader pauses
+IMPORT_QUEUE_BATCHES = 8
+
+# How often the event loop is probed for blocking when metrics are on
+UI_PROBE_MS = 100
+
+# How often the background load of the day's records is checked on
+LOAD_POLL_MS = 50
+
+# Time from creating the window to it being ready for input that startup
+# is held to, however many records the day has
+STARTUP_BUDGET_MS = 500
+
+# How often a running report or export is checked on
+REPORT_POLL_MS = 100
+
+# How often the background count of the term's earlier days is checked on
+SUMMARY_POLL_MS = 200
+
+# Label of each facet the View Records window filters on, by record field
+FACET_LABELS = {2: "Department", 3: "Status"}
+
+# Tab label for each report table
+REPORT_TABS = {"students": "Students", "below": "Below Threshold", "trends": "Department Trends"}
+
+# File extension for each export format offered
+EXPORT_FORMATS = {
+    "CSV": ".csv",
+    "CSV (gzip)": ".csv.gz",
+    "JSON Lines": ".jsonl",
+    "JSON Lines (gzip)": ".jsonl.gz",
+}
+
 class AttendanceSystem:
-    def __init__(self, root):
+    def __init__(self, root, backend="csv", server=None, metrics_file=None):
+        self.started = time.perf_counter()
         self.root = root
-        self.root.title("Smart Attendance System")
+        self.root.title("Smart Attendance System" + (f" - {server}" if server else ""))
         self.root.geometry("900x700")
         self.root.resizable(True, True)
         
@@ -16,14 +84,77 @@ class AttendanceSystem:
         self.configure_styles()
         
         # Create data directory if it doesn't exist
-        if not os.path.exists('attendance_data'):
-            os.makedirs('attendance_data')
+        if not os.path.exists(DATA_DIR):
+            os.makedirs(DATA_DIR)
             
-        self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.csv_file = f"attendance_data/attendance_{self.current_date}.csv"
+        # As a thin client the server owns the day's records and files
+        self.server = server
+        self.sync_errors = (OSError,)
+        if server:
+            # Imported here, as only a thin client needs the HTTP and asyncio modules
+            from attendance_client import AttendanceClient, ClientError, RemoteBackend
+            client = AttendanceClient(server)
+            self.current_date = client.status()["date"]
+            self.backend = RemoteBackend(client)
+            self.sync_errors = (ClientError, OSError)
+        else:
+            self.current_date = datetime.now().strftime("%Y-%m-%d")
+            self.backend = open_backend(backend, DATA_DIR, self.current_date)
+        self.csv_file = csv_path(DATA_DIR, self.current_date)
+        
+        # Records live in the store; the treeview only renders them
+        self.store = AttendanceStore()
+        self.writer = AttendanceWriter(self.backend)
+        self.batches = None  # Created by the first batch
+        self.search_index = SearchIndex(self.store)
+        self.record_index = RecordIndex(self.store)
+        self.summary = AttendanceSummary(DATA_DIR, backend, self.store)
+        self.summary_loader = None
+        self.search_job = None
+        self.view_tree = None
+        self.backend_kind = backend
+        self.import_queue = None
+        self.import_rows = None  # Rest of the imported batch being taken in
+        self.loader = None
+        self.load_error = None
+        self.startup_ms = None
+        
+        # Known students, indexed in the background for autocomplete
+        self.roster = Roster(roster_path(DATA_DIR))
+        self.roster.load_async()
+        self.autofilled = None
         
         self.setup_ui()
         
+        # Store changes are drawn in the views once a frame, however many arrive
+        self.updates = UpdateScheduler(self.root, self.store, self.record_views,
+                                       on_flush=self.update_dashboard)
+        
+        # The form is usable once drawn; the day's records follow in the background
+        self.root.after_idle(self.report_startup)
+        self.load_records()
+        self.refresh_summary()
+        
+        # Persist changes on a background thread
+        self.writer.start()
+        self.poll_writer()
+        if hasattr(self.backend, "sync"):
+            self.root.after(SYNC_POLL_MS, self.poll_changes)
+        
+        # Roll over at midnight and seal finished days; a server does both itself
+        self.partitions = PartitionManager(DATA_DIR, backend)
+        if not server:
+            self.partitions.seal_async()
+            self.root.after(ROLLOVER_POLL_MS, self.poll_rollover)
+        
+        # Opt-in instrumentation, dumped to a file in the background
+        if metrics_file:
+            metrics.start_dump(metrics_file)
+            self.probe_ui(time.perf_counter())
+        
+        # Drain the writer and close the backend when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
     def configure_styles(self):
         """Configure custom styles for the application"""
         self.style = ttk.Style()
@@ -45,6 +176,9 @@ class AttendanceSystem:
         
     def setup_ui(self):
         """Setup the main user interface"""
+        # Menu bar
+        self.setup_menu()
+        
         # Main container frame
         self.main_frame = ttk.Frame(self.root, padding="15")
         self.main_frame.pack(fill=tk.BOTH, expand=True)
@@ -58,11 +192,48 @@ class AttendanceSystem:
         # Button section
         self.setup_button_section()
         
+        # Status bar
+        self.setup_status_bar()
+        
         # Records section
         self.setup_records_section()
         
-        # Load existing records
-        self.load_records()
+        # Notifications, shown over the window without blocking it
+        self.toast = Toast(self.root)
+    
+    def setup_menu(self):
+        """Setup the menu bar with import and export commands"""
+        self.menu_bar = tk.Menu(self.root)
+        
+        file_menu = tk.Menu(self.menu_bar, tearoff=0)
+        file_menu.add_command(label="Import Check-ins...", command=self.import_checkins)
+        file_menu.add_command(label="Import Roster...", command=self.import_roster)
+        file_menu.add_separator()
+        file_menu.add_command(label="Export to CSV", command=self.export_to_csv)
+        file_menu.add_command(label="Export Records...", command=self.open_export)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.on_close)
+        self.menu_bar.add_cascade(label="File", menu=file_menu)
+        
+        edit_menu = tk.Menu(self.menu_bar, tearoff=0)
+        edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=self.undo_batch)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Mark Unmarked Students Absent", command=self.mark_unmarked)
+        edit_menu.add_command(label="Fix Department...", command=self.open_fix_department)
+        self.menu_bar.add_cascade(label="Edit", menu=edit_menu)
+        self.root.bind("<Control-z>", lambda e: self.undo_batch())
+        
+        reports_menu = tk.Menu(self.menu_bar, tearoff=0)
+        reports_menu.add_command(label="Attendance Reports...", command=self.open_reports)
+        self.menu_bar.add_cascade(label="Reports", menu=reports_menu)
+        
+        self.tools_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.tools_menu.add_command(label="Start Profiling", accelerator="F12",
+                                    command=self.toggle_profile)
+        self.menu_bar.add_cascade(label="Tools", menu=self.tools_menu)
+        self.root.bind("<F12>", lambda e: self.toggle_profile())
+        
+        self.root.config(menu=self.menu_bar)
     
     def setup_header(self):
         """Setup the header section"""
@@ -84,6 +255,15 @@ class AttendanceSystem:
             font=('Helvetica', 10, 'italic')
         )
         self.date_label.pack(side=tk.RIGHT)
+        
+        # Running counts for the day, the term and the student or department entered
+        dashboard = ttk.Frame(self.header_frame)
+        dashboard.pack(side=tk.RIGHT, padx=(0, 20))
+        self.dashboard_labels = []
+        for row in range(3):
+            label = ttk.Label(dashboard, text="", font=('Helvetica', 9))
+            label.grid(row=row, column=0, sticky=tk.E)
+            self.dashboard_labels.append(label)
     
     def setup_input_section(self):
         """Setup the student information input section"""
@@ -122,14 +302,63 @@ class AttendanceSystem:
         self.status_combobox = ttk.Combobox(
             self.input_frame, 
             textvariable=self.status_var,
-            values=["Present", "Absent", "Late"],
+            values=list(STATUSES),
             state="readonly"
         )
         self.status_combobox.grid(row=3, column=1, padx=5, pady=5, sticky=tk.EW)
         
+        # Suggest roster students while typing an ID or name
+        self.id_suggestions = SuggestionList(
+            self.id_entry,
+            lambda text: self.suggest_students(self.roster.by_id(text, SUGGESTIONS)),
+            self.fill_student
+        )
+        self.name_suggestions = SuggestionList(
+            self.name_entry,
+            lambda text: self.suggest_students(self.roster.by_name(text, SUGGESTIONS)),
+            self.fill_student
+        )
+        self.id_entry.bind("<KeyRelease>", lambda e: self.autofill_student(), add="+")
+        for entry in (self.id_entry, self.dept_entry):
+            entry.bind("<KeyRelease>", lambda e: self.update_dashboard(), add="+")
+        
         # Set focus to ID entry
         self.id_entry.focus_set()
     
+    def suggest_students(self, students):
+        """Return roster students as suggestion labels and values"""
+        return [
+            (f"{student_id} - {name}" + (f" ({dept})" if dept else ""), (student_id, name, dept))
+            for student_id, name, dept in students
+        ]
+    
+    def fill_student(self, student):
+        """Fill the ID, name and department fields from the roster"""
+        student_id, name, dept = student
+        if self.id_entry.get().strip() != student_id:
+            self.id_entry.delete(0, tk.END)
+            self.id_entry.insert(0, student_id)
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, name)
+        self.dept_entry.delete(0, tk.END)
+        self.dept_entry.insert(0, dept)
+        self.autofilled = student
+        self.update_dashboard()
+    
+    def autofill_student(self):
+        """Fill name and department once the ID matches a known student
+        
+        Fields the operator typed themselves are left alone.
+        """
+        student = self.roster.get(self.id_entry.get().strip())
+        if student is None or student == self.autofilled:
+            return
+        
+        filled = self.autofilled or ("", "", "")
+        if (self.name_entry.get() in ("", filled[1])
+                and self.dept_entry.get() in ("", filled[2])):
+            self.fill_student(student)
+    
     def setup_button_section(self):
         """Setup the button section"""
         self.button_frame = ttk.Frame(self.main_frame)
@@ -174,6 +403,17 @@ class AttendanceSystem:
         )
         self.clear_button.grid(row=0, column=3, padx=5, sticky=tk.EW)
     
+    def setup_status_bar(self):
+        """Setup the status bar at the bottom of the window"""
+        status_frame = ttk.Frame(self.main_frame)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
+        
+        # Startup and load times on the right, writer status on the left
+        self.startup_label = ttk.Label(status_frame, text="", anchor=tk.E)
+        self.startup_label.pack(side=tk.RIGHT)
+        self.status_label = ttk.Label(status_frame, text="", anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    
     def setup_records_section(self):
         """Setup the attendance records display section"""
         self.records_frame = ttk.LabelFrame(
@@ -183,42 +423,9 @@ class AttendanceSystem:
         )
         self.records_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Configure treeview columns
-        columns = ("id", "name", "dept", "status", "time")
-        
-        # Create treeview with scrollbar
-        self.records_tree = ttk.Treeview(
-            self.records_frame, 
-            columns=columns, 
-            show="headings",
-            selectmode="extended"
-        )
-        
-        # Define headings
-        self.records_tree.heading("id", text="Student ID", anchor=tk.CENTER)
-        self.records_tree.heading("name", text="Name", anchor=tk.W)
-        self.records_tree.heading("dept", text="Department", anchor=tk.W)
-        self.records_tree.heading("status", text="Status", anchor=tk.CENTER)
-        self.records_tree.heading("time", text="Time", anchor=tk.CENTER)
-        
-        # Define column widths
-        self.records_tree.column("id", width=120, anchor=tk.CENTER)
-        self.records_tree.column("name", width=180, anchor=tk.W)
-        self.records_tree.column("dept", width=180, anchor=tk.W)
-        self.records_tree.column("status", width=100, anchor=tk.CENTER)
-        self.records_tree.column("time", width=120, anchor=tk.CENTER)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(
-            self.records_frame, 
-            orient=tk.VERTICAL, 
-            command=self.records_tree.yview
-        )
-        self.records_tree.configure(yscrollcommand=scrollbar.set)
-        
-        # Grid layout
+        # Virtual treeview that only renders the visible rows
+        self.records_tree = RecordsView(self.records_frame, self.store.get, sorter=self.record_index)
         self.records_tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
         
         # Configure grid weights
         self.records_frame.grid_rowconfigure(0, weight=1)
@@ -239,24 +446,34 @@ class AttendanceSystem:
             command=self.edit_selected_record
         )
         
+        # Change the status of every selected record at once
+        status_menu = tk.Menu(self.context_menu, tearoff=0)
+        for status in STATUSES:
+            status_menu.add_command(
+                label=status, 
+                command=lambda status=status: self.set_selected_status(status)
+            )
+        self.context_menu.add_cascade(label="Set Status", menu=status_menu)
+        
         # Bind right-click event
-        self.records_tree.bind(
+        self.records_tree.tree.bind(
             "<Button-3>", 
             lambda event: self.show_context_menu(event)
         )
     
     def show_context_menu(self, event):
         """Show the context menu on right-click"""
-        item = self.records_tree.identify_row(event.y)
-        if item:
-            self.records_tree.selection_set(item)
+        row_id = self.records_tree.identify_row(event.y)
+        if row_id is not None:
+            if row_id not in self.records_tree.selection():
+                self.records_tree.selection_set([row_id])
             self.context_menu.post(event.x_root, event.y_root)
     
     def delete_selected_records(self):
-        """Delete selected records from the treeview and CSV"""
+        """Delete selected records from the treeview and storage"""
         selected_items = self.records_tree.selection()
         if not selected_items:
-            messagebox.showwarning("No Selection", "Please select records to delete")
+            self.toast.show("Please select records to delete", "warning")
             return
             
         confirm = messagebox.askyesno(
@@ -265,30 +482,23 @@ class AttendanceSystem:
         )
         
         if confirm:
-            # Delete from treeview
-            for item in selected_items:
-                self.records_tree.delete(item)
-            
-            # Rewrite CSV file
-            self.rewrite_csv_file()
+            with metrics.timer("ui.delete"):
+                # One transaction for store and storage; the views follow on the next frame
+                if self.run_batch("delete", selected_items) is None:
+                    return
+            metrics.count("ui.rows_deleted", len(selected_items))
             
-            messagebox.showinfo(
-                "Success", 
-                f"Deleted {len(selected_items)} record(s)"
-            )
+            self.toast.show(f"Deleted {len(selected_items)} record(s) (Ctrl+Z to undo)")
     
     def edit_selected_record(self):
         """Edit the selected record"""
         selected_item = self.records_tree.selection()
         if not selected_item or len(selected_item) > 1:
-            messagebox.showwarning(
-                "Invalid Selection", 
-                "Please select a single record to edit"
-            )
+            self.toast.show("Please select a single record to edit", "warning")
             return
             
         # Get record data
-        item_data = self.records_tree.item(selected_item[0])['values']
+        item_data = self.store.get(selected_item[0])
         
         # Create edit window
         edit_window = tk.Toplevel(self.root)
@@ -320,7 +530,7 @@ class AttendanceSystem:
         status_combobox = ttk.Combobox(
             edit_window, 
             textvariable=status_var,
-            values=["Present", "Absent", "Late"],
+            values=list(STATUSES),
             state="readonly"
         )
         status_combobox.pack(fill=tk.X, padx=20, pady=5)
@@ -335,117 +545,497 @@ class AttendanceSystem:
                 name_entry.get(),
                 dept_entry.get(),
                 status_var.get(),
+                item_data[4],
                 edit_window
             )
         )
         save_button.pack(pady=10)
     
-    def save_edited_record(self, item, student_id, student_name, department, status, window):
-        """Save the edited record"""
-        if not student_id or not student_name:
-            messagebox.showwarning("Input Error", "Student ID and Name are required!")
-            return
-            
-        # Update treeview
-        self.records_tree.item(
-            item, 
-            values=(student_id, student_name, department, status, datetime.now().strftime("%H:%M:%S"))
-        )
-        # Rewrite CSV file
-        self.rewrite_csv_file()
+    def save_edited_record(self, row_id, student_id, student_name, department, status, time, window):
+        """Save the edited record, keeping the time it was checked in at"""
+        record = (student_id, student_name, department, status, time)
+        with metrics.timer("ui.edit"):
+            # Update store and storage; the views follow on the next frame
+            if self.run_batch("edit", row_id, record, parent=window) is None:
+                return
         
         # Close edit window
         window.destroy()
         
-        messagebox.showinfo("Success", "Record updated successfully!")
+        self.toast.show("Record updated successfully!")
+    
+    def save_record(self, row_id, record):
+        """Queue an added or changed record for storage"""
+        self.writer.upsert(row_id, record)
+        self.compact_journal()
+        self.update_writer_status()
     
-    def rewrite_csv_file(self):
-        """Rewrite the entire CSV file with current treeview data"""
+    def run_batch(self, operation, *args, parent=None, kind="error"):
+        """Apply a ``BatchEditor`` operation by name, queue it for storage and return its result
+        
+        The editor is created, and its module imported, on first use. An
+        invalid batch changes nothing; it is shown in a toast of ``kind``,
+        or a warning over ``parent``, and None is returned.
+        """
+        from attendance_batch import BatchEditor, BatchError
+        
+        if self.batches is None:
+            self.batches = BatchEditor(self.store, self.writer)
         try:
-            with open(self.csv_file, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Student ID", "Name", "Department", "Status", "Time"])
-                
-                for child in self.records_tree.get_children():
-                    writer.writerow(self.records_tree.item(child)["values"])
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save changes:\n{str(e)}")
+            result = getattr(self.batches, operation)(*args)
+        except BatchError as e:
+            if parent is not None:
+                messagebox.showwarning("Input Error", str(e), parent=parent)
+            else:
+                self.toast.show(str(e), kind)
+            return None
+        
+        self.compact_journal()
+        self.update_writer_status()
+        return result
+    
+    def set_selected_status(self, status):
+        """Give every selected record the same status in one transaction"""
+        selected_items = self.records_tree.selection()
+        if not selected_items:
+            self.toast.show("Please select records to change", "warning")
+            return
+        count = self.run_batch("set_status", selected_items, status)
+        if count is None:
+            return
+        self.toast.show(f"Marked {count} record(s) {status} (Ctrl+Z to undo)")
+    
+    def mark_unmarked(self):
+        """Record every roster student without a check-in today as Absent"""
+        if self.still_loading():
+            return
+        if not self.roster.ready.is_set():
+            self.toast.show("The roster is still loading.")
+            return
+        students = self.roster.students()
+        if not students:
+            self.toast.show("The roster is empty; import one first", "warning")
+            return
+        
+        unmarked = sum(1 for student in students if not self.store.find_student(student[0]))
+        if not unmarked:
+            self.toast.show("Every student on the roster is already marked")
+            return
+        if not messagebox.askyesno("Confirm", f"Mark {unmarked} unmarked student(s) Absent?"):
+            return
+        
+        count = self.run_batch("mark_unmarked", students)
+        if count is None:
+            return
+        self.toast.show(f"Marked {count} student(s) Absent (Ctrl+Z to undo)")
+    
+    def open_fix_department(self):
+        """Open a window to move every record of one department to another"""
+        if self.still_loading():
+            return
+        departments = [value for value, _ in self.record_index.values(2)]
+        if not departments:
+            self.toast.show("No attendance records found for today.")
+            return
+        
+        fix_window = tk.Toplevel(self.root)
+        fix_window.title("Fix Department")
+        fix_window.geometry("350x200")
+        fix_window.resizable(False, False)
+        self.center_window(fix_window)
+        
+        ttk.Label(fix_window, text="Records in department:").pack(pady=(10, 0))
+        old_var = tk.StringVar(value=departments[0])
+        ttk.Combobox(
+            fix_window, 
+            textvariable=old_var,
+            values=departments,
+            state="readonly"
+        ).pack(fill=tk.X, padx=20, pady=5)
+        
+        ttk.Label(fix_window, text="Move to department:").pack()
+        new_entry = ttk.Entry(fix_window)
+        new_entry.pack(fill=tk.X, padx=20, pady=5)
+        
+        ttk.Button(
+            fix_window, 
+            text="Move Records",
+            command=lambda: self.fix_department(old_var.get(), new_entry.get().strip(), fix_window)
+        ).pack(pady=10)
+    
+    def fix_department(self, old, new, window):
+        """Move every record of one department to another in one transaction"""
+        if not new or new == old:
+            messagebox.showwarning("Input Error", "Enter a different department", parent=window)
+            return
+        
+        row_ids = bitmap_rows(self.record_index.select({2: {old}}) or 0)
+        count = self.run_batch("set_department", row_ids, new, parent=window)
+        if count is None:
+            return
+        window.destroy()
+        self.toast.show(f"Moved {count} record(s) from {old} to {new} (Ctrl+Z to undo)")
+    
+    def undo_batch(self):
+        """Revert the latest delete, edit or bulk change"""
+        if self.still_loading():
+            return
+        label = self.run_batch("undo", kind="warning")
+        if label is None:
+            return
+        self.toast.show(f"Undone: {label}")
+    
+    def compact_journal(self, force=False):
+        """Fold the CSV journal into the CSV file once it has grown large"""
+        if force:
+            self.writer.compact(list(self.store.items()), force=True)
+            self.writer.flush()
+            self.backend.wait()
+        elif self.backend.should_compact() and not self.writer.compaction_queued():
+            self.writer.compact(list(self.store.items()))
+    
+    def poll_writer(self):
+        """Periodically report writer back-pressure and errors"""
+        self.update_writer_status()
+        self.root.after(WRITER_POLL_MS, self.poll_writer)
+    
+    def poll_changes(self):
+        """Periodically show changes made by other clients or processes"""
+        if self.loader is not None:
+            self.root.after(SYNC_POLL_MS, self.poll_changes)
+            return
+        
+        try:
+            if self.server:
+                changes = self.backend.sync(self.store, flush=self.writer.flush)
+            else:
+                changes = self.backend.sync(self.store)
+        except self.sync_errors as e:
+            self.status_label.config(text=str(e))
+        else:
+            if changes is None:
+                # The server's day was reloaded, perhaps rolled over
+                self.show_date(self.backend.client.status()["date"])
+        
+        self.root.after(SYNC_POLL_MS, self.poll_changes)
+    
+    def update_writer_status(self):
+        """Show writer back-pressure and errors in the status bar"""
+        error = self.writer.error or self.backend.compaction_error
+        if error is not None:
+            self.writer.error = self.backend.compaction_error = None
+            messagebox.showerror("Error", f"Failed to save changes:\n{str(error)}")
+        
+        pending = self.writer.pending()
+        if self.writer.backlogged():
+            self.status_label.config(
+                text=f"Saving is falling behind: {pending} change(s) queued"
+            )
+        elif pending:
+            self.status_label.config(text=f"Saving {pending} change(s)...")
+        else:
+            self.status_label.config(text="All changes saved")
     
     def submit_attendance(self):
         """Submit a new attendance record"""
+        if self.still_loading():
+            return
+        
         student_id = self.id_entry.get().strip()
         student_name = self.name_entry.get().strip()
         department = self.dept_entry.get().strip()
         status = self.status_var.get()
+        current_time = datetime.now().strftime("%H:%M:%S")
+        record = (student_id, student_name, department, status, current_time)
         
         # Validate input
-        if not student_id or not student_name:
-            messagebox.showwarning(
-                "Input Error", 
-                "Student ID and Name are required!"
-            )
+        error = validate_record(record)
+        if error is not None:
+            self.toast.show(error, "warning")
             return
         
-        current_time = datetime.now().strftime("%H:%M:%S")
+        with metrics.timer("ui.submit"):
+            # Add to the store; the views follow on the next frame
+            row_id = self.store.add(record)
+            
+            # Persist the record
+            self.save_record(row_id, record)
+            
+            # Remember new or changed students for autocomplete
+            self.roster.remember((student_id, student_name, department))
+            
+            # Clear input fields
+            self.clear_fields()
+        
+        # Show success message
+        self.toast.show(f"Attendance recorded for {student_name} ({student_id})")
+    
+    def import_checkins(self):
+        """Import check-ins from a CSV or JSON Lines file in the background"""
+        from attendance_import import CheckinImporter
+        
+        if self.still_loading():
+            return
+        path = self.ask_import_file("Import Check-ins")
+        if not path:
+            return
         
-        # Add to treeview
-        self.records_tree.insert(
-            "", 
-            tk.END, 
-            values=(student_id, student_name, department, status, current_time)
+        # Today's rows come back through the queue; other days go straight to disk
+        self.import_queue = queue.Queue(IMPORT_QUEUE_BATCHES)
+        importer = CheckinImporter(DATA_DIR, self.backend_kind, other_days=not self.server)
+        importer.attach(
+            self.current_date,
+            (record[0] for record in self.store.records()),
+            lambda records: self.import_queue.put(("batch", records))
         )
+        self.start_import(lambda: importer.run(
+            path,
+            progress=lambda summary: self.import_queue.put(
+                ("progress", f"Importing... {summary.read} row(s) read")
+            )
+        ))
+    
+    def import_roster(self):
+        """Merge students from a CSV or JSON Lines file into the roster"""
+        from attendance_import import import_roster
         
-        # Save to CSV
-        self.save_to_csv(student_id, student_name, department, status, current_time)
+        path = self.ask_import_file("Import Roster")
+        if not path:
+            return
         
-        # Clear input fields
-        self.clear_fields()
+        def run():
+            self.roster.flush()  # The import rewrites the file
+            summary = import_roster(path, DATA_DIR)
+            self.roster.load()
+            return summary
         
-        # Show success message
-        messagebox.showinfo(
-            "Success", 
-            f"Attendance recorded for {student_name} ({student_id})"
+        self.import_queue = queue.Queue(IMPORT_QUEUE_BATCHES)
+        self.start_import(run)
+    
+    def ask_import_file(self, title):
+        """Ask for a file to import unless an import is already running"""
+        if self.import_queue is not None:
+            self.toast.show("An import is already running", "warning")
+            return None
+        
+        return filedialog.askopenfilename(
+            title=title,
+            filetypes=[("CSV or JSON Lines", "*.csv *.jsonl *.json"), ("All files", "*.*")]
         )
     
-    def save_to_csv(self, student_id, student_name, department, status, time):
-        """Save a record to the CSV file"""
-        file_exists = os.path.isfile(self.csv_file)
-        
-        with open(self.csv_file, "a", newline="") as f:
-            writer = csv.writer(f)
+    def start_import(self, run):
+        """Run an import on a background thread and take in its results"""
+        def work():
+            try:
+                self.import_queue.put(("done", run()))
+            except Exception as e:
+                self.import_queue.put(("failed", e))
+        
+        self.status_label.config(text="Importing...")
+        threading.Thread(target=work, name="attendance-import", daemon=True).start()
+        self.root.after(IMPORT_POLL_MS, self.poll_import)
+    
+    def poll_import(self):
+        """Add imported batches to the store a slice at a time
+        
+        A batch holds thousands of rows, so the deadline is checked after
+        every row and the rest of the batch is picked up on the next turn.
+        """
+        deadline = time.monotonic() + IMPORT_BUDGET_MS / 1000
+        while time.monotonic() < deadline:
+            if self.import_rows is not None:
+                # Add to the store; the views follow on the next frame
+                for record in self.import_rows:
+                    row_id = self.store.add(record)
+                    self.writer.upsert(row_id, record)
+                    if time.monotonic() >= deadline:
+                        break
+                else:
+                    self.import_rows = None
+                continue
             
-            # Write header if file doesn't exist
-            if not file_exists:
-                writer.writerow(["Student ID", "Name", "Department", "Status", "Time"])
+            try:
+                kind, payload = self.import_queue.get_nowait()
+            except queue.Empty:
+                break
             
-            writer.writerow([student_id, student_name, department, status, time])
+            if kind == "batch":
+                self.import_rows = iter(payload)
+            elif kind == "progress":
+                self.status_label.config(text=payload)
+            else:
+                self.finish_import(kind, payload)
+                return
+        
+        self.root.after(IMPORT_POLL_MS, self.poll_import)
+    
+    def finish_import(self, kind, payload):
+        """Report an import once all of its rows have been taken in"""
+        self.import_queue = None
+        self.compact_journal()
+        self.update_writer_status()
+        
+        if kind == "failed":
+            self.toast.show(f"An error occurred while importing:\n{str(payload)}", "error")
+        else:
+            self.toast.show(str(payload))
+    
+    def report_startup(self):
+        """Show how long the window took to become ready for input"""
+        elapsed = time.perf_counter() - self.started
+        metrics.observe("ui.startup", elapsed)
+        self.startup_ms = elapsed * 1000
+        over = " (over budget)" if self.startup_ms > STARTUP_BUDGET_MS else ""
+        self.startup_label.config(text=f"Ready in {self.startup_ms:.0f} ms{over}")
     
     def load_records(self):
-        """Load records from CSV file into the treeview"""
-        if not os.path.isfile(self.csv_file):
+        """Load the day's records from storage on a background thread
+        
+        The form can be filled in meanwhile; submitting and anything else
+        that needs the whole day waits until ``poll_load`` sees it done.
+        """
+        def work():
+            try:
+                self.backend.load(self.store)
+            except Exception as e:
+                self.load_error = e
+        
+        self.load_error = None
+        self.load_started = time.perf_counter()
+        self.submit_button.config(state=tk.DISABLED)
+        self.loader = threading.Thread(target=work, name="attendance-load", daemon=True)
+        self.loader.start()
+        self.root.after(LOAD_POLL_MS, self.poll_load)
+    
+    def poll_load(self):
+        """Show the day's records once the background load has finished"""
+        # Also wait for the startup time, so the load is reported after it
+        if self.loader.is_alive() or self.startup_ms is None:
+            self.startup_label.config(text=f"Loading records... {len(self.store)}")
+            self.root.after(LOAD_POLL_MS, self.poll_load)
             return
         
-        self.records_tree.delete(*self.records_tree.get_children())
+        self.loader = None
+        self.submit_button.config(state=tk.NORMAL)
+        if self.load_error is not None:
+            self.startup_label.config(text="")
+            messagebox.showerror("Load Error", f"Could not load today's records:\n{str(self.load_error)}")
+            return
         
-        with open(self.csv_file, "r") as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header
-            
-            for row in reader:
-                if len(row) == 5:  # Ensure correct number of columns
-                    self.records_tree.insert(
-                        "", 
-                        tk.END, 
-                        values=(row[0], row[1], row[2], row[3], row[4])
-                    )
+        self.compact_journal()
+        self.updates.flush()
+        self.update_dashboard()
+        elapsed = time.perf_counter() - self.load_started
+        metrics.observe("ui.load", elapsed)
+        metrics.gauge("store.rows", len(self.store))
+        self.startup_label.config(
+            text=f"Ready in {self.startup_ms:.0f} ms, "
+                 f"{len(self.store)} record(s) loaded in {elapsed * 1000:.0f} ms"
+        )
+    
+    def poll_rollover(self):
+        """Move on to a new day's records once the date has changed"""
+        if self.loader is None and self.import_queue is None:
+            date = self.partitions.today()
+            if date != self.current_date:
+                self.open_day(date)
+            self.partitions.seal_async()
+        self.root.after(ROLLOVER_POLL_MS, self.poll_rollover)
+    
+    def open_day(self, date):
+        """Close the current day's storage and load ``date`` in its place"""
+        self.writer.close()
+        self.backend.wait()
+        self.backend.close()
+        error = self.writer.error or self.backend.compaction_error
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to save changes:\n{str(error)}")
+        
+        # The View Records window shows the old day's rows
+        if self.view_tree is not None:
+            self.view_tree.winfo_toplevel().destroy()
+        
+        self.csv_file = csv_path(DATA_DIR, date)
+        self.show_date(date)
+        self.backend = open_backend(self.backend_kind, DATA_DIR, date)
+        self.writer = AttendanceWriter(self.backend)
+        self.writer.start()
+        self.batches = None
+        self.updates.flush()
+        self.records_tree.set_rows([])
+        self.load_records()
+        self.refresh_summary()
+    
+    def refresh_summary(self):
+        """Count the term's days before the open one in the background
+        
+        A thin client has no day files to count, so it shows the day only.
+        """
+        if self.server or self.summary_loader is not None:
+            return
+        self.summary_loader = self.summary.refresh_async(self.current_date)
+        if self.summary_loader is not None:
+            self.root.after(SUMMARY_POLL_MS, self.poll_summary)
+    
+    def poll_summary(self):
+        """Show the term's counts once they are up to date"""
+        if self.summary_loader.is_alive():
+            self.root.after(SUMMARY_POLL_MS, self.poll_summary)
+            return
+        self.summary_loader = None
+        self.update_dashboard()
+    
+    def update_dashboard(self):
+        """Show running counts for the day, the term and the student or department entered"""
+        # Until the day has loaded its counts are incomplete
+        if self.loader is not None:
+            return
+        
+        def line(label, counts):
+            present, absent, late, attendance, _ = counts
+            return f"{label}: {present} present, {absent} absent, {late} late ({attendance}%)"
+        
+        term = not self.server
+        lines = [line("Today", self.summary.overall())]
+        if not term:
+            lines.append("")
+        elif self.summary.term is None:
+            lines.append("Term: counting...")
+        else:
+            lines.append(line(f"Term, {self.summary.days + 1} day(s)", self.summary.overall(term=True)))
+        
+        student_id = self.id_entry.get().strip()
+        department = self.dept_entry.get().strip()
+        span = "this term" if term else "today"
+        student = self.summary.student(student_id, term) if student_id else None
+        if student is not None and any(student[:3]):
+            lines.append(line(f"{student_id} {span}", student))
+        elif department:
+            lines.append(line(f"{department} {span}", self.summary.department(department, term)))
+        else:
+            lines.append("")
+        
+        for label, text in zip(self.dashboard_labels, lines):
+            label.config(text=text)
+    
+    def show_date(self, date):
+        """Show the day whose records are open in the header"""
+        self.current_date = date
+        self.date_label.config(text=f"Date: {date}")
+    
+    def still_loading(self):
+        """Say so and return True while the day's records are still loading"""
+        if self.loader is None:
+            return False
+        self.toast.show("Today's records are still loading.")
+        return True
     
     def view_records(self):
         """Open a window to view all records with search functionality"""
-        if not self.records_tree.get_children():
-            messagebox.showinfo(
-                "Information", 
-                "No attendance records found for today."
-            )
+        if self.still_loading():
+            return
+        if not self.store:
+            self.toast.show("No attendance records found for today.")
             return
         
         # Create view window
@@ -468,7 +1058,7 @@ class AttendanceSystem:
             width=40
         )
         search_entry.pack(side=tk.LEFT, padx=(0, 5))
-        search_entry.bind("<KeyRelease>", lambda e: self.search_records(view_window))
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_search(view_window))
         
         # Clear button
         clear_button = ttk.Button(
@@ -478,105 +1068,456 @@ class AttendanceSystem:
         )
         clear_button.pack(side=tk.LEFT, padx=5)
         
-        # Records treeview
-        columns = ("id", "name", "dept", "status", "time")
-        self.view_tree = ttk.Treeview(
-            view_window, 
-            columns=columns, 
-            show="headings",
-            selectmode="extended"
-        )
-        
-        # Configure headings
-        self.view_tree.heading("id", text="Student ID", anchor=tk.CENTER)
-        self.view_tree.heading("name", text="Name", anchor=tk.W)
-        self.view_tree.heading("dept", text="Department", anchor=tk.W)
-        self.view_tree.heading("status", text="Status", anchor=tk.CENTER)
-        self.view_tree.heading("time", text="Time", anchor=tk.CENTER)
-        
-        # Configure columns
-        self.view_tree.column("id", width=120, anchor=tk.CENTER)
-        self.view_tree.column("name", width=180, anchor=tk.W)
-        self.view_tree.column("dept", width=180, anchor=tk.W)
-        self.view_tree.column("status", width=100, anchor=tk.CENTER)
-        self.view_tree.column("time", width=120, anchor=tk.CENTER)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(
-            view_window, 
-            orient=tk.VERTICAL, 
-            command=self.view_tree.yview
-        )
-        self.view_tree.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack components
-        self.view_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Match count
+        self.search_status = ttk.Label(search_frame, text="")
+        self.search_status.pack(side=tk.LEFT, padx=5)
+        
+        # Facets: values of one facet are ORed, facets are ANDed
+        facet_frame = ttk.Frame(view_window, padding=(10, 0, 10, 10))
+        facet_frame.pack(fill=tk.X)
+        self.facet_vars = {column: {} for column in FACETS}
+        self.facet_buttons = {}
+        for column in FACETS:
+            button = ttk.Menubutton(facet_frame, text=FACET_LABELS[column])
+            menu = tk.Menu(button, tearoff=0)
+            menu.config(postcommand=lambda column=column, menu=menu: self.fill_facet_menu(column, menu, view_window))
+            button.config(menu=menu)
+            button.pack(side=tk.LEFT, padx=(0, 5))
+            self.facet_buttons[column] = button
+        
+        ttk.Button(
+            facet_frame, 
+            text="Clear Filters", 
+            command=lambda: self.clear_facets(view_window)
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Virtual records treeview, sortable by heading
+        self.view_tree = RecordsView(view_window, self.store.get, sorter=self.record_index)
+        self.view_tree.pack(fill=tk.BOTH, expand=True)
+        view_window.bind("<Destroy>", lambda e: self.close_view(e, view_window))
         
         # Load all records initially
         self.clear_search(view_window)
     
+    def close_view(self, event, view_window):
+        """Forget the View Records table once its window is closed"""
+        if event.widget is view_window:
+            self.view_tree = None
+    
+    def record_views(self):
+        """Return the open tables showing records"""
+        views = [self.records_tree]
+        if self.view_tree is not None:
+            views.append(self.view_tree)
+        return views
+    
     def clear_search(self, view_window):
         """Clear search results and show all records"""
         self.search_var.set("")
-        self.view_tree.delete(*self.view_tree.get_children())
-        
-        for child in self.records_tree.get_children():
-            values = self.records_tree.item(child)["values"]
-            self.view_tree.insert("", tk.END, values=values)
+        self.show_matches(None)
+    
+    def fill_facet_menu(self, column, menu, view_window):
+        """List a facet's values with their record counts as the menu opens"""
+        menu.delete(0, tk.END)
+        variables = self.facet_vars[column]
+        for value, count in self.record_index.values(column):
+            if value not in variables:
+                variables[value] = tk.BooleanVar(value=False)
+            menu.add_checkbutton(
+                label=f"{value} ({count})", 
+                variable=variables[value], 
+                command=lambda: self.search_records(view_window)
+            )
+    
+    def clear_facets(self, view_window):
+        """Drop every facet filter"""
+        for variables in self.facet_vars.values():
+            for variable in variables.values():
+                variable.set(False)
+        self.search_records(view_window)
+    
+    def facet_selection(self):
+        """Return the chosen values of each facet, labelling its button with the count"""
+        selection = {}
+        for column, variables in self.facet_vars.items():
+            selection[column] = {value for value, variable in variables.items() if variable.get()}
+            label = FACET_LABELS[column]
+            if selection[column]:
+                label += f" ({len(selection[column])})"
+            self.facet_buttons[column].config(text=label)
+        return selection
+    
+    def schedule_search(self, view_window):
+        """Search once typing pauses instead of on every keystroke"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        
+        self.search_job = self.root.after(
+            SEARCH_DELAY_MS, 
+            lambda: self.search_records(view_window)
+        )
     
     def search_records(self, view_window):
         """Search records based on search term"""
-        search_term = self.search_var.get().lower()
+        self.search_job = None
+        if not view_window.winfo_exists():
+            return
+        
+        search_term = self.search_var.get()
         
         if not search_term:
             self.clear_search(view_window)
             return
-            
-        self.view_tree.delete(*self.view_tree.get_children())
         
-        for child in self.records_tree.get_children():
-            values = self.records_tree.item(child)["values"]
+        with metrics.timer("ui.search"):
+            matches = self.search_index.search(search_term)
+            shown = self.show_matches(matches)
+        
+        if not shown:
+            self.search_status.config(text="No matches found.")
+    
+    def show_matches(self, row_ids):
+        """Show the given rows, or every row for None, narrowed by the facets
+        
+        Only the visible window is redrawn.
+        """
+        bitmap = self.record_index.select(self.facet_selection())
+        if bitmap is not None:
+            row_ids = bitmap_rows(bitmap) if row_ids is None else bitmap_filter(row_ids, bitmap)
+        elif row_ids is None:
+            row_ids = self.store.row_ids()
+        self.view_tree.set_rows(row_ids)
+        self.search_status.config(text=f"{len(row_ids)} record(s)")
+        return len(row_ids)
+    
+    def open_reports(self):
+        """Open a window with attendance rates, absence streaks and trends"""
+        # Imported on first use, since NumPy alone takes longer than the rest of startup
+        from attendance_analytics import STUDENT_HEADER, TREND_HEADER, TABLES
+        
+        report_window = tk.Toplevel(self.root)
+        report_window.title("Attendance Reports")
+        report_window.geometry("950x550")
+        self.center_window(report_window)
+        
+        # Range and threshold
+        options_frame = ttk.Frame(report_window, padding="10")
+        options_frame.pack(fill=tk.X)
+        
+        ttk.Label(options_frame, text="From:").pack(side=tk.LEFT, padx=(0, 5))
+        self.report_start = ttk.Entry(options_frame, width=12)
+        self.report_start.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(options_frame, text="To:").pack(side=tk.LEFT, padx=(0, 5))
+        self.report_end = ttk.Entry(options_frame, width=12)
+        self.report_end.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(options_frame, text="Below %:").pack(side=tk.LEFT, padx=(0, 5))
+        self.report_threshold = tk.StringVar(value="75")
+        ttk.Spinbox(
+            options_frame, 
+            from_=0, 
+            to=100, 
+            width=5, 
+            textvariable=self.report_threshold
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(
+            options_frame, 
+            text="Run", 
+            command=lambda: self.run_report(report_window)
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            options_frame, 
+            text="Export...", 
+            command=self.export_report
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.report_status = ttk.Label(options_frame, text="Leave the dates empty for all days")
+        self.report_status.pack(side=tk.LEFT, padx=5)
+        
+        # One virtual table per report
+        self.report_tabs = ttk.Notebook(report_window)
+        self.report_tabs.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.report = None
+        self.report_views = {}
+        for table in TABLES:
+            header = TREND_HEADER if table == "trends" else STUDENT_HEADER
+            columns = [
+                (f"c{index}", heading, 150 if index < 3 else 90, tk.W if index < 3 else tk.CENTER)
+                for index, heading in enumerate(header)
+            ]
+            view = RecordsView(
+                self.report_tabs, 
+                lambda row, table=table: self.report.table(table)[1][row], 
+                columns=columns
+            )
+            self.report_tabs.add(view, text=REPORT_TABS[table])
+            self.report_views[table] = view
+        
+        self.run_report(report_window)
+    
+    def run_report(self, report_window):
+        """Compute the report on a background thread"""
+        from attendance_analytics import Report, load_attendance
+        
+        start = self.report_start.get().strip() or None
+        end = self.report_end.get().strip() or None
+        try:
+            for date in (start, end):
+                if date is not None:
+                    datetime.strptime(date, "%Y-%m-%d")
+            threshold = float(self.report_threshold.get())
+        except ValueError:
+            messagebox.showwarning("Input Error", "Dates must be YYYY-MM-DD and Below % a number", parent=report_window)
+            return
+        
+        results = queue.Queue()
+        
+        def work():
+            try:
+                results.put(("done", Report(load_attendance(DATA_DIR, start, end, self.backend_kind), threshold)))
+            except Exception as e:
+                results.put(("failed", e))
+        
+        self.report_status.config(text="Computing...")
+        threading.Thread(target=work, name="attendance-report", daemon=True).start()
+        self.root.after(REPORT_POLL_MS, lambda: self.poll_report(report_window, results))
+    
+    def poll_report(self, report_window, results):
+        """Show a finished report in its window"""
+        if not report_window.winfo_exists():
+            return
+        try:
+            kind, payload = results.get_nowait()
+        except queue.Empty:
+            self.root.after(REPORT_POLL_MS, lambda: self.poll_report(report_window, results))
+            return
+        
+        if kind == "failed":
+            self.report_status.config(text="")
+            messagebox.showerror("Report Error", f"Could not compute the report:\n{str(payload)}", parent=report_window)
+            return
+        
+        self.report = payload
+        for table, view in self.report_views.items():
+            view.set_rows(range(len(payload.table(table)[1])))
+        self.report_status.config(
+            text=f"{len(payload.dates)} day(s), {payload.records} record(s), "
+                 f"{len(payload.below)} below {payload.threshold:g}% "
+                 f"({payload.elapsed * 1000:.0f} ms)"
+        )
+    
+    def export_report(self):
+        """Export the report table on screen to CSV or JSON"""
+        from attendance_analytics import TABLES
+        
+        if self.report is None:
+            messagebox.showwarning("Export Error", "No report to export yet!")
+            return
+        
+        table = TABLES[self.report_tabs.index(self.report_tabs.select())]
+        path = filedialog.asksaveasfilename(
+            title="Export Report",
+            defaultextension=".csv",
+            initialfile=f"attendance_{table}.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+        
+        try:
+            self.report.export(path, table)
+            messagebox.showinfo("Export Successful", f"Report exported to:\n{path}")
+        except OSError as e:
+            messagebox.showerror("Export Error", f"An error occurred while exporting:\n{str(e)}")
+    
+    def open_export(self):
+        """Open a window to export a range of days, filtered, in the background"""
+        if self.server:
+            self.toast.show("Exporting records reads the local data folder, which the server owns.", "warning")
+            return
+        
+        export_window = tk.Toplevel(self.root)
+        export_window.title("Export Records")
+        export_window.geometry("420x380")
+        self.center_window(export_window)
+        
+        form = ttk.Frame(export_window, padding="15")
+        form.pack(fill=tk.BOTH, expand=True)
+        form.grid_columnconfigure(1, weight=1)
+        
+        # Range, filters, format and incremental target
+        fields = {}
+        for row, (key, label) in enumerate((
+            ("start", "From (YYYY-MM-DD):"),
+            ("end", "To (YYYY-MM-DD):"),
+            ("department", "Department:"),
+            ("student_id", "Student ID:"),
+            ("target", "Incremental target:"),
+        )):
+            ttk.Label(form, text=label).grid(row=row, column=0, sticky=tk.W, pady=4)
+            fields[key] = ttk.Entry(form)
+            fields[key].grid(row=row, column=1, sticky=tk.EW, pady=4)
+        
+        ttk.Label(form, text="Status:").grid(row=5, column=0, sticky=tk.W, pady=4)
+        fields["status"] = ttk.Combobox(form, values=["All", *STATUSES], state="readonly")
+        fields["status"].set("All")
+        fields["status"].grid(row=5, column=1, sticky=tk.EW, pady=4)
+        
+        ttk.Label(form, text="Format:").grid(row=6, column=0, sticky=tk.W, pady=4)
+        fields["format"] = ttk.Combobox(form, values=list(EXPORT_FORMATS), state="readonly")
+        fields["format"].set("CSV (gzip)")
+        fields["format"].grid(row=6, column=1, sticky=tk.EW, pady=4)
+        
+        # Progress
+        progress = ttk.Progressbar(form, mode="determinate", maximum=1)
+        progress.grid(row=7, column=0, columnspan=2, sticky=tk.EW, pady=(15, 5))
+        progress_label = ttk.Label(form, text="Leave a field empty to export everything")
+        progress_label.grid(row=8, column=0, columnspan=2, sticky=tk.W)
+        
+        export_button = ttk.Button(
+            form, 
+            text="Export...", 
+            command=lambda: self.start_export(export_window, fields, progress, progress_label, export_button)
+        )
+        export_button.grid(row=9, column=0, columnspan=2, pady=10)
+    
+    def start_export(self, export_window, fields, progress, progress_label, export_button):
+        """Ask where to export and stream the records there on a background thread"""
+        from attendance_export import Exporter
+        
+        values = {key: widget.get().strip() or None for key, widget in fields.items()}
+        try:
+            for date in (values["start"], values["end"]):
+                if date is not None:
+                    datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showwarning("Input Error", "Dates must be YYYY-MM-DD", parent=export_window)
+            return
+        
+        extension = EXPORT_FORMATS[values["format"]]
+        path = filedialog.asksaveasfilename(
+            parent=export_window,
+            title="Export Records",
+            initialfile=f"attendance_export{extension}",
+            filetypes=[(values["format"], f"*{extension}"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        if not path.endswith(extension):
+            path += extension
+        
+        # Everything accepted so far must be on disk before it is read back
+        self.writer.flush()
+        
+        exporter = Exporter(
+            DATA_DIR, 
+            self.backend_kind, 
+            values["start"], 
+            values["end"], 
+            values["department"], 
+            values["student_id"], 
+            None if values["status"] == "All" else values["status"]
+        )
+        results = queue.Queue()
+        
+        def work():
+            try:
+                results.put(("done", exporter.run(
+                    path,
+                    values["target"],
+                    progress=lambda done, total, rows: results.put(("progress", (done, total, rows)))
+                )))
+            except Exception as e:
+                results.put(("failed", e))
+        
+        export_button.config(state=tk.DISABLED)
+        progress_label.config(text="Exporting...")
+        threading.Thread(target=work, name="attendance-export", daemon=True).start()
+        self.root.after(
+            REPORT_POLL_MS, 
+            lambda: self.poll_export(export_window, results, progress, progress_label, export_button)
+        )
+    
+    def poll_export(self, export_window, results, progress, progress_label, export_button):
+        """Move the progress bar and report the export once it is done"""
+        if not export_window.winfo_exists():
+            return
+        
+        while True:
+            try:
+                kind, payload = results.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == "progress":
+                done, total, rows = payload
+                progress.config(maximum=max(total, 1), value=done)
+                progress_label.config(text=f"{done}/{total} day(s), {rows} record(s)")
+                continue
             
-            if (search_term in str(values[0]).lower() or  
-                search_term in str(values[1]).lower() or  
-                search_term in str(values[2]).lower() or  
-                search_term in str(values[3]).lower()):   
-                
-                self.view_tree.insert("", tk.END, values=values)
+            export_button.config(state=tk.NORMAL)
+            if kind == "failed":
+                progress_label.config(text="")
+                messagebox.showerror(
+                    "Export Error", 
+                    f"An error occurred while exporting:\n{str(payload)}", 
+                    parent=export_window
+                )
+            else:
+                progress_label.config(text=f"{payload.rows} record(s) exported")
+                messagebox.showinfo("Export Successful", str(payload), parent=export_window)
+            return
         
-        if not self.view_tree.get_children():
-            messagebox.showinfo("Search Results", "No matches found.")
+        self.root.after(
+            REPORT_POLL_MS, 
+            lambda: self.poll_export(export_window, results, progress, progress_label, export_button)
+        )
     
     def export_to_csv(self):
         """Export records to CSV file"""
-        if not self.records_tree.get_children():
-            messagebox.showwarning(
-                "Export Error", 
-                "No attendance records to export!"
-            )
+        if self.still_loading():
+            return
+        if not self.store:
+            self.toast.show("No attendance records to export!", "warning")
             return
             
         try:
-            with open(self.csv_file, "w", newline="") as f:
-                writer = csv.writer(f)
-                
-                # Write header
-                writer.writerow(["Student ID", "Name", "Department", "Status", "Time"])
-                
-                # Write records
-                for child in self.records_tree.get_children():
-                    writer.writerow(self.records_tree.item(child)["values"])
+            # Fold all pending changes into the CSV file
+            with metrics.timer("ui.export"):
+                self.compact_journal(force=True)
+                if not self.server and self.backend_kind == "sqlite":
+                    self.store.write_csv(self.csv_file)
+            error = self.writer.error or self.backend.compaction_error
+            if error is not None:
+                self.writer.error = self.backend.compaction_error = None
+                raise error
             
-            messagebox.showinfo(
-                "Export Successful", 
-                f"Attendance records successfully exported to:\n{self.csv_file}"
-            )
+            # A server reports where its own CSV file is
+            csv_file = getattr(self.backend, "csv_file", None) or self.csv_file
+            self.toast.show(f"Attendance records successfully exported to:\n{csv_file}")
         except Exception as e:
-            messagebox.showerror(
-                "Export Error", 
-                f"An error occurred while exporting:\n{str(e)}"
-            )
+            self.toast.show(f"An error occurred while exporting:\n{str(e)}", "error")
+    
+    def toggle_profile(self):
+        """Start or stop a cProfile capture of the UI thread"""
+        path = metrics.toggle_profile(
+            os.path.join(DATA_DIR, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+        )
+        if path is None:
+            self.tools_menu.entryconfig(0, label="Stop Profiling")
+            return
+        
+        self.tools_menu.entryconfig(0, label="Start Profiling")
+        self.toast.show(f"Profile saved to:\n{path}\nOpen it with: python -m pstats {path}")
+    
+    def probe_ui(self, expected):
+        """Record how late the event loop runs a timer, i.e. how long it was blocked"""
+        now = time.perf_counter()
+        metrics.observe("ui.block", max(0.0, now - expected))
+        metrics.gauge("writer.pending", self.writer.pending())
+        self.root.after(UI_PROBE_MS, self.probe_ui, now + UI_PROBE_MS / 1000)
     
     def clear_fields(self):
         """Clear all input fields"""
@@ -584,8 +1525,21 @@ class AttendanceSystem:
         self.name_entry.delete(0, tk.END)
         self.dept_entry.delete(0, tk.END)
         self.status_var.set("Present")
+        self.autofilled = None
+        self.id_suggestions.hide()
+        self.name_suggestions.hide()
         self.id_entry.focus_set()
     
+    def on_close(self):
+        """Write out queued changes, close storage and the application"""
+        if self.loader is not None:
+            self.loader.join()  # Storage is not closed under a running load
+        self.writer.close()
+        self.backend.close()
+        self.roster.flush()
+        metrics.stop_dump()
+        self.root.destroy()
+    
     def center_window(self, window):
         """Center a window on the screen"""
         window.update_idletasks()
@@ -597,6 +1551,16 @@ class AttendanceSystem:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smart Attendance System")
+    parser.add_argument("--backend", choices=BACKENDS, default="csv",
+                        help="storage for attendance records (default: csv)")
+    parser.add_argument("--server", metavar="URL",
+                        help="run as a thin client of an attendance server, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record timings and dump them to FILE every few seconds "
+                             "(Prometheus text if FILE ends in .prom, JSON otherwise)")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = AttendanceSystem(root)
+    app = AttendanceSystem(root, backend=args.backend, server=args.server, metrics_file=args.metrics)
     root.mainloop()
\ No newline at end of file
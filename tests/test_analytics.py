@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from attendance_analytics import AttendanceColumns, Report, absence_streaks, load_attendance  # noqa: E402
+from attendance_backend import open_backend  # noqa: E402
+from attendance_store import AttendanceStore  # noqa: E402
+
+DAYS = [
+    ("2026-01-05", [("S1", "Ann", "CS", "Present", "09:00:00"), ("S2", "Bob", "EE", "Absent", "09:01:00")]),
+    ("2026-01-06", [("S1", "Ann", "CS", "Absent", "09:00:00"), ("S2", "Bob", "EE", "Absent", "09:01:00")]),
+    ("2026-01-07", [("S1", "Ann", "CS", "Late", "09:20:00"), ("S3", "Cy", "CS", "Present", "9:5")]),
+    ("2026-01-08", [("S2", "Bob", "ME", "Present", "09:01:00"), ("S3", "Cy", "CS", "Excused", "09:00:00")]),
+]
+
+
+def test_absence_streaks():
+    missed = np.array([
+        [True, True, False, True],
+        [False, False, False, False],
+        [False, True, True, True],
+    ])
+    longest, current = absence_streaks(missed)
+    assert longest.tolist() == [2, 0, 3]
+    assert current.tolist() == [1, 0, 3]
+
+
+def test_columns_code_records_by_day():
+    columns = AttendanceColumns(DAYS)
+    assert columns.dates == [date for date, _ in DAYS]
+    assert len(columns) == 8
+    assert columns.day.tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert columns.first_day.tolist() == [0, 0, 2]
+    assert columns.time.tolist()[5] == -1
+    # The latest department is kept per student
+    assert columns.departments.values[columns.student_departments[1]] == "ME"
+
+
+def test_report_tables():
+    report = Report(AttendanceColumns(DAYS), threshold=60)
+    assert report.students == [
+        ("S1", "Ann", "CS", 1, 1, 1, 66.7, 50.0, 1, 1),
+        ("S2", "Bob", "ME", 1, 2, 0, 33.3, 0.0, 3, 0),
+        ("S3", "Cy", "CS", 1, 0, 0, 100.0, 0.0, 1, 1),  # Excused is not attending
+    ]
+    assert [row[0] for row in report.below] == ["S2"]
+    assert ("CS", "2026-01-07", 2, 100.0, 50.0) in report.trends
+    assert ("EE", "2026-01-06", 1, 0.0, 0.0) in report.trends
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_load_attendance_reads_the_backend(tmp_path, kind):
+    for date, records in DAYS:
+        store = AttendanceStore()
+        backend = open_backend(kind, str(tmp_path), date)
+        backend.load(store)
+        for record in records:
+            backend.upsert(store.add(record), record)
+        backend.close()
+
+    columns = load_attendance(str(tmp_path), start="2026-01-06", backend=kind)
+    assert columns.dates == ["2026-01-06", "2026-01-07", "2026-01-08"]
+    assert len(columns) == 6
@@ -0,0 +1,105 @@
+import pytest
+
+from attendance_batch import BatchEditor, BatchError
+from attendance_journal import DELETE, UPSERT
+from attendance_roster import Roster, write_roster
+from attendance_store import AttendanceStore
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.transactions = []
+
+    def transaction(self, changes):
+        self.transactions.append(list(changes))
+
+
+def record(n, status="Present", department="CS", time="09:00:00"):
+    return (f"S{n:06d}", f"Student {n}", department, status, time)
+
+
+@pytest.fixture
+def editor():
+    store = AttendanceStore()
+    for n in range(3):
+        store.add(record(n))
+    return BatchEditor(store, RecordingWriter())
+
+
+def test_batch_is_written_as_one_transaction(editor):
+    assert editor.set_status([0, 2], "Late") == 2
+    assert editor.store.get(0) == record(0, "Late")
+    assert editor.store.get(1) == record(1)
+    assert editor.writer.transactions == [
+        [(UPSERT, 0, record(0, "Late")), (UPSERT, 2, record(2, "Late"))],
+    ]
+
+
+def test_invalid_batch_changes_nothing(editor):
+    with pytest.raises(BatchError):
+        editor.apply("Bad", [(0, record(0, "Late")), (1, record(1, "Unknown"))])
+    with pytest.raises(BatchError):
+        editor.delete([0, 99])
+    assert list(editor.store.records()) == [record(n) for n in range(3)]
+    assert editor.writer.transactions == []
+    assert editor.undo_log == []
+
+
+def test_undo_reverts_edits_deletes_and_additions(editor):
+    editor.set_department([0, 1], "EE")
+    editor.delete([2])
+    editor.mark_unmarked([("S000009", "Student 9", "CS")], time="10:00:00")
+
+    assert editor.undo() == "Mark 1 unmarked student(s) Absent"
+    assert editor.store.find_student("S000009") == []
+    assert editor.undo() == "Delete 1 record(s)"
+    assert editor.undo() == "Move 2 record(s) to EE"
+    assert sorted(editor.store.records()) == [record(n) for n in range(3)]
+    assert editor.writer.transactions[-1] == [(UPSERT, 0, record(0)), (UPSERT, 1, record(1))]
+
+    with pytest.raises(BatchError):
+        editor.undo()
+
+
+def test_undo_refuses_after_a_later_change(editor):
+    editor.set_status([0], "Absent")
+    editor.store.update(0, record(0, "Late"))
+    with pytest.raises(BatchError):
+        editor.undo()
+    assert editor.store.get(0) == record(0, "Late")
+
+
+def test_legacy_rows_can_be_changed_and_restored(editor):
+    row_id = editor.store.add(record(7, status="Excused", time="9:5"))
+    editor.set_department([row_id], "EE")
+    editor.delete([row_id])
+    assert editor.writer.transactions[-1] == [(DELETE, row_id, None)]
+
+    editor.undo()
+    assert editor.store.find_student("S000007")
+    restored = editor.store.get(editor.store.find_student("S000007")[0])
+    assert restored == record(7, status="Excused", department="EE", time="9:5")
+
+    # Only the fields a batch changes are checked
+    with pytest.raises(BatchError):
+        editor.apply("Bad time", [(0, record(0, time="9:5"))])
+
+
+def test_mark_unmarked_roster_students_absent_and_undo(editor, tmp_path):
+    path = str(tmp_path / "roster.csv")
+    students = [(f"S{n:06d}", f"Student {n}", "CS") for n in range(5)]
+    write_roster(path, {student[0]: student for student in students})
+    roster = Roster(path)
+    roster.load()
+    assert roster.students() == students
+
+    # Students 0-2 already checked in, so only 3 and 4 are marked
+    assert editor.mark_unmarked(roster.students(), time="10:00:00") == 2
+    assert [editor.store.get(row_id) for row_id in editor.store.find_student("S000004")] == [
+        ("S000004", "Student 4", "CS", "Absent", "10:00:00"),
+    ]
+    assert len(editor.store) == 5
+    assert editor.mark_unmarked(roster.students()) == 0
+
+    assert editor.undo() == "Mark 2 unmarked student(s) Absent"
+    assert sorted(editor.store.records()) == [record(n) for n in range(3)]
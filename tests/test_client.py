@@ -0,0 +1,84 @@
+import socket
+import threading
+
+import pytest
+
+from attendance_client import AttendanceClient, ClientError
+
+
+class RawServer:
+    """Serves canned responses, one connection at a time, counting requests"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn, conn.makefile("rb") as f:
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    length = 0
+                    while True:
+                        header = f.readline()
+                        if header in (b"\r\n", b""):
+                            break
+                        name, _, value = header.decode("latin-1").partition(":")
+                        if name.lower() == "content-length":
+                            length = int(value)
+                    f.read(length)
+                    self.requests.append(line.split()[0].decode())
+                    reply = self.respond(len(self.requests))
+                    if reply is None:
+                        break
+                    conn.sendall(reply)
+
+    def close(self):
+        self.sock.close()
+
+
+def reply(body, close=False):
+    return (f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n{body}").encode()
+
+
+@pytest.fixture
+def server(request):
+    server = RawServer(request.param)
+    yield server
+    server.close()
+
+
+@pytest.mark.parametrize("server", [lambda n: reply("{not json")], indirect=True)
+def test_change_is_not_resent_after_a_bad_response(server):
+    client = AttendanceClient(f"http://127.0.0.1:{server.port}")
+    with pytest.raises(ClientError):
+        client.submit("S000001", "Ann")
+    assert server.requests == ["POST"]
+
+
+@pytest.mark.parametrize("server", [lambda n: reply("{not json") if n == 1 else reply("{}")],
+                         indirect=True)
+def test_get_is_resent(server):
+    client = AttendanceClient(f"http://127.0.0.1:{server.port}")
+    assert client.status() == {}
+    assert server.requests == ["GET", "GET"]
+
+
+@pytest.mark.parametrize("server", [lambda n: reply('{"n": %d}' % n) if n != 2 else None],
+                         indirect=True)
+def test_change_is_resent_when_a_kept_alive_connection_was_closed(server):
+    client = AttendanceClient(f"http://127.0.0.1:{server.port}")
+    assert client.status() == {"n": 1}
+    # The server drops the connection without answering the next request
+    assert client.submit("S000001", "Ann") == {"n": 3}
+    assert server.requests == ["GET", "POST", "POST"]
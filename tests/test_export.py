@@ -0,0 +1,81 @@
+import csv
+
+from attendance_export import Exporter
+from attendance_journal import AttendanceJournal
+from attendance_store import AttendanceStore
+
+
+def record(n, status="Present"):
+    return (f"S{n:06d}", f"Student {n}", "CS", status, "09:00:00")
+
+
+def write_day(data_dir, date, *records):
+    """Append records to a day through its journal and return the store"""
+    store = AttendanceStore()
+    journal = AttendanceJournal(str(data_dir / f"attendance_{date}.csv"))
+    journal.load(store)
+    for rec in records:
+        journal.upsert(store.add(rec), rec)
+    journal.close()
+    return store, journal
+
+
+def exported(path):
+    with open(path, newline="") as f:
+        return [tuple(row) for row in csv.reader(f)][1:]
+
+
+def test_first_export_writes_every_day(tmp_path):
+    write_day(tmp_path, "2026-01-05", record(0), record(1))
+    write_day(tmp_path, "2026-01-06", record(2))
+    out = str(tmp_path / "out.csv")
+
+    summary = Exporter(str(tmp_path)).run(out, target="sis")
+    assert (summary.days, summary.rows) == (2, 3)
+    assert exported(out) == [
+        ("2026-01-05", *record(0)), ("2026-01-05", *record(1)), ("2026-01-06", *record(2)),
+    ]
+
+
+def test_unchanged_days_are_skipped(tmp_path):
+    write_day(tmp_path, "2026-01-05", record(0))
+    out = str(tmp_path / "out.csv")
+    Exporter(str(tmp_path)).run(out, target="sis")
+
+    summary = Exporter(str(tmp_path)).run(out, target="sis")
+    assert (summary.unchanged, summary.days, summary.rows) == (1, 0, 0)
+    assert exported(out) == []
+
+
+def test_only_records_after_the_watermark_are_written(tmp_path):
+    write_day(tmp_path, "2026-01-05", record(0), record(1))
+    out = str(tmp_path / "out.csv")
+    Exporter(str(tmp_path)).run(out, target="sis")
+
+    write_day(tmp_path, "2026-01-05", record(2))
+    summary = Exporter(str(tmp_path)).run(out, target="sis")
+    assert (summary.rewritten, summary.rows) == (0, 1)
+    assert exported(out) == [("2026-01-05", *record(2))]
+
+
+def test_day_with_edited_records_is_written_again(tmp_path):
+    store, journal = write_day(tmp_path, "2026-01-05", record(0), record(1))
+    out = str(tmp_path / "out.csv")
+    Exporter(str(tmp_path)).run(out, target="sis")
+
+    journal.load(store)
+    store.update(0, record(0, "Late"))
+    journal.upsert(0, record(0, "Late"))
+    journal.close()
+    summary = Exporter(str(tmp_path)).run(out, target="sis")
+    assert (summary.rewritten, summary.rows) == (1, 2)
+    assert exported(out) == [("2026-01-05", *record(0, "Late")), ("2026-01-05", *record(1))]
+
+
+def test_targets_and_filters_keep_their_own_watermarks(tmp_path):
+    write_day(tmp_path, "2026-01-05", record(0), record(1, "Late"))
+    out = str(tmp_path / "out.csv")
+    Exporter(str(tmp_path)).run(out, target="sis")
+
+    assert Exporter(str(tmp_path)).run(out, target="other").rows == 2
+    assert Exporter(str(tmp_path), status="Late").run(out, target="sis").rows == 1
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from attendance_facets import RecordIndex, bitmap_filter, bitmap_of, bitmap_rows
+from attendance_store import STATUSES, AttendanceStore, RecordColumns
+
+
+def make_record(rng, n, departments):
+    return (f"S{rng.randrange(10 ** 6):06d}", rng.choice(("ann", "Bob", "cy", "Émile")),
+            rng.choice(departments), rng.choice(STATUSES + ("Excused",)), f"09:{n % 60:02d}:00")
+
+
+def expected_key(column, value):
+    if column == 3 and value in STATUSES:
+        return (0, STATUSES.index(value))
+    return (1, value.casefold(), value)
+
+
+def check(index, store):
+    items = list(store.items())
+    for column in (2, 3):
+        counts = {}
+        for _, record in items:
+            counts[record[column]] = counts.get(record[column], 0) + 1
+        assert index.values(column) == sorted(counts.items(),
+                                              key=lambda item: expected_key(column, item[0]))
+
+    departments = sorted({record[2] for _, record in items})[:2]
+    selection = {2: departments, 3: ["Late", "Excused"]}
+    expected = [row_id for row_id, record in items
+                if record[2] in departments and record[3] in ("Late", "Excused")]
+    assert bitmap_rows(index.select(selection)) == expected
+    assert index.select({2: [], 3: []}) is None
+
+    row_ids = store.row_ids()
+    for column in range(5):
+        for reverse in (False, True):
+            ordered = sorted(items, key=lambda item: expected_key(column, item[1][column]),
+                             reverse=reverse)
+            assert index.sort(row_ids, column, reverse) == [row_id for row_id, _ in ordered]
+
+
+def test_bitmap_helpers():
+    rows = [0, 7, 8, 9, 63, 64, 200]
+    assert bitmap_rows(bitmap_of(rows)) == rows
+    assert bitmap_rows(bitmap_of(range(16))) == list(range(16))
+    assert bitmap_filter([200, 5, 0, 1000, 8], bitmap_of(rows)) == [200, 0, 8]
+    assert bitmap_rows(0) == []
+
+
+@pytest.mark.parametrize("distinct", [4, 300])
+def test_matches_a_plain_scan_through_changes(distinct):
+    rng = random.Random(distinct)
+    departments = [f"Dept {n}" for n in range(distinct)] + ["dept 0", "CS"]
+    store = AttendanceStore()
+    index = RecordIndex(store)
+    store.set_base(RecordColumns(make_record(rng, n, departments) for n in range(500)))
+    store.delete(3)  # Before the lazy rebuild, so it leaves a gap
+    check(index, store)
+
+    for _ in range(3):
+        for n in range(30):
+            store.add(make_record(rng, n, departments + ["New"]))
+        for row_id in rng.sample(store.row_ids(), 30):
+            store.update(row_id, make_record(rng, row_id, departments))
+        for row_id in rng.sample(store.row_ids(), 30):
+            store.delete(row_id)
+        check(index, store)
+
+    store.clear()
+    assert index.values(2) == []
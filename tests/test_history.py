@@ -0,0 +1,64 @@
+import pytest
+
+from attendance_backend import open_backend
+from attendance_history import main, query_history, summarize
+from attendance_partitions import seal_day
+from attendance_store import AttendanceStore
+
+DAYS = {
+    "2026-01-05": [("S1", "Ann", "CS", "Present"), ("S2", "Bob", "EE", "Absent")],
+    "2026-01-06": [("S1", "Ann", "CS", "Late"), ("S2", "Bob", "EE", "Present")],
+    "2026-01-07": [("S1", "Ann", "ME", "Absent"), ("S2", "Bob", "EE", "Present")],
+    "2026-01-08": [("S1", "Ann", "ME", "Present"), ("S3", "Cy", "CS", "Excused")],
+}
+
+
+def write_days(data_dir, kind):
+    for date, rows in DAYS.items():
+        store = AttendanceStore()
+        backend = open_backend(kind, str(data_dir), date)
+        backend.load(store)
+        for row in rows:
+            record = (*row, "09:00:00")
+            backend.upsert(store.add(record), record)
+        backend.close()
+
+
+def test_summarize():
+    assert summarize([3, 1, 1]) == (3, 1, 1, 80.0, 25.0)
+    assert summarize([0, 0, 0]) == (0, 0, 0, 0.0, 0.0)
+
+
+@pytest.mark.parametrize("kind, workers", [("csv", 1), ("csv", 2), ("sqlite", 2)])
+def test_counts_every_day_of_the_backend(tmp_path, kind, workers):
+    write_days(tmp_path, kind)
+    history = query_history(str(tmp_path), workers=workers, backend=kind)
+
+    assert history.days == list(DAYS)
+    assert history.students == {"S1": [2, 1, 1], "S2": [2, 1, 0]}
+    assert history.departments == {"CS": [1, 0, 1], "EE": [2, 1, 0], "ME": [1, 1, 0]}
+    # The latest day's department wins; unknown statuses are not counted
+    assert list(history.student_rows()) == [
+        ("S1", "Ann", "ME", 2, 1, 1, 75.0, 33.3),
+        ("S2", "Bob", "EE", 2, 1, 0, 66.7, 0.0),
+    ]
+
+
+def test_filters_and_date_range(tmp_path):
+    write_days(tmp_path, "csv")
+    seal_day(str(tmp_path / "attendance_2026-01-05.csv"), "2026-01-05")
+
+    history = query_history(str(tmp_path), start="2026-01-05", end="2026-01-06",
+                            department="EE", workers=1)
+    assert history.days == ["2026-01-05", "2026-01-06"]
+    assert history.students == {"S2": [1, 1, 0]}
+    assert list(history.department_rows()) == [("EE", 1, 1, 0, 50.0, 0.0)]
+
+
+def test_cli_reads_sqlite(tmp_path, capsys):
+    write_days(tmp_path, "sqlite")
+    main(["--data-dir", str(tmp_path), "--backend", "sqlite", "--by", "department",
+          "--format", "json", "--workers", "1"])
+    captured = capsys.readouterr()
+    assert '"Department": "ME"' in captured.out
+    assert "4 day(s) scanned" in captured.err
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from attendance_backend import open_backend
+from attendance_import import CheckinImporter, HeaderError, import_roster, main, read_rows
+from attendance_roster import read_roster, roster_path
+from attendance_store import AttendanceStore
+
+DATE = "2026-01-05"
+
+
+def load_day(data_dir, date=DATE):
+    store = AttendanceStore()
+    backend = open_backend("csv", str(data_dir), date)
+    backend.load(store)
+    backend.close()
+    return list(store.records())
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_header_columns_in_any_order_with_defaults(tmp_path):
+    path = write(tmp_path / "in.csv",
+                 "Dept,ID,Student Name,Status\n"
+                 "CS,S1,Ann,late\n"
+                 "EE,S2,Bob,\n")
+    assert list(read_rows(path, ("student_id", "name", "department", "status", "time"))) == [
+        (2, ["S1", "Ann", "CS", "late", ""]),
+        (3, ["S2", "Bob", "EE", "", ""]),
+    ]
+
+    summary = CheckinImporter(str(tmp_path)).run(path, default_date=DATE)
+    assert (summary.read, summary.imported, summary.invalid) == (2, 2, 0)
+    assert [record[:4] for record in load_day(tmp_path)] == [
+        ("S1", "Ann", "CS", "Late"), ("S2", "Bob", "EE", "Present"),
+    ]
+
+
+def test_csv_without_header_is_read_as_data(tmp_path):
+    path = write(tmp_path / "in.csv", f"S1,Ann,CS,Present,09:00:00,{DATE}\n")
+    summary = CheckinImporter(str(tmp_path)).run(path)
+    assert summary.imported == 1
+    assert load_day(tmp_path) == [("S1", "Ann", "CS", "Present", "09:00:00")]
+
+
+def test_header_without_student_id_is_refused(tmp_path, capsys):
+    path = write(tmp_path / "in.csv", "Roll No,Name,Department\nS1,Ann,CS\n")
+    with pytest.raises(HeaderError):
+        CheckinImporter(str(tmp_path)).run(path, default_date=DATE)
+    assert load_day(tmp_path) == []
+    assert not (tmp_path / "in.errors.csv").exists()
+
+    with pytest.raises(SystemExit):
+        main(["roster", path, "--data-dir", str(tmp_path)])
+    assert "no student ID column" in capsys.readouterr().err
+
+
+def test_rejects_and_duplicates_go_to_the_error_file(tmp_path):
+    before = ("S1", "Ann", "CS", "Present", "08:00:00")
+    backend = open_backend("csv", str(tmp_path), DATE)
+    store = AttendanceStore()
+    backend.load(store)
+    backend.upsert(store.add(before), before)
+    backend.close()
+
+    path = write(tmp_path / "in.csv",
+                 "student_id,name,department,status,time,date\n"
+                 f"S1,Ann,CS,Present,09:00:00,{DATE}\n"  # Already on disk
+                 f"S2,Bob,EE,Present,09:00:00,{DATE}\n"
+                 f"S2,Bob,EE,Late,09:05:00,{DATE}\n"  # Earlier in the file
+                 f",Nobody,EE,Present,09:00:00,{DATE}\n"
+                 "S3,Cy,CS,Present,09:00:00,2026-13-01\n"
+                 "S4,Di,CS,Present,09:00:00,2026-01-06\n")
+    summary = CheckinImporter(str(tmp_path), batch_size=1).run(path)
+
+    assert (summary.read, summary.imported, summary.duplicates, summary.invalid) == (6, 2, 2, 2)
+    assert summary.days == {DATE, "2026-01-06"}
+    assert load_day(tmp_path) == [before, ("S2", "Bob", "EE", "Present", "09:00:00")]
+    assert load_day(tmp_path, "2026-01-06") == [("S4", "Di", "CS", "Present", "09:00:00")]
+
+    lines = (tmp_path / "in.errors.csv").read_text(encoding="utf-8").splitlines()
+    assert [line.split(",")[0] for line in lines] == ["Line", "2", "4", "5", "6"]
+
+
+def test_attached_day_and_other_days(tmp_path):
+    path = write(tmp_path / "in.jsonl",
+                 json.dumps({"Student ID": "S1", "name": "Ann", "date": DATE}) + "\n"
+                 + "not json\n"
+                 + json.dumps({"id": "S2", "name": "Bob", "date": "2026-01-06"}) + "\n"
+                 + json.dumps({"id": "S9", "name": "Known", "date": DATE}) + "\n")
+    received = []
+    importer = CheckinImporter(str(tmp_path), other_days=False)
+    importer.attach(DATE, ["S9"], received.extend)
+    summary = importer.run(path)
+
+    assert [record[:2] for record in received] == [("S1", "Ann")]
+    assert (summary.imported, summary.duplicates, summary.invalid) == (1, 1, 2)
+    assert load_day(tmp_path) == []
+
+
+def test_import_roster_adds_updates_and_skips(tmp_path):
+    data_dir = str(tmp_path)
+    first = write(tmp_path / "first.csv", "ID,Name,Dept\nS1,Ann,CS\nS2,Bob,EE\n")
+    assert import_roster(first, data_dir).imported == 2
+
+    second = write(tmp_path / "second.csv", "ID,Name,Dept\nS1,Ann,CS\nS2,Bob,ME\nS3,,CS\n")
+    summary = import_roster(second, data_dir)
+    assert (summary.imported, summary.updated, summary.duplicates, summary.invalid) == (0, 1, 1, 1)
+    assert read_roster(roster_path(data_dir)) == {
+        "S1": ("S1", "Ann", "CS"), "S2": ("S2", "Bob", "ME"),
+    }
@@ -0,0 +1,133 @@
+import os
+
+import attendance_journal
+from attendance_journal import AttendanceJournal, read_day
+from attendance_store import AttendanceStore, read_csv
+
+
+def record(n, status="Present"):
+    return (f"S{n:06d}", f"Student {n}", "CS", status, "09:00:00")
+
+
+def open_day(csv_file):
+    store = AttendanceStore()
+    journal = AttendanceJournal(csv_file)
+    journal.load(store)
+    return store, journal
+
+
+def add(store, journal, *records):
+    for rec in records:
+        journal.upsert(store.add(rec), rec)
+
+
+def test_replay_restores_adds_edits_and_deletes(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, *(record(n) for n in range(4)))
+    store.update(1, record(1, "Late"))
+    journal.upsert(1, record(1, "Late"))
+    store.delete(2)
+    journal.delete(2)
+    journal.close()
+
+    reopened, _ = open_day(csv_file)
+    assert list(reopened.records()) == [record(0), record(1, "Late"), record(3)]
+
+
+def test_torn_entry_and_unfinished_transaction_are_cut_off(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, record(0))
+    journal.close()
+    with open(journal.journal_file, "a", newline="") as f:
+        f.write("B,2\r\nU,1,S000001,Student 1,CS,Present,09:00:00\r\nU,2,S0000")
+
+    reopened, journal = open_day(csv_file)
+    assert list(reopened.records()) == [record(0)]
+
+    # Appends after the repair are read back normally
+    add(reopened, journal, record(5))
+    journal.close()
+    assert read_day(csv_file) == [record(0), record(5)]
+
+
+def test_compaction_folds_journal_into_base(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, *(record(n) for n in range(5)))
+    store.delete(0)
+    journal.delete(0)
+    journal.compact(list(store.items()), wait=True)
+
+    assert list(read_csv(csv_file)) == [record(n) for n in range(1, 5)]
+    assert not os.path.exists(journal.pending_file)
+
+    # Row IDs stay valid for changes after the compaction
+    store.update(3, record(3, "Absent"))
+    journal.upsert(3, record(3, "Absent"))
+    journal.close()
+    reopened, _ = open_day(csv_file)
+    assert list(reopened.records()) == [record(1), record(2), record(3, "Absent"), record(4)]
+
+
+def test_load_finishes_interrupted_compaction(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, record(0), record(1))
+    journal.close()
+
+    # A crash right after the rotation leaves the old base and .journal.1
+    os.replace(journal.journal_file, journal.pending_file)
+    with open(journal.tmp_file, "w") as f:
+        f.write("half written")
+    with open(journal.journal_file, "w", newline="") as f:
+        f.write("U,2,S000002,Student 2,CS,Present,09:00:00\r\n")
+
+    reopened, journal = open_day(csv_file)
+    assert list(reopened.records()) == [record(0), record(1), record(2)]
+    assert not os.path.exists(journal.pending_file)
+    assert not os.path.exists(journal.tmp_file)
+    assert list(read_csv(csv_file)) == [record(0), record(1)]
+
+
+def test_load_promotes_finished_temporary_base(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, record(0))
+    journal.compact(list(store.items()), wait=True)
+    journal.close()
+
+    # A crash between removing .journal.1 and renaming the new base
+    os.replace(csv_file, journal.tmp_file)
+
+    reopened, _ = open_day(csv_file)
+    assert list(reopened.records()) == [record(0)]
+    assert not os.path.exists(journal.tmp_file)
+
+
+def test_failed_install_is_retried_before_rotating_again(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store, journal = open_day(csv_file)
+    add(store, journal, record(0), record(1))
+
+    def fail(path, records):
+        raise OSError("disk full")
+
+    write_csv = attendance_journal.write_csv
+    monkeypatch.setattr(attendance_journal, "write_csv", fail)
+    journal.compact(list(store.items()), wait=True)
+    assert journal.compaction_error is not None
+    assert os.path.exists(journal.pending_file)
+
+    # The rotated journal must not be overwritten while it is the only copy
+    add(store, journal, record(2))
+    journal.compact(list(store.items()), wait=True)
+    assert read_day(csv_file) == [record(0), record(1), record(2)]
+
+    monkeypatch.setattr(attendance_journal, "write_csv", write_csv)
+    add(store, journal, record(3))
+    journal.compact(list(store.items()), wait=True)
+    journal.close()
+    assert not os.path.exists(journal.pending_file)
+    assert list(read_csv(csv_file)) == [record(n) for n in range(4)]
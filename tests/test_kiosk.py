@@ -0,0 +1,91 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+import attendance_kiosk
+from attendance_backend import open_backend
+from attendance_kiosk import COOLDOWN, RECORDED, UNKNOWN, Kiosk, percentile
+from attendance_roster import roster_path, write_roster
+from attendance_store import AttendanceStore
+
+# Real dates, so the kiosk's background sealing leaves both days alone
+TODAY = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+TOMORROW = TODAY + timedelta(days=1)
+
+
+class Clock:
+    now = TODAY
+
+
+@pytest.fixture
+def kiosk(tmp_path, monkeypatch):
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return Clock.now
+
+    monkeypatch.setattr(attendance_kiosk, "datetime", FakeDatetime)
+    Clock.now = TODAY
+    write_roster(roster_path(str(tmp_path)), {
+        "S1": ("S1", "Ann", "CS"), "S2": ("S2", "Bob", "EE"),
+    })
+    kiosk = Kiosk(str(tmp_path), cooldown=60, late_after="08:30:00")
+    yield kiosk
+    kiosk.close_day()
+
+
+def read_day(data_dir, date):
+    store = AttendanceStore()
+    backend = open_backend("csv", str(data_dir), date.strftime("%Y-%m-%d"))
+    backend.load(store)
+    backend.close()
+    return list(store.records())
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1, 2, 3, 4], 0.5) == 3
+    assert percentile([1, 2, 3, 4], 1.0) == 4
+
+
+def test_scans_are_recorded_once_per_cooldown(kiosk, tmp_path):
+    assert kiosk.scan("S1") == (RECORDED, ("S1", "Ann", "CS", "Present", "08:00:00"))
+    assert kiosk.scan("S9") == (UNKNOWN, None)
+    Clock.now = TODAY + timedelta(seconds=59)
+    assert kiosk.scan("S1") == (COOLDOWN, None)
+
+    Clock.now = TODAY + timedelta(minutes=31)
+    assert kiosk.scan("S1") == (RECORDED, ("S1", "Ann", "CS", "Late", "08:31:00"))
+    assert kiosk.counts == {RECORDED: 2, COOLDOWN: 1, UNKNOWN: 1}
+
+    kiosk.close_day()
+    assert [record[3] for record in read_day(tmp_path, TODAY)] == ["Present", "Late"]
+    assert "2 change(s) written" in kiosk.report()
+
+
+def test_cooldown_carries_over_a_restart(kiosk, tmp_path):
+    kiosk.scan("S1")
+    kiosk.close_day()
+
+    again = Kiosk(str(tmp_path), cooldown=60)
+    Clock.now = TODAY + timedelta(seconds=30)
+    try:
+        assert again.scan("S1") == (COOLDOWN, None)
+        assert again.scan("S2")[0] == RECORDED
+    finally:
+        again.close_day()
+
+
+def test_run_moves_on_to_the_next_day(kiosk, tmp_path):
+    out = io.StringIO()
+    kiosk.run(io.StringIO("S1\n\nS9\n"), out)
+    Clock.now = TOMORROW
+    kiosk.run(io.StringIO("S1\n"), out)
+    kiosk.close_day()
+
+    assert out.getvalue().splitlines() == [
+        "OK S1 Ann Present 08:00:00", "UNKNOWN S9", "OK S1 Ann Present 08:00:00",
+    ]
+    assert len(read_day(tmp_path, TODAY)) == 1
+    assert len(read_day(tmp_path, TOMORROW)) == 1
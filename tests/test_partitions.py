@@ -0,0 +1,109 @@
+import os
+
+from attendance_backend import open_backend
+from attendance_partitions import (
+    PartitionIndex, index_path, iter_partition, list_partitions, may_match, seal_day,
+    sealed_path, unseal_day,
+)
+from attendance_segments import lock, unlock
+from attendance_store import AttendanceStore
+
+DATE = "2026-01-05"
+
+
+def record(n, status="Present", department="CS", time="09:00:00"):
+    return (f"S{n:06d}", f"Student {n}", department, status, time)
+
+
+def write_day(data_dir, kind, *records, deleted=()):
+    """Write records to a day through a backend and return its CSV path"""
+    store = AttendanceStore()
+    backend = open_backend(kind, str(data_dir), DATE)
+    backend.load(store)
+    for rec in records:
+        backend.upsert(store.add(rec), rec)
+    for row_id in deleted:
+        store.delete(row_id)
+        backend.delete(row_id)
+    backend.close()
+    return str(data_dir / f"attendance_{DATE}.csv")
+
+
+RECORDS = [
+    record(0),
+    record(1, "Late", "EE", "09:15:00"),
+    record(2, "Excused", time="9:5"),  # Kept exactly, though the form would refuse it
+    record(3, "Absent"),
+]
+
+
+def test_seal_and_unseal_round_trip(tmp_path):
+    csv_file = write_day(tmp_path, "csv", *RECORDS, deleted=[3])
+    expected = list(iter_partition(csv_file))
+    assert expected == RECORDS[:3]
+
+    index = seal_day(csv_file, DATE)
+    assert index.rows == 3
+    assert list_partitions(str(tmp_path)) == [(DATE, sealed_path(csv_file))]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(sealed_path(csv_file)),
+                                            os.path.basename(csv_file + ".lock"),
+                                            os.path.basename(index_path(csv_file))]
+    assert list(iter_partition(sealed_path(csv_file))) == expected
+
+    unseal_day(csv_file)
+    assert not os.path.exists(sealed_path(csv_file))
+    assert not os.path.exists(index_path(csv_file))
+    assert list(iter_partition(csv_file)) == expected
+
+    # The reopened day takes new changes, then seals again with all of them
+    store = AttendanceStore()
+    backend = open_backend("csv", str(tmp_path), DATE)
+    backend.load(store)
+    assert list(store.records()) == expected
+    backend.upsert(store.add(record(4)), record(4))
+    backend.close()
+    seal_day(csv_file, DATE)
+    assert list(iter_partition(sealed_path(csv_file))) == expected + [record(4)]
+
+
+def test_seal_skips_a_held_day_and_keeps_its_lock_file(tmp_path):
+    csv_file = write_day(tmp_path, "csv", *RECORDS)
+    with open(csv_file + ".lock", "a+b") as held:
+        assert lock(held, blocking=False)
+        assert seal_day(csv_file, DATE) is None
+        assert not os.path.exists(sealed_path(csv_file))
+
+        # Whoever waits on the lock file must still exclude a later sealer
+        inode = os.fstat(held.fileno()).st_ino
+        unlock(held)
+        assert seal_day(csv_file, DATE).rows == len(RECORDS)
+        assert os.stat(csv_file + ".lock").st_ino == inode
+        assert lock(held, blocking=False)
+        unlock(held)
+
+
+def test_shared_day_round_trip(tmp_path):
+    csv_file = write_day(tmp_path, "shared", *RECORDS)
+    seal_day(csv_file, DATE)
+    assert list(iter_partition(sealed_path(csv_file))) == RECORDS
+
+    # Opening a sealed day for writing unseals it first
+    store = AttendanceStore()
+    backend = open_backend("shared", str(tmp_path), DATE)
+    backend.load(store)
+    backend.close()
+    assert sorted(store.records()) == RECORDS
+    assert not os.path.exists(sealed_path(csv_file))
+
+
+def test_index_rules_out_days_without_matches(tmp_path):
+    csv_file = write_day(tmp_path, "csv", *RECORDS)
+    seal_day(csv_file, DATE)
+    path = sealed_path(csv_file)
+
+    index = PartitionIndex.load(index_path(csv_file))
+    assert (index.first_time, index.last_time) == ("09:00:00", "09:15:00")
+    assert may_match(path, department="EE", student_id="S000001")
+    assert not may_match(path, department="ME")
+    assert not may_match(path, status="Unknown")
+    assert not may_match(path, after="10:00:00")
@@ -0,0 +1,52 @@
+from attendance_roster import Roster, read_roster, write_roster
+
+STUDENTS = [
+    ("S000001", "Ann Lee", "CS"),
+    ("S000002", "anna Kim", "EE"),
+    ("S000010", "Bob Ray", "CS"),
+    ("T000001", "Cy Moe", "ME"),
+]
+
+
+def loaded_roster(tmp_path, students=STUDENTS):
+    path = str(tmp_path / "roster.csv")
+    write_roster(path, {student[0]: student for student in students})
+    roster = Roster(path)
+    roster.load()
+    return roster
+
+
+def test_prefix_lookups_ignore_case_and_respect_limit(tmp_path):
+    roster = loaded_roster(tmp_path)
+    assert roster.by_id("s0000") == STUDENTS[:3]
+    assert roster.by_id("S0000", limit=2) == STUDENTS[:2]
+    assert roster.by_name("ANN") == [STUDENTS[0], STUDENTS[1]]
+    assert roster.by_name("x") == []
+    assert roster.by_id("") == []
+    assert roster.get("T000001") == STUDENTS[3]
+    assert roster.students() == STUDENTS
+
+
+def test_remember_updates_indexes_and_appends_to_the_file(tmp_path):
+    roster = loaded_roster(tmp_path)
+    assert roster.remember(("S000010", "Bobby Ray", "EE"))
+    assert roster.remember(("S000099", "Dee Fox", "CS"))
+    assert not roster.remember(("S000099", "Dee Fox", "CS"))
+
+    assert roster.by_name("bob") == [("S000010", "Bobby Ray", "EE")]
+    assert roster.by_name("Dee") == [("S000099", "Dee Fox", "CS")]
+    roster.flush()
+    assert roster.error is None
+    assert read_roster(roster.path)["S000010"] == ("S000010", "Bobby Ray", "EE")
+    assert len(read_roster(roster.path)) == 5
+
+
+def test_students_remembered_while_loading_are_kept(tmp_path):
+    path = str(tmp_path / "roster.csv")
+    roster = Roster(path)
+    roster.remember(("S000001", "Ann Lee", "CS"))
+    roster.flush()
+    assert roster.by_id("S") == []  # Not loaded yet
+
+    roster.load()
+    assert roster.students() == [("S000001", "Ann Lee", "CS")]
@@ -0,0 +1,70 @@
+import random
+
+from attendance_search import SearchIndex, trigrams
+from attendance_store import STATUSES, AttendanceStore, RecordColumns
+
+NAMES = ("Ann Lee", "Bob Stone", "Cyrus Annan", "Dana Oak", "Émile Zola")
+DEPARTMENTS = ("Computer Science", "Electrical", "Mechanical")
+
+
+def make_record(rng, n):
+    return (f"S{n:05d}", rng.choice(NAMES), rng.choice(DEPARTMENTS), rng.choice(STATUSES),
+            "09:00:00")
+
+
+def brute_force(store, term):
+    term = term.lower()
+    return [row_id for row_id, record in store.items()
+            if any(term in field.lower() for field in record[:4])]
+
+
+TERMS = ["", "a", "an", "ann", "annan", "S0001", "s00012", "LATE", "science", "é", "mile",
+         "zz", "ee", "e\0s"]
+
+
+def test_trigrams():
+    assert trigrams("abcd") == {"abc", "bcd"}
+    assert trigrams("ab") == set()
+
+
+def test_matches_a_plain_scan_through_changes():
+    rng = random.Random(3)
+    store = AttendanceStore()
+    index = SearchIndex(store)
+    store.set_base(RecordColumns(make_record(rng, n) for n in range(200)))
+
+    for _ in range(3):
+        for term in TERMS:
+            assert index.search(term) == brute_force(store, term), term
+        for n in range(20):
+            store.add(make_record(rng, 1000 + n))
+        for row_id in rng.sample(store.row_ids(), 20):
+            store.update(row_id, make_record(rng, row_id))
+        for row_id in rng.sample(store.row_ids(), 20):
+            store.delete(row_id)
+
+    assert len(index) == len(store)
+
+
+def test_narrowing_sees_changes_made_between_searches():
+    store = AttendanceStore()
+    index = SearchIndex(store)
+    store.add(("S1", "Ann", "CS", "Present", "09:00:00"))
+    assert index.search("an") == [0]
+
+    store.add(("S2", "Annabel", "CS", "Present", "09:00:00"))
+    assert index.search("ann") == [0, 1]
+    store.update(0, ("S1", "Bo", "CS", "Present", "09:00:00"))
+    assert index.search("anna") == [1]
+
+
+def test_a_load_is_indexed_by_the_next_search():
+    store = AttendanceStore()
+    index = SearchIndex(store)
+    store.set_base(RecordColumns([("S1", "Ann", "CS", "Present", "09:00:00")]))
+
+    # Changes made before that search are picked up by the rebuild
+    store.add(("S2", "Bob", "EE", "Late", "09:00:00"))
+    assert index.search("late") == [1]
+    store.clear()
+    assert index.search("") == []
@@ -0,0 +1,108 @@
+import os
+
+from attendance_backend import open_backend
+from attendance_journal import BEGIN, COMMIT, UPSERT
+from attendance_segments import SharedJournal, list_segments, merge, read_segment, read_shared_day
+from attendance_store import AttendanceStore, read_csv
+
+DATE = "2026-01-05"
+
+
+def record(n, status="Present"):
+    return (f"S{n:06d}", f"Student {n}", "CS", status, "09:00:00")
+
+
+def open_writer(csv_file, writer_id):
+    store = AttendanceStore()
+    journal = SharedJournal(csv_file, writer_id=writer_id)
+    journal.load(store)
+    return store, journal
+
+
+def test_merge_keeps_the_newest_stamp():
+    state = {}
+    entries = [((2, "b"), "k", ("new",)), ((1, "a"), "k", ("old",)), ((1, "a"), "j", None)]
+    assert merge(state, entries) == ["k", "j", "k"]
+    assert state == {"k": ((2, "b"), ("new",)), "j": ((1, "a"), None)}
+    assert merge(state, entries) == []
+
+
+def test_writers_see_each_others_changes(tmp_path):
+    csv_file = str(tmp_path / f"attendance_{DATE}.csv")
+    store_a, a = open_writer(csv_file, "a")
+    store_b, b = open_writer(csv_file, "b")
+
+    a.upsert(store_a.add(record(1)), record(1))
+    b.upsert(store_b.add(record(2)), record(2))
+    assert a.sync(store_a) == ([1], [], [])
+    assert b.sync(store_b) == ([1], [], [])
+    assert sorted(store_a.records()) == sorted(store_b.records()) == [record(1), record(2)]
+
+    # Both edit S1; whichever stamped last wins everywhere
+    row_a = next(row_id for row_id, rec in store_a.items() if rec[0] == "S000001")
+    row_b = next(row_id for row_id, rec in store_b.items() if rec[0] == "S000001")
+    store_a.update(row_a, record(1, "Late"))
+    a.upsert(row_a, record(1, "Late"))
+    store_b.update(row_b, record(1, "Absent"))
+    b.upsert(row_b, record(1, "Absent"))
+    a.sync(store_a)
+    b.sync(store_b)
+    assert sorted(store_a.records()) == sorted(store_b.records())
+    assert store_a.get(row_a) == record(1, "Absent")
+
+    store_b.delete(row_b)
+    b.delete(row_b)
+    assert a.sync(store_a) == ([], [], [row_a])
+    a.close()
+    b.close()
+    assert read_shared_day(csv_file) == [record(2)]
+
+
+def test_unfinished_transactions_are_left_for_later(tmp_path):
+    path = str(tmp_path / f"attendance_{DATE}.csv.seg.w.1")
+    committed = f"{UPSERT},w.0,5,{','.join(record(0))}\r\n"
+    pending = f"{BEGIN},2\r\n{UPSERT},w.1,6,{','.join(record(1))}\r\n"
+    with open(path, "w", newline="") as f:
+        f.write(committed + pending)
+
+    entries, end = read_segment(path)
+    assert entries == [((5, "w"), "w.0", record(0))]
+    assert end == len(committed)
+
+    with open(path, "a", newline="") as f:
+        f.write(f"{UPSERT},w.2,6,{','.join(record(2))}\r\n{COMMIT},2\r\n")
+    entries, _ = read_segment(path, end)
+    assert [key for _, key, _ in entries] == ["w.1", "w.2"]
+
+
+def test_compaction_folds_finished_segments(tmp_path):
+    # A day written by the single-writer backend becomes the first base
+    csv_backend = open_backend("csv", str(tmp_path), DATE)
+    store = AttendanceStore()
+    csv_backend.load(store)
+    csv_backend.upsert(store.add(record(0)), record(0))
+    csv_backend.close()
+
+    csv_file = str(tmp_path / f"attendance_{DATE}.csv")
+    store_a, a = open_writer(csv_file, "a")
+    store_b, b = open_writer(csv_file, "b")
+    assert list(store_a.records()) == [record(0)]
+
+    b.upsert(store_b.add(record(1)), record(1))
+    b.close()
+    a.upsert(store_a.add(record(2)), record(2))
+    a.compact()
+
+    # b's finished segment is folded in and gone; a carries on in a new one
+    assert not [path for path in list_segments(csv_file) if ".seg.b." in path]
+    assert sorted(read_csv(csv_file)) == [record(0), record(1), record(2)]
+    assert not os.path.exists(csv_file + ".journal")
+
+    a.upsert(store_a.add(record(3)), record(3))
+    store_c, c = open_writer(csv_file, "c")
+    assert sorted(store_c.records()) == [record(n) for n in range(4)]
+    assert sorted(store_b.records()) == [record(0), record(1)]
+    added, _, _ = b.sync(store_b)
+    assert sorted(store_b.get(row_id) for row_id in added) == [record(2), record(3)]
+    a.close()
+    c.close()
@@ -0,0 +1,141 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+import attendance_server
+from attendance_client import AttendanceClient, ClientError, RemoteBackend
+from attendance_server import AttendanceServer, AttendanceService
+from attendance_store import AttendanceStore, read_csv
+
+DATE = "2026-01-05"
+
+
+@pytest.fixture
+def server(tmp_path):
+    """An ``AttendanceServer`` running on its own event loop thread"""
+    service = AttendanceService(str(tmp_path), date=DATE)
+    server = AttendanceServer(service, port=0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    service.close()
+
+
+def raw_request(port, head, body=b""):
+    """Send raw bytes and return the status line of the reply"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(head + body)
+        reply = b""
+        while b"\r\n" not in reply:
+            data = sock.recv(4096)
+            if not data:
+                break
+            reply += data
+    return reply.split(b"\r\n", 1)[0].decode()
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3", ""])
+def test_bad_content_length_is_rejected(server, length):
+    head = f"POST /records HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+    assert raw_request(server.port, head) == "HTTP/1.1 400 Bad Request"
+
+
+def test_oversized_body_is_rejected(server, monkeypatch):
+    monkeypatch.setattr(attendance_server, "MAX_BODY", 10)
+    head = b"POST /records HTTP/1.1\r\nContent-Length: 11\r\n\r\n"
+    assert raw_request(server.port, head, b"{}") == "HTTP/1.1 413 Payload Too Large"
+
+
+def test_records_round_trip_through_the_client(server):
+    client = AttendanceClient(f"http://127.0.0.1:{server.port}")
+    try:
+        created = client.submit("S1", "Ann", "CS")
+        assert created["record"][:4] == ["S1", "Ann", "CS", "Present"]
+        row_id = created["row_id"]
+        client.submit("S2", "Bob", "EE", "Late")
+
+        assert client.edit(row_id, status="Absent")["record"][3] == "Absent"
+        assert [row[1] for row in client.records(department="EE")["records"]] == ["S2"]
+        assert client.search("bob")["total"] == 1
+        client.delete(row_id)
+        assert client.status()["records"] == 1
+
+        with pytest.raises(ClientError, match="No record"):
+            client.edit(row_id, status="Late")
+        with pytest.raises(ClientError):
+            client.submit("", "Nobody")
+        with pytest.raises(ClientError, match="No such endpoint"):
+            client.request("GET", "/nothing")
+
+        # Compaction brings the CSV file up to date for other readers
+        csv_file = client.compact()["csv_file"]
+    finally:
+        client.close()
+    assert [record[:2] for record in read_csv(csv_file)] == [("S2", "Bob")]
+
+
+def test_batches_and_changes_between_clients(server):
+    url = f"http://127.0.0.1:{server.port}"
+    first, second = AttendanceClient(url), AttendanceClient(url)
+    try:
+        since = second.status()["revision"]
+        ids = first.batch([
+            {"op": "U", "ref": 0, "record": ["S1", "Ann", "CS", "Present", "09:00:00"]},
+            {"op": "U", "ref": 1, "record": ["S2", "Bob", "EE", "Present", "09:00:00"]},
+            {"op": "D", "ref": 1},
+        ], atomic=True)["ids"]
+        assert set(ids) == {"0", "1"}
+
+        # A bad change rejects the whole batch
+        with pytest.raises(ClientError):
+            first.batch([
+                {"op": "U", "ref": 2, "record": ["S3", "Cy", "CS", "Present", "09:00:00"]},
+                {"op": "U", "ref": 3, "record": ["", "", "", "", ""]},
+            ])
+        assert second.status()["records"] == 1
+
+        changes = second.changes(since)
+        assert not changes["reload"]
+        assert [(event, row_id) for _, event, row_id, _ in changes["changes"]] == [
+            ("added", ids["0"]), ("added", ids["1"]), ("deleted", ids["1"]),
+        ]
+        assert first.changes(since)["changes"] == []
+    finally:
+        first.close()
+        second.close()
+
+
+def test_remote_backends_follow_each_other(server):
+    url = f"http://127.0.0.1:{server.port}"
+    stores = [AttendanceStore(), AttendanceStore()]
+    backends = [RemoteBackend(AttendanceClient(url)) for _ in stores]
+    try:
+        for store, backend in zip(stores, backends):
+            backend.load(store)
+
+        record = ("S1", "Ann", "CS", "Present", "09:00:00")
+        row_id = stores[0].add(record)
+        backends[0].upsert(row_id, record)
+        added, changed, removed = backends[1].sync(stores[1])
+        assert [stores[1].get(row_id) for row_id in added] == [record]
+
+        late = ("S1", "Ann", "CS", "Late", "09:00:00")
+        stores[1].update(added[0], late)
+        backends[1].upsert(added[0], late)
+        assert backends[0].sync(stores[0]) == ([], [row_id], [])
+        assert stores[0].get(row_id) == late
+
+        stores[0].delete(row_id)
+        backends[0].delete(row_id)
+        assert backends[1].sync(stores[1]) == ([], [], added)
+        assert len(stores[1]) == 0
+    finally:
+        for backend in backends:
+            backend.close()
@@ -0,0 +1,68 @@
+import attendance_journal
+from attendance_journal import AttendanceJournal
+from attendance_snapshot import Snapshot, open_snapshot, snapshot_path, write_snapshot
+from attendance_store import AttendanceStore, write_csv
+
+RECORDS = [
+    ("S000001", "Ann Lee", "CS", "Present", "09:00:00"),
+    ("S000002", "Zoë Ñúñez", "EE", "Late", "09:15:30"),
+    ("S000003", "Bob", "CS", "Excused", "9:5"),  # Odd status and time kept as text
+    ("S000004", "", "", "Absent", ""),
+]
+
+
+def test_round_trip(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    write_csv(csv_file, RECORDS)
+    write_snapshot(snapshot_path(csv_file), RECORDS, csv_file)
+
+    snapshot = open_snapshot(snapshot_path(csv_file), csv_file)
+    assert len(snapshot) == 4
+    assert list(snapshot) == RECORDS
+    assert snapshot[-1] == RECORDS[-1]
+    for field in range(5):
+        assert snapshot.column(field) == [record[field] for record in RECORDS]
+
+
+def test_stale_or_foreign_snapshot_is_ignored(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    write_csv(csv_file, RECORDS)
+    path = snapshot_path(csv_file)
+    write_snapshot(path, RECORDS, csv_file)
+
+    write_csv(csv_file, RECORDS[:1])
+    assert open_snapshot(path, csv_file) is None
+
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot at all")
+    assert open_snapshot(path, csv_file) is None
+
+
+def test_many_distinct_symbols(tmp_path):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    records = [(f"S{n:06d}", "N", f"Dept {n}", "Present", "09:00:00") for n in range(70000)]
+    write_csv(csv_file, [])
+    write_snapshot(snapshot_path(csv_file), records, csv_file)
+
+    snapshot = Snapshot(snapshot_path(csv_file))
+    assert snapshot[69999] == records[69999]
+
+
+def test_journal_loads_the_base_from_its_snapshot(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "attendance_2026-01-05.csv")
+    store = AttendanceStore()
+    journal = AttendanceJournal(csv_file)
+    journal.load(store)
+    for record in RECORDS:
+        journal.upsert(store.add(record), record)
+    journal.compact(list(store.items()), wait=True)
+    journal.close()
+
+    def unread(path):
+        raise AssertionError("the CSV file was parsed")
+
+    # A current snapshot stands in for the CSV file
+    monkeypatch.setattr(attendance_journal, "read_csv", unread)
+    reopened = AttendanceStore()
+    AttendanceJournal(csv_file).load(reopened)
+    assert list(reopened.records()) == RECORDS
@@ -0,0 +1,100 @@
+from attendance_backend import DB_NAME, open_backend
+from attendance_journal import DELETE, UPSERT
+from attendance_partitions import seal_day
+from attendance_sqlite import SQLiteBackend, main, migrate_csv
+from attendance_store import AttendanceStore
+
+DATE = "2026-01-05"
+
+
+def record(n, status="Present", department="CS"):
+    return (f"S{n:06d}", f"Student {n}", department, status, "09:00:00")
+
+
+def load(backend):
+    store = AttendanceStore()
+    backend.load(store)
+    return store
+
+
+def test_changes_survive_a_reload(tmp_path):
+    backend = open_backend("sqlite", str(tmp_path), DATE)
+    store = load(backend)
+    for n in range(4):
+        backend.upsert(store.add(record(n)), record(n))
+    backend.delete(1)
+    backend.close()
+
+    # Row IDs are renumbered on load, but still reach the right rows on disk
+    backend = open_backend("sqlite", str(tmp_path), DATE)
+    store = load(backend)
+    assert list(store.records()) == [record(0), record(2), record(3)]
+    backend.apply([
+        (UPSERT, 1, record(2, "Late")),
+        (DELETE, 0, None),
+        (UPSERT, store.add(record(4)), record(4)),
+    ])
+    backend.close()
+
+    backend = open_backend("sqlite", str(tmp_path), DATE)
+    assert list(load(backend).records()) == [record(2, "Late"), record(3), record(4)]
+    backend.close()
+
+
+def test_a_batch_keeps_its_order_around_deletes(tmp_path):
+    backend = open_backend("sqlite", str(tmp_path), DATE)
+    store = load(backend)
+    row_id = store.add(record(0))
+    backend.apply([(UPSERT, row_id, record(0)), (DELETE, row_id, None),
+                   (UPSERT, store.add(record(1)), record(1))])
+    backend.close()
+
+    backend = open_backend("sqlite", str(tmp_path), DATE)
+    assert list(load(backend).records()) == [record(1)]
+    backend.close()
+
+
+def test_query_and_dates_span_days(tmp_path):
+    for date, department in (("2026-01-05", "CS"), ("2026-01-06", "EE"), ("2026-01-07", "CS")):
+        backend = open_backend("sqlite", str(tmp_path), date)
+        store = load(backend)
+        for n in range(2):
+            rec = record(n, department=department)
+            backend.upsert(store.add(rec), rec)
+        backend.close()
+
+    backend = SQLiteBackend(str(tmp_path / DB_NAME), DATE)
+    assert backend.dates() == ["2026-01-05", "2026-01-06", "2026-01-07"]
+    assert backend.dates("2026-01-06", "2026-01-06") == ["2026-01-06"]
+    assert [row[0] for row in backend.query(student_id="S000001", department="CS")] == [
+        "2026-01-05", "2026-01-07",
+    ]
+    assert list(backend.query(start="2026-01-06", end="2026-01-06")) == [
+        ("2026-01-06", *record(0, department="EE")), ("2026-01-06", *record(1, department="EE")),
+    ]
+    assert SQLiteBackend(str(tmp_path / "missing.db"), DATE).dates() == []
+
+
+def test_migrate_live_shared_and_sealed_days(tmp_path, capsys):
+    days = {"2026-01-05": "csv", "2026-01-06": "shared", "2026-01-07": "csv"}
+    for date, kind in days.items():
+        backend = open_backend(kind, str(tmp_path), date)
+        store = load(backend)
+        for n in range(3):
+            backend.upsert(store.add(record(n)), record(n))
+        store.delete(0)
+        backend.delete(0)
+        backend.close()
+    seal_day(str(tmp_path / "attendance_2026-01-07.csv"), "2026-01-07")
+
+    db_path = str(tmp_path / DB_NAME)
+    assert migrate_csv(str(tmp_path), db_path) == {date: 2 for date in days}
+    for date in days:
+        backend = SQLiteBackend(db_path, date)
+        assert list(load(backend).records()) == [record(1), record(2)]
+        backend.close()
+
+    # Days already migrated are left alone unless replaced
+    assert migrate_csv(str(tmp_path), db_path) == {}
+    main(["--data-dir", str(tmp_path), "--db", db_path, "--replace"])
+    assert capsys.readouterr().out.endswith(f"Migrated 3 day(s) into {db_path}\n")
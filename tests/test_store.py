@@ -0,0 +1,30 @@
+import pytest
+
+from attendance_store import RecordColumns, format_time, parse_time
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("00:00:00", 0),
+    ("09:05:07", 9 * 3600 + 5 * 60 + 7),
+    ("23:59:59", 86399),
+])
+def test_parse_time(value, seconds):
+    assert parse_time(value) == seconds
+    assert format_time(seconds) == value
+
+
+@pytest.mark.parametrize("value", [
+    "", "9:05:07", "24:00:00", "12:60:00", "12:00:60",
+    "+1:00:00", " 1:00:00", "1 :00:00", "0_:00:00", "-1:00:00",
+    "٠٩:00:00",  # Arabic-Indic digits
+])
+def test_parse_time_rejects(value):
+    assert parse_time(value) is None
+
+
+def test_columns_keep_odd_statuses_and_times():
+    records = [
+        ("S000001", "Ann", "CS", "Present", "09:00:00"),
+        ("S000002", "Bob", "EE", "Excused", " 1:00:00"),
+    ]
+    assert list(RecordColumns(records)) == records
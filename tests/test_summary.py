@@ -0,0 +1,86 @@
+import os
+
+from attendance_summary import AttendanceSummary, Counts, counts_path
+
+
+def record(n, status="Present", department="CS"):
+    return (f"S{n:06d}", f"Student {n}", department, status, "09:00:00")
+
+
+def day(date, fingerprint, *records):
+    return (date, fingerprint, lambda: iter(records))
+
+
+def totals(counts):
+    return counts.totals
+
+
+def test_new_days_are_counted_and_remembered(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+    days = [
+        day("2026-01-05", "a", record(0), record(1, "Late")),
+        day("2026-01-06", "b", record(0, "Absent", "EE")),
+    ]
+
+    assert summary._fold(past, seen, days)
+    assert seen == {"2026-01-05": "a", "2026-01-06": "b"}
+    assert totals(past) == [1, 1, 1]
+    assert past.students["S000000"] == [1, 1, 0]
+    assert past.departments == {"CS": [1, 0, 1], "EE": [0, 1, 0]}
+    assert os.path.isfile(counts_path(str(tmp_path), "2026-01-05"))
+
+
+def test_unchanged_days_are_not_read_again(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+    summary._fold(past, seen, [day("2026-01-05", "a", record(0))])
+
+    def unreadable():
+        raise AssertionError("an unchanged day was read")
+
+    assert summary._fold(past, seen, [("2026-01-05", "a", unreadable)])
+    assert totals(past) == [1, 0, 0]
+
+
+def test_changed_day_is_taken_off_before_recounting(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+    summary._fold(past, seen, [day("2026-01-05", "a", record(0), record(1))])
+
+    assert summary._fold(past, seen, [day("2026-01-05", "b", record(0, "Late"))])
+    assert seen == {"2026-01-05": "b"}
+    assert totals(past) == [0, 0, 1]
+    assert "S000001" not in past.students
+
+
+def test_removed_day_is_taken_off(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+    summary._fold(past, seen, [day("2026-01-05", "a", record(0)), day("2026-01-06", "b", record(1))])
+
+    assert summary._fold(past, seen, [day("2026-01-06", "b", record(1))])
+    assert seen == {"2026-01-06": "b"}
+    assert totals(past) == [1, 0, 0]
+    assert list(past.students) == ["S000001"]
+
+
+def test_missing_counts_file_asks_for_a_full_recount(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+    summary._fold(past, seen, [day("2026-01-05", "a", record(0))])
+    os.remove(counts_path(str(tmp_path), "2026-01-05"))
+
+    assert not summary._fold(past, seen, [day("2026-01-05", "b", record(1))])
+
+
+def test_day_that_cannot_be_read_is_left_for_the_next_refresh(tmp_path):
+    summary = AttendanceSummary(str(tmp_path))
+    past, seen = Counts(), {}
+
+    def sealing():
+        raise OSError("being sealed")
+
+    assert summary._fold(past, seen, [("2026-01-05", "a", sealing)])
+    assert seen == {}
+    assert totals(past) == [0, 0, 0]
@@ -0,0 +1,145 @@
+import threading
+import tkinter as tk
+
+import pytest
+
+from attendance_store import AttendanceStore
+from attendance_view import RecordsView, UpdateScheduler
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("Tk needs a display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def record(n, status="Present"):
+    return (f"S{n:06d}", f"Student {n}", "CS", status, "09:00:00")
+
+
+def shown(view):
+    return [view.tree.item(item, "values")[0] for item in view.tree.get_children()]
+
+
+def test_view_only_materializes_visible_rows(root):
+    records = {n: record(n) for n in range(1000)}
+    view = RecordsView(root, records.__getitem__, buffer=5)
+    view.set_rows(range(1000))
+
+    assert len(view) == 1000
+    assert shown(view) == [record(n)[0] for n in range(25)]
+
+    records[0] = record(0, "Late")
+    view.refresh()
+    assert view.tree.item(view.tree.get_children()[0], "values")[3] == "Late"
+
+    view.see(500)
+    assert record(500)[0] in shown(view)
+    assert len(view.tree.get_children()) == 25
+
+
+def test_selection_is_kept_by_row_id(root):
+    records = {n: record(n) for n in range(100)}
+    view = RecordsView(root, records.__getitem__)
+    view.set_rows(range(100))
+
+    view.selection_set([60, 3, 1])
+    assert view.selection() == [1, 3, 60]
+
+    view.remove([1])
+    assert len(view) == 99
+    assert view.selection() == [3, 60]
+
+    view.set_rows(range(50))
+    assert view.selection() == [3]
+
+
+class FakeWidget:
+    """Collects ``after`` jobs instead of running a Tk event loop"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def after(self, interval, callback):
+        self.jobs.append(callback)
+        return len(self.jobs)
+
+
+class FakeView:
+    def __init__(self):
+        self.calls = []
+
+    def set_rows(self, row_ids):
+        self.calls.append(("set_rows", list(row_ids)))
+
+    def extend(self, row_ids):
+        self.calls.append(("extend", list(row_ids)))
+
+    def remove(self, row_ids):
+        self.calls.append(("remove", set(row_ids)))
+
+    def refresh(self):
+        self.calls.append(("refresh",))
+
+
+@pytest.fixture
+def scheduled():
+    store = AttendanceStore()
+    widget = FakeWidget()
+    views = [FakeView(), FakeView()]
+    flushes = []
+    scheduler = UpdateScheduler(widget, store, lambda: views, on_flush=lambda: flushes.append(True))
+    return scheduler, widget, views, flushes
+
+
+def test_burst_of_changes_is_drawn_once(scheduled):
+    scheduler, widget, views, flushes = scheduled
+    store = scheduler.store
+    for n in range(1000):
+        store.add(record(n))
+    store.update(0, record(0, "Late"))
+    store.delete(1)
+    store.delete(999)
+
+    assert len(widget.jobs) == 1
+    assert views[0].calls == views[1].calls == []
+
+    widget.jobs.pop()()
+    added = [n for n in range(1000) if n not in (1, 999)]
+    assert views[0].calls == [("remove", {1, 999}), ("extend", added), ("refresh",)]
+    assert views[1].calls == [("remove", {1, 999}), ("refresh",)]
+    assert flushes == [True]
+
+    # Nothing new: no redraw and no callback
+    scheduler.flush()
+    assert len(views[0].calls) == 3
+    assert flushes == [True]
+
+
+def test_load_shows_every_row_again(scheduled):
+    scheduler, widget, views, flushes = scheduled
+    store = scheduler.store
+    store.add(record(0))
+    store.set_base([record(n) for n in range(3)])
+    store.add(record(3))
+
+    widget.jobs.pop()()
+    for view in views:
+        assert view.calls == [("set_rows", [0, 1, 2, 3])]
+
+
+def test_changes_from_other_threads_wait_for_flush(scheduled):
+    scheduler, widget, views, flushes = scheduled
+    thread = threading.Thread(target=lambda: scheduler.store.extend(record(n) for n in range(5)))
+    thread.start()
+    thread.join()
+
+    assert widget.jobs == []
+    assert views[0].calls == []
+    scheduler.flush()
+    assert views[0].calls == [("extend", [0, 1, 2, 3, 4])]